@@ -1,19 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from bootstrap import bootstrap_groups
+from instrumentation import instrument
+from interval_matching import work_center_keys
+from online_stats import GroupedMoments, group_moments
+from timestamp_parsing import parse_timestamps
+
+@instrument()
 def analyze_priorities(df_orders):
-    priority_stats = df_orders.groupby('Priorität')['Order_Duration'].mean().reset_index()
+    priority_stats = df_orders.groupby('Priorität', observed=True)['Order_Duration'].mean().reset_index()
     print("\nDurchschnittliche Auftragsdauer nach Priorität:")
     print(priority_stats)
 
-def print_damage_stats(df_orders):
+@instrument()
+def damage_type_stats(df_orders, bootstrap=False):
     """
-    Gibt für jede Schadenskategorie die Anzahl der Aufträge und die durchschnittliche Auftragsdauer aus.
+    Anzahl der Aufträge und durchschnittliche Auftragsdauer pro Schadenskategorie.
+    Mit bootstrap=True zusätzlich Median und Bootstrap-Konfidenzintervalle (siehe bootstrap.py),
+    damit kleine Kategorien nicht überbewertet werden.
     """
-    damage_stats = df_orders.groupby('Damage_Type').agg(
+    damage_stats = df_orders.groupby('Damage_Type', observed=True).agg(
         Auftragsanzahl=('Order_Duration', 'count'),
         Durchschnittliche_Auftragsdauer=('Order_Duration', 'mean')
     ).reset_index()
 
+    if bootstrap:
+        intervals = bootstrap_groups(df_orders['Order_Duration'], df_orders['Damage_Type'], statistics=('mean', 'median'))
+        intervals = intervals.drop(columns='n').rename(columns={
+            'mean_CI_Low': 'CI_Low', 'mean_CI_High': 'CI_High', 'median': 'Median',
+            'median_CI_Low': 'Median_CI_Low', 'median_CI_High': 'Median_CI_High',
+        }).drop(columns='mean')
+        damage_stats = damage_stats.merge(intervals, left_on='Damage_Type', right_index=True, how='left')
+    return damage_stats
+
+
+def print_damage_stats(df_orders, bootstrap=False, damage_stats=None):
+    """
+    Gibt die Statistiken pro Schadenskategorie aus (siehe damage_type_stats); mit `damage_stats`
+    wird eine bereits berechnete Tabelle nur ausgegeben.
+    """
+    if damage_stats is None:
+        damage_stats = damage_type_stats(df_orders, bootstrap=bootstrap)
     print("\nStatistiken pro Schadensbild:")
-    print(damage_stats)
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(damage_stats.round(1))
+    return damage_stats
 
 
 def correlate_downtime(df_merged):
@@ -26,3 +58,137 @@ def correlate_downtime(df_merged):
             print("⚠️ Keine gemeinsamen gültigen Werte für Order_Duration und Downtime.")
     else:
         print("⚠️ Downtime-Spalte nicht vorhanden.")
+
+
+def pair_correlation(x_stats, y_stats):
+    """
+    Pearson-Korrelation über alle Paare (x, y) derselben Gruppe – so, als wären beide Tabellen
+    pro Gruppe vollständig verknüpft worden, aber nur aus den Gruppenmomenten berechnet.
+    Jedes x einer Gruppe kommt so oft vor, wie die Gruppe y-Werte hat (und umgekehrt).
+    Gibt Korrelationskoeffizient und Anzahl der Paare zurück.
+    """
+    joined = x_stats.join(y_stats, how='inner', lsuffix='_x', rsuffix='_y')
+    joined = joined[(joined['count_x'] > 0) & (joined['count_y'] > 0)]
+    b = joined['count_x'].to_numpy(dtype=float)
+    a = joined['count_y'].to_numpy(dtype=float)
+    weights = a * b
+    n_pairs = weights.sum()
+    if n_pairs == 0:
+        return np.nan, 0
+
+    mean_x = joined['mean_x'].to_numpy()
+    mean_y = joined['mean_y'].to_numpy()
+    mx = (weights * mean_x).sum() / n_pairs
+    my = (weights * mean_y).sum() / n_pairs
+
+    cov = (weights * (mean_x - mx) * (mean_y - my)).sum()
+    var_x = (a * (joined['m2_x'].to_numpy() + b * (mean_x - mx) ** 2)).sum()
+    var_y = (b * (joined['m2_y'].to_numpy() + a * (mean_y - my) ** 2)).sum()
+    denom = np.sqrt(var_x * var_y)
+    corr = cov / denom if denom > 0 else np.nan
+    return corr, int(n_pairs)
+
+
+def _correlation_keys(df_machine, df_orders, by):
+    # Gleiche Schlüsselnamen auf beiden Seiten, damit die Gruppenmomente verknüpft werden können
+    machine_keys, order_keys = None, None
+    if df_machine is not None:
+        machine_keys = [pd.Series(work_center_keys(df_machine['Work Center']), index=df_machine.index, name='Work Center')]
+        if by == 'day':
+            machine_keys.append(parse_timestamps(df_machine['Calendar day']).dt.normalize().rename('Day'))
+    if df_orders is not None:
+        order_keys = [pd.Series(work_center_keys(df_orders['Arbeitsplatz']), index=df_orders.index, name='Work Center')]
+        if by == 'day':
+            order_keys.append(parse_timestamps(df_orders['Start_ts']).dt.normalize().rename('Day'))
+    return machine_keys, order_keys
+
+
+@instrument()
+def correlate_downtime_grouped(df_machine, df_orders, by='day', machine_stats=None):
+    """
+    Korrelation zwischen Order_Duration und Downtime ohne verknüpften Gesamt-DataFrame.
+    by='day': Paare aus gleichem Arbeitsplatz und gleichem Tag (Calendar day / Start_ts);
+    by=None: Paare aus gleichem Arbeitsplatz – identisch zu correlate_downtime(merge_data(...)).
+    Speicherbedarf wächst nur mit der Anzahl der Gruppen.
+    machine_stats: bereits aggregierte Downtime-Momente mit passenden Schlüsseln
+    (z. B. incremental.downtime_moments); df_machine wird dann nicht benötigt.
+    """
+    if machine_stats is None and 'Downtime' not in df_machine.columns:
+        print("⚠️ Downtime-Spalte nicht vorhanden.")
+        return None
+
+    machine_keys, order_keys = _correlation_keys(df_machine if machine_stats is None else None, df_orders, by)
+    if machine_stats is None:
+        y_stats = group_moments(pd.to_numeric(df_machine['Downtime'], errors='coerce'), machine_keys)
+    else:
+        y_stats = machine_stats
+    x_stats = group_moments(pd.to_numeric(df_orders['Order_Duration'], errors='coerce'), order_keys)
+
+    corr, n_pairs = pair_correlation(x_stats, y_stats)
+    if n_pairs == 0:
+        print("⚠️ Keine gemeinsamen gültigen Werte für Order_Duration und Downtime.")
+        return None
+
+    print(f"\n📊 Korrelationskoeffizient zwischen Order_Duration und Downtime: {corr:.3f} ({n_pairs:,} Paare)")
+    return corr
+
+
+# 👉 Streaming-Varianten: gleiche Kennzahlen aus Chunks (z. B. mehrere Jahres-Exporte), ohne alles zu laden.
+# Die zurückgegebenen Akkumulatoren lassen sich mit merge() über Prozesse hinweg kombinieren.
+
+def analyze_priorities_stream(order_chunks):
+    moments = GroupedMoments()
+    for chunk in order_chunks:
+        moments.update(chunk['Order_Duration'], [chunk['Priorität']])
+
+    priority_stats = (
+        moments.stats['mean']
+        .rename('Order_Duration')
+        .rename_axis('Priorität')
+        .reset_index()
+    )
+    print("\nDurchschnittliche Auftragsdauer nach Priorität:")
+    print(priority_stats)
+    return moments
+
+
+def print_damage_stats_stream(order_chunks):
+    moments = GroupedMoments()
+    for chunk in order_chunks:
+        moments.update(chunk['Order_Duration'], [chunk['Damage_Type']])
+
+    damage_stats = pd.DataFrame({
+        'Auftragsanzahl': moments.stats['count'].astype(int),
+        'Durchschnittliche_Auftragsdauer': moments.stats['mean'],
+    }).rename_axis('Damage_Type').reset_index()
+
+    print("\nStatistiken pro Schadensbild:")
+    print(damage_stats)
+    return moments
+
+
+def correlate_downtime_stream(machine_chunks, order_chunks, by=None):
+    """
+    Wie correlate_downtime_grouped, aber über Chunks von Maschinen- und Auftragsdaten.
+    by=None entspricht correlate_downtime(merge_data(...)) auf den vollständigen Daten.
+    """
+    machine_moments = GroupedMoments()
+    for chunk in machine_chunks:
+        if 'Downtime' not in chunk.columns:
+            print("⚠️ Downtime-Spalte nicht vorhanden.")
+            return None
+        machine_keys = _correlation_keys(chunk, None, by)[0]
+        machine_moments.update(chunk['Downtime'], machine_keys)
+
+    order_moments = GroupedMoments()
+    for chunk in order_chunks:
+        order_keys = _correlation_keys(None, chunk, by)[1]
+        order_moments.update(chunk['Order_Duration'], order_keys)
+
+    corr, n_pairs = pair_correlation(order_moments.stats, machine_moments.stats)
+    if n_pairs == 0:
+        print("⚠️ Keine gemeinsamen gültigen Werte für Order_Duration und Downtime.")
+        return None
+
+    print(f"\n📊 Korrelationskoeffizient zwischen Order_Duration und Downtime: {corr:.3f} ({n_pairs:,} Paare)")
+    return corr
@@ -0,0 +1,244 @@
+# batch_runner.py
+# 👉 Batch-Modus: alle Werks-/Arbeitsplatz-Exporte eines Verzeichnisses parallel auswerten
+import argparse
+import contextlib
+import io
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from cache import configure_cache, get_cache_settings
+from config import (
+    BATCH_DATA_DIR,
+    BATCH_MAX_WORKERS,
+    BATCH_ORDER_PATTERN,
+    BATCH_MACHINE_PATTERN,
+    BATCH_NOTIFICATION_PATTERN,
+    BATCH_FAILURECODE_PATTERN,
+    DOWNTIME_CUBE_DIR
+)
+
+
+def _match_files(directory, pattern):
+    regex = re.compile(pattern, re.IGNORECASE)
+    matches = []
+    for name in sorted(os.listdir(directory)):
+        match = regex.fullmatch(name)
+        if match:
+            matches.append((os.path.join(directory, name), match.groupdict()))
+    return matches
+
+
+def _per_plant(matches):
+    """
+    Ordnet Dateien ihrem Werk zu; Dateien ohne Werk im Namen gelten für alle Werke (Schlüssel None).
+    """
+    files = {}
+    for path, groups in matches:
+        files.setdefault(groups.get('plant'), []).append(path)
+    return files
+
+
+def discover_file_sets(directory=BATCH_DATA_DIR):
+    """
+    Sucht alle Dateisätze im Verzeichnis: je Reporting-CSV (Werk + Arbeitsplatz) die
+    SAP-Auftragsexporte desselben Werks sowie die Meldungen/Fehlercodes des Werks
+    (oder die gemeinsamen Dateien). Unvollständige Sätze werden gemeldet und übersprungen.
+    """
+    orders = _per_plant(_match_files(directory, BATCH_ORDER_PATTERN))
+    notifications = _per_plant(_match_files(directory, BATCH_NOTIFICATION_PATTERN))
+    failurecodes = _per_plant(_match_files(directory, BATCH_FAILURECODE_PATTERN))
+
+    file_sets = []
+    for machine_path, groups in _match_files(directory, BATCH_MACHINE_PATTERN):
+        plant, work_center = groups['plant'], groups['work_center']
+        notification_paths = notifications.get(plant) or notifications.get(None)
+        failurecode_paths = failurecodes.get(plant) or failurecodes.get(None)
+        missing = [
+            label for label, paths in [
+                ('SAP-Aufträge', orders.get(plant)),
+                ('Meldungen', notification_paths),
+                ('Fehlercodes', failurecode_paths),
+            ] if not paths
+        ]
+        if missing:
+            print(f"⚠️ Werk {plant} / Arbeitsplatz {work_center}: {', '.join(missing)} fehlen – übersprungen.")
+            continue
+        file_sets.append({
+            'plant': plant,
+            'work_center': work_center,
+            'machine': machine_path,
+            'orders': orders[plant],
+            'notifications': notification_paths[0],
+            'failurecodes': failurecode_paths[0],
+        })
+    return file_sets
+
+
+def _load_file_set(file_set, filter_orders):
+    from data_loader import (
+        load_failurecode_data,
+        load_machine_data,
+        load_notification_data,
+        load_order_data
+    )
+    from interval_matching import work_center_keys
+
+    df_orders = pd.concat([load_order_data(path) for path in file_set['orders']], ignore_index=True)
+    if len(file_set['orders']) > 1 and 'Auftrag' in df_orders.columns:
+        # Überlappende Exporte desselben Werks
+        df_orders = df_orders.drop_duplicates(subset='Auftrag')
+    if filter_orders:
+        df_orders = df_orders[work_center_keys(df_orders['Arbeitsplatz']) == str(file_set['work_center'])]
+        if df_orders.empty:
+            raise ValueError(f"Keine SAP-Aufträge für Arbeitsplatz {file_set['work_center']} gefunden.")
+
+    return {
+        'machine': load_machine_data(file_set['machine']),
+        'orders': df_orders.reset_index(drop=True),
+        'notifications': load_notification_data(file_set['notifications']),
+        'failurecodes': load_failurecode_data(file_set['failurecodes']),
+    }
+
+
+def run_file_set(file_set, filter_orders=True):
+    """
+    Führt Vorverarbeitung → Klassifikation → SAP-Analyse → Maschinen-Schadensbilder → Vergleich
+    für einen Dateisatz aus (dieselben Stufen wie main.py). Konsolenausgaben werden gesammelt,
+    Fehler abgefangen, damit ein defekter Satz die übrigen nicht abbricht.
+    """
+    # Stufenfunktionen aus main.py wiederverwenden (dort unter __main__ geschützt)
+    import matplotlib.pyplot as plt
+    from main import (
+        stage_classify, stage_comparison, stage_cube, stage_machine, stage_preprocess, stage_reliability, stage_report,
+        stage_sap, stage_text_stats
+    )
+    from schema import optimize_machine_data, optimize_order_data
+
+    result = {
+        'plant': file_set['plant'],
+        'work_center': file_set['work_center'],
+        'table': None,
+        'error': None,
+    }
+    log = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log):
+            raw = _load_file_set(file_set, filter_orders)
+            raw['machine'] = optimize_machine_data(raw['machine'], report=False)
+            raw['orders'] = optimize_order_data(raw['orders'], report=False)
+            prepared = stage_preprocess(raw)
+            df_orders = stage_classify(prepared)
+            df_sap = stage_sap(df_orders, raw)
+            if df_sap is None:
+                # Keine Verknüpfung mit Meldungen/Codes -> Vergleich ohne SAP-Spalte
+                df_sap = pd.DataFrame(columns=['Damage_Type', 'Order_Duration', 'Auftragsanzahl'])
+            # Eigener Würfel pro Dateisatz, da die Worker parallel schreiben
+            cube = stage_cube(prepared, os.path.join(DOWNTIME_CUBE_DIR, f"{file_set['plant']}_{file_set['work_center']}.sqlite"))
+            df_machine_avg = stage_machine(cube, df_orders)
+            df_reliability = stage_reliability(prepared, df_orders)
+            result['table'] = stage_comparison(stage_text_stats(df_orders), df_sap, df_machine_avg, df_reliability)
+            # Ausgaben wie im Einzellauf ins Protokoll des Satzes
+            stage_report(df_sap, None, df_machine_avg, df_reliability, result['table'])
+    except Exception:
+        result['error'] = traceback.format_exc()
+    finally:
+        plt.close('all')
+    result['log'] = log.getvalue()
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def _init_worker(cache_settings):
+    # Plots im Worker nur rendern, nie anzeigen
+    import warnings
+    import matplotlib
+    matplotlib.use('Agg')
+    warnings.filterwarnings('ignore', message='.*non-interactive.*')
+    configure_cache(**cache_settings)
+
+
+def consolidate_results(results):
+    """
+    Hängt die Vergleichstabellen aller erfolgreichen Sätze mit den Schlüsseln Plant/Work Center aneinander.
+    """
+    tables = []
+    for result in results:
+        if result['table'] is None:
+            continue
+        table = result['table'].copy()
+        table.insert(0, 'Work Center', result['work_center'])
+        table.insert(0, 'Plant', result['plant'])
+        tables.append(table)
+    if not tables:
+        return pd.DataFrame(columns=['Plant', 'Work Center', 'Damage_Type'])
+    return pd.concat(tables, ignore_index=True)
+
+
+def run_batch(directory=BATCH_DATA_DIR, max_workers=BATCH_MAX_WORKERS, filter_orders=True, file_sets=None):
+    """
+    Wertet alle gefundenen Dateisätze in `max_workers` Prozessen aus.
+    Gibt (konsolidierte Tabelle, Ergebnisse pro Satz) zurück.
+    - filter_orders: Aufträge auf den Arbeitsplatz des Reporting-Exports beschränken
+    """
+    file_sets = discover_file_sets(directory) if file_sets is None else file_sets
+    if not file_sets:
+        print(f"⚠️ Keine vollständigen Dateisätze in {directory} gefunden.")
+        return consolidate_results([]), []
+
+    print(f"📦 {len(file_sets)} Dateisätze gefunden, starte Auswertung ...")
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(get_cache_settings(),)
+    ) as executor:
+        futures = {executor.submit(run_file_set, file_set, filter_orders): file_set for file_set in file_sets}
+        for future in as_completed(futures):
+            file_set = futures[future]
+            try:
+                result = future.result()
+            except Exception:
+                # z. B. abgestürzter Worker-Prozess
+                result = {
+                    'plant': file_set['plant'],
+                    'work_center': file_set['work_center'],
+                    'table': None,
+                    'error': traceback.format_exc(),
+                    'log': '',
+                    'seconds': float('nan'),
+                }
+            label = f"Werk {result['plant']} / Arbeitsplatz {result['work_center']}"
+            if result['error'] is None:
+                print(f"✅ {label} ({result['seconds']:.2f} s)")
+            else:
+                print(f"❌ {label} fehlgeschlagen:\n{result['error']}")
+            results.append(result)
+
+    results.sort(key=lambda r: (str(r['plant']), str(r['work_center'])))
+    return consolidate_results(results), results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch-Auswertung mehrerer Werks-/Arbeitsplatz-Exporte")
+    parser.add_argument('directory', nargs='?', default=BATCH_DATA_DIR, help="Verzeichnis mit den Exporten")
+    parser.add_argument('--workers', type=int, default=BATCH_MAX_WORKERS, help="Anzahl Worker-Prozesse")
+    parser.add_argument('--output', help="Konsolidierte Vergleichstabelle als CSV speichern")
+    parser.add_argument('--all-orders', action='store_true',
+                        help="Aufträge nicht auf den Arbeitsplatz des Reporting-Exports filtern")
+    parser.add_argument('--no-cache', action='store_true', help="Excel-Exporte ohne Cache einlesen")
+    args = parser.parse_args()
+    configure_cache(enabled=not args.no_cache)
+
+    df_all, batch_results = run_batch(args.directory, args.workers, filter_orders=not args.all_orders)
+    failed = [r for r in batch_results if r['error'] is not None]
+    print(f"\n📊 Konsolidierte Vergleichstabelle ({len(batch_results) - len(failed)} von {len(batch_results)} Sätzen):")
+    print(df_all)
+    if args.output:
+        df_all.to_csv(args.output, sep=';', index=False)
+        print(f"💾 Gespeichert: {args.output}")
@@ -0,0 +1,161 @@
+# benchmark.py
+# 👉 Laufzeit und Speicherspitze aller Pipeline-Stufen auf synthetischen Daten verschiedener Größe (Ergebnis als JSON)
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from categorization import classify_damage_types
+from downtime_from_machine_damage_types import analyze_machine_damage_types
+from downtime_matching import get_top_matched_downtimes
+from preprocessing import merge_data, preprocess_machine_data, preprocess_order_data
+from sap_damage_type_analysis import analyze_sap_damage_types
+from synthetic_data import generate_dataset
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+RESULT_DIR = 'benchmark_results'
+MERGE_MACHINE_COLUMNS = ['Work Center', 'Start date / time', 'End date / time', 'Downtime']
+MERGE_ORDER_COLUMNS = ['Auftrag', 'Arbeitsplatz', 'Start_ts', 'End_ts', 'Order_Duration']
+
+
+def _stages(raw):
+    """
+    Die Stufen in Pipeline-Reihenfolge: (Name, Funktion, Argumente). Argumente werden erst
+    beim Aufruf erzeugt (Kopien, da einige Funktionen ihre Eingaben verändern); Ergebnisse
+    früherer Stufen stehen in `results`.
+    """
+    return [
+        ('preprocess_machine_data', preprocess_machine_data, lambda r: (raw['machine'].copy(),)),
+        ('preprocess_order_data', preprocess_order_data, lambda r: (raw['orders'].copy(),)),
+        ('classify_damage_types', classify_damage_types, lambda r: (r['preprocess_order_data'].copy(),)),
+        # Ohne Toleranz entsteht pro Arbeitsplatz ein Kreuzprodukt – bei großen Größen nicht messbar.
+        # Nur die Spalten der Korrelation, sonst dominiert das Kopieren breiter Textspalten.
+        ('merge_data', lambda m, o: merge_data(m, o, tolerance=pd.Timedelta('2h')),
+         lambda r: (r['preprocess_machine_data'][MERGE_MACHINE_COLUMNS],
+                    r['classify_damage_types'][MERGE_ORDER_COLUMNS])),
+        ('get_top_matched_downtimes', get_top_matched_downtimes,
+         lambda r: (r['classify_damage_types'], r['preprocess_machine_data'])),
+        ('analyze_sap_damage_types', lambda o, n, f: analyze_sap_damage_types(o, n, f, show_plot=False),
+         lambda r: (r['classify_damage_types'], raw['notifications'], raw['failurecodes'])),
+        ('analyze_machine_damage_types', analyze_machine_damage_types,
+         lambda r: (r['preprocess_machine_data'], r['classify_damage_types'])),
+    ]
+
+
+def _rows(value):
+    return len(value) if isinstance(value, (pd.DataFrame, pd.Series)) else None
+
+
+def _call_quiet(func, args):
+    # Konsolenausgaben der Stufen (Tabellen, Debug-Ausgaben) unterdrücken
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def measure(func, args_builder, results, repeat=1, memory=True):
+    """
+    Beste Wandzeit aus `repeat` Läufen und – in einem separaten Lauf, da tracemalloc
+    bremst – die zusätzliche Speicherspitze (von NumPy/pandas belegter Speicher wird mitgezählt).
+    """
+    times = []
+    output = None
+    for _ in range(repeat):
+        args = args_builder(results)
+        start = time.perf_counter()
+        output = _call_quiet(func, args)
+        times.append(time.perf_counter() - start)
+
+    peak_mb = None
+    if memory:
+        args = args_builder(results)
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        _call_quiet(func, args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = (peak - baseline) / 1024 ** 2
+
+    rows_in = _rows(args_builder(results)[0])
+    return output, {'seconds': min(times), 'peak_mb': peak_mb, 'rows_in': rows_in, 'rows_out': _rows(output)}
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, repeat=1, memory=True, seed=0):
+    records = []
+    for size in sizes:
+        print(f"\n📦 Größe {size:,}: erzeuge synthetische Daten ...")
+        start = time.perf_counter()
+        raw = generate_dataset(size, seed=seed)
+        print(f"   erzeugt in {time.perf_counter() - start:.2f} s")
+
+        results = {}
+        for name, func, args_builder in _stages(raw):
+            results[name], record = measure(func, args_builder, results, repeat, memory)
+            record.update({'size': size, 'stage': name})
+            records.append(record)
+            peak = f"{record['peak_mb']:9.1f} MB" if record['peak_mb'] is not None else ''
+            print(f"   ⏱️ {name:<30} {record['seconds']:8.3f} s {peak}")
+    return records
+
+
+def save_results(records, path=None, meta=None):
+    if path is None:
+        os.makedirs(RESULT_DIR, exist_ok=True)
+        path = os.path.join(RESULT_DIR, f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    payload = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            **(meta or {}),
+        },
+        'results': records,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    print(f"\n💾 Ergebnisse gespeichert: {path}")
+    return path
+
+
+def compare_results(baseline_path, records, threshold=1.2):
+    """
+    Vergleicht die Laufzeiten mit einem früheren Ergebnis; Faktoren über `threshold` gelten als Regression.
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['size'], r['stage']): r for r in json.load(f)['results']}
+
+    print(f"\n🔍 Vergleich mit {baseline_path}:")
+    regressions = 0
+    for record in records:
+        old = baseline.get((record['size'], record['stage']))
+        if old is None or not old['seconds']:
+            continue
+        factor = record['seconds'] / old['seconds']
+        flag = '⚠️' if factor > threshold else '  '
+        regressions += factor > threshold
+        print(f"   {flag} {record['size']:>10,} {record['stage']:<30} {old['seconds']:8.3f} s -> {record['seconds']:8.3f} s ({factor:.2f}x)")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark der Pipeline-Stufen auf synthetischen Daten")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Zeilenzahlen (1k bis 10M)")
+    parser.add_argument('--repeat', type=int, default=1, help="Läufe pro Stufe (beste Zeit zählt)")
+    parser.add_argument('--no-memory', action='store_true', help="Keine Speichermessung (tracemalloc)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON-Datei für die Ergebnisse")
+    parser.add_argument('--compare', help="Früheres Ergebnis (JSON) zum Vergleich")
+    args = parser.parse_args()
+
+    benchmark_records = run_benchmark(args.sizes, args.repeat, memory=not args.no_memory, seed=args.seed)
+    save_results(benchmark_records, args.output, meta={'sizes': args.sizes, 'repeat': args.repeat, 'seed': args.seed})
+    if args.compare:
+        compare_results(args.compare, benchmark_records)
@@ -0,0 +1,52 @@
+# benchmark_clean_text.py
+# 👉 Vergleicht clean_text (zeilenweise) mit clean_texts (vektorisiert) auf einer synthetischen Kurztext-Spalte
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from categorization import clean_text, clean_texts
+
+
+def synthetic_kurztext(n_rows, n_unique=5000, seed=42):
+    """
+    Erzeugt eine Kurztext-Spalte mit typischen tschechischen Wartungstexten,
+    Diakritika, Sonderzeichen und fehlenden Werten.
+    """
+    rng = np.random.default_rng(seed)
+    words = [
+        'výměna', 'ložisk', 'oprava', 'motoru', 'čištění', 'formy', 'únik', 'vzduchu',
+        'snímač', 'seřízení', 'kardan', 'hydraulika', 'těsnění', 'jistič', '#MK2', 'Kabel\xa0X1',
+        'Prüfung', 'Störung', '(dringend)', 'vymena lozisk'
+    ]
+    vocabulary = [
+        ' '.join(rng.choice(words, size=rng.integers(1, 5)))
+        for _ in range(n_unique)
+    ]
+    texts = pd.Series(rng.choice(vocabulary, size=n_rows), dtype=object)
+    texts[rng.random(n_rows) < 0.01] = None
+    return texts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark clean_text vs. clean_texts")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    texts = synthetic_kurztext(args.rows)
+    print(f"📦 {len(texts):,} Zeilen, {texts.nunique():,} eindeutige Kurztexte")
+
+    start = time.perf_counter()
+    expected = texts.apply(clean_text)
+    t_apply = time.perf_counter() - start
+
+    clean_texts(texts.head(1))  # Übersetzungstabelle vorab aufbauen
+    start = time.perf_counter()
+    result = clean_texts(texts)
+    t_vectorized = time.perf_counter() - start
+
+    assert result.equals(expected), "clean_texts weicht von clean_text ab"
+    print(f"⏱️ clean_text (.apply): {t_apply:.2f} s")
+    print(f"⏱️ clean_texts:         {t_vectorized:.2f} s")
+    print(f"🚀 Faktor: {t_apply / t_vectorized:.1f}x")
@@ -0,0 +1,130 @@
+# bootstrap.py
+# 👉 Vektorisierter Bootstrap für Konfidenzintervalle pro Gruppe (Mittelwert, Median, Quantile): alle Resamples
+#    aller Gruppen als eine Indexmatrix, Gruppenstatistiken per np.add.reduceat – ohne Schleife pro Gruppe/Resample
+import numpy as np
+import pandas as pd
+
+from config import BOOTSTRAP_CONFIDENCE, BOOTSTRAP_MAX_DRAWS, BOOTSTRAP_RESAMPLES, BOOTSTRAP_SEED
+
+_BLOCK_DRAWS = 2_000_000  # Einträge der Indexmatrix pro Block (Resamples x Ziehungen), ca. 16 MB je Matrix
+
+
+def _statistic_name(statistic):
+    if statistic in ('mean', 'median'):
+        return statistic
+    return f"q{round(float(statistic) * 100):g}"
+
+
+def _statistic_quantile(statistic):
+    return 0.5 if statistic == 'median' else float(statistic)
+
+
+def _segment_quantile(sorted_values, starts, sizes, q):
+    """
+    Quantil (lineare Interpolation wie np.quantile) je Segment entlang der letzten Achse;
+    die Werte sind innerhalb jedes Segments aufsteigend sortiert.
+    """
+    position = q * (sizes - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, sizes - 1)
+    fraction = position - lower
+    low = sorted_values[..., starts + lower]
+    high = sorted_values[..., starts + upper]
+    return low + (high - low) * fraction
+
+
+def bootstrap_groups(values, groups, statistics=('mean',), n_resamples=BOOTSTRAP_RESAMPLES,
+                     confidence=BOOTSTRAP_CONFIDENCE, seed=BOOTSTRAP_SEED, max_draws=BOOTSTRAP_MAX_DRAWS):
+    """
+    Perzentil-Konfidenzintervalle pro Gruppe. `statistics`: 'mean', 'median' und/oder Quantile
+    als Zahl (z. B. 0.9 -> Spalte 'q90'). Ergebnis mit Index = Gruppe und Spalten 'n',
+    '<stat>', '<stat>_CI_Low', '<stat>_CI_High'.
+
+    Die Werte werden nach (Gruppe, Wert) sortiert; jede Spalte der Indexmatrix gehört fest zu
+    einer Gruppe und zieht gleichverteilt aus deren Zeilenbereich. Gruppen mit mehr als
+    `max_draws` Werten ziehen nur `max_draws` Werte pro Resample (m-aus-n-Bootstrap); die
+    Abweichungen vom Schätzwert werden mit sqrt(m / n) auf den vollen Stichprobenumfang skaliert.
+    Mit fester `seed` sind die Intervalle reproduzierbar.
+    """
+    values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    codes, labels = pd.factorize(pd.Series(groups), sort=True)
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    sizes = np.bincount(codes, minlength=len(labels))
+    present = np.flatnonzero(sizes)
+    labels, sizes = labels[present], sizes[present]
+    starts = np.cumsum(sizes) - sizes
+
+    draws = sizes if max_draws is None else np.minimum(sizes, max_draws)
+    draw_starts = np.cumsum(draws) - draws
+    scale = np.sqrt(draws / sizes)
+
+    # Spalten der Indexmatrix: Gruppe, Zeilenbereich der Gruppe
+    column_group = np.repeat(np.arange(len(sizes)), draws)
+    column_start = starts[column_group]
+    column_size = sizes[column_group]
+
+    statistics = list(statistics)
+    needs_sort = any(statistic != 'mean' for statistic in statistics)
+    estimates = {}
+    for statistic in statistics:
+        if statistic == 'mean':
+            estimates[statistic] = np.add.reduceat(values, starts) / sizes if len(sizes) else np.array([])
+        else:
+            estimates[statistic] = _segment_quantile(values, starts, sizes, _statistic_quantile(statistic))
+    resampled = {statistic: np.empty((n_resamples, len(sizes))) for statistic in statistics}
+
+    rng = np.random.default_rng(seed)
+    block = max(_BLOCK_DRAWS // max(int(draws.sum()), 1), 1)
+    for first in range(0, n_resamples if len(sizes) else 0, block):
+        rows = min(block, n_resamples - first)
+        # float64-Zufallszahlen (53 Bit) – gleichverteilt auch für Gruppen mit Millionen Werten
+        index = (rng.random((rows, len(column_group))) * column_size).astype(np.int64)
+        np.minimum(index, column_size - 1, out=index)
+        index += column_start
+        if needs_sort:
+            # Werte sind je Gruppe sortiert und Gruppen belegen aufsteigende Zeilenbereiche:
+            # sortierte Indizes ergeben sortierte Werte innerhalb jedes Segments
+            index.sort(axis=1)
+        sample = values[index]
+        for statistic in statistics:
+            if statistic == 'mean':
+                stat = np.add.reduceat(sample, draw_starts, axis=1) / draws
+            else:
+                stat = _segment_quantile(sample, draw_starts, draws, _statistic_quantile(statistic))
+            resampled[statistic][first:first + rows] = estimates[statistic] + (stat - estimates[statistic]) * scale
+
+    alpha = (1 - confidence) / 2
+    result = pd.DataFrame({'n': sizes}, index=pd.Index(labels, name=getattr(groups, 'name', None)))
+    for statistic in statistics:
+        name = _statistic_name(statistic)
+        low, high = np.quantile(resampled[statistic], [alpha, 1 - alpha], axis=0) if len(sizes) else ([], [])
+        result[name] = estimates[statistic]
+        result[f"{name}_CI_Low"] = low
+        result[f"{name}_CI_High"] = high
+    return result
+
+
+def mean_ci(values, groups, prefix, **kwargs):
+    """
+    Kurzform für Tabellen: Mittelwert-Intervall pro Gruppe als Spalten
+    '<prefix>_CI_Low' / '<prefix>_CI_High' mit der Gruppe als Spalte 'Damage_Type'.
+    """
+    stats = bootstrap_groups(values, groups, statistics=('mean',), **kwargs)
+    return pd.DataFrame({
+        'Damage_Type': stats.index.to_numpy(),
+        f"{prefix}_CI_Low": stats['mean_CI_Low'].to_numpy(),
+        f"{prefix}_CI_High": stats['mean_CI_High'].to_numpy(),
+    })
+
+
+def format_interval(low, high, digits=1):
+    """
+    '[low – high]' für die Konsolentabellen; leer, wenn kein Intervall vorliegt.
+    """
+    low, high = pd.Series(low, dtype=float), pd.Series(high, dtype=float)
+    text = '[' + low.round(digits).astype(str) + ' – ' + high.round(digits).astype(str) + ']'
+    return text.where(low.notna() & high.notna(), '')
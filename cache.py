@@ -0,0 +1,201 @@
+# cache.py
+# 👉 Persistenter Spalten-Cache (Parquet) für die eingelesenen SAP-Excel-Exporte
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from config import CACHE_DIR, CACHE_MAX_BYTES
+
+_cache_settings = {
+    'enabled': True,
+    'rebuild': False,
+    'cache_dir': CACHE_DIR,
+    'max_bytes': CACHE_MAX_BYTES,
+}
+
+
+def configure_cache(enabled=None, rebuild=None, cache_dir=None, max_bytes=None):
+    """
+    Passt die Cache-Einstellungen zur Laufzeit an (z. B. über die CLI-Flags in main.py).
+    """
+    if enabled is not None:
+        _cache_settings['enabled'] = enabled
+    if rebuild is not None:
+        _cache_settings['rebuild'] = rebuild
+    if cache_dir is not None:
+        _cache_settings['cache_dir'] = cache_dir
+    if max_bytes is not None:
+        _cache_settings['max_bytes'] = max_bytes
+
+
+def get_cache_settings():
+    return dict(_cache_settings)
+
+
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return {
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+
+
+def content_hash(path, block_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _entry_key(path, reader, kwargs):
+    raw = json.dumps(
+        [os.path.abspath(path), getattr(reader, '__name__', str(reader)), kwargs],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    # Atomar schreiben, damit parallele Loader keine halben Dateien sehen
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def _is_valid(meta, fingerprint, path):
+    """
+    Ein Eintrag ist gültig, wenn Größe und Änderungszeit passen. Hat sich nur die
+    Änderungszeit verändert (z. B. Datei neu kopiert), entscheidet der Inhalts-Hash.
+    """
+    if meta is None or meta['size'] != fingerprint['size']:
+        return False
+    if meta['mtime_ns'] == fingerprint['mtime_ns']:
+        return True
+    if content_hash(path) == meta['sha256']:
+        meta['mtime_ns'] = fingerprint['mtime_ns']
+        return True
+    return False
+
+
+def _write_frame(df, base_path):
+    try:
+        df.to_parquet(base_path + '.parquet')
+        return 'parquet'
+    except (ImportError, ValueError, TypeError, NotImplementedError) as e:
+        # Gemischte Objektspalten o. ä. – verlustfrei als Pickle ablegen
+        print(f"⚠️ Parquet nicht möglich ({type(e).__name__}), Cache-Eintrag wird als Pickle gespeichert.")
+        df.to_pickle(base_path + '.pkl')
+        return 'pickle'
+
+
+def _read_frame(base_path, fmt):
+    if fmt == 'parquet':
+        return pd.read_parquet(base_path + '.parquet')
+    return pd.read_pickle(base_path + '.pkl')
+
+
+def cached_read(path, reader, **kwargs):
+    """
+    Liest eine Datei über `reader` (z. B. pd.read_excel) und legt das Ergebnis als
+    Parquet im Cache-Verzeichnis ab. Folgeaufrufe laden direkt aus dem Cache,
+    solange Pfad, Größe, Änderungszeit bzw. Inhalts-Hash unverändert sind.
+    """
+    if not _cache_settings['enabled']:
+        return reader(path, **kwargs)
+
+    cache_dir = _cache_settings['cache_dir']
+    os.makedirs(cache_dir, exist_ok=True)
+
+    key = _entry_key(path, reader, kwargs)
+    base_path = os.path.join(cache_dir, key)
+    meta_path = base_path + '.json'
+    fingerprint = file_fingerprint(path)
+
+    meta = None if _cache_settings['rebuild'] else _read_meta(meta_path)
+    if _is_valid(meta, fingerprint, path):
+        try:
+            df = _read_frame(base_path, meta['format'])
+        except (OSError, ValueError):
+            print(f"⚠️ Cache-Eintrag für {os.path.basename(path)} unlesbar, wird neu aufgebaut.")
+        else:
+            _write_meta(meta_path, meta)  # Zugriffszeit für die Verdrängung aktualisieren
+            return df
+
+    df = reader(path, **kwargs)
+
+    _remove_entry(base_path)
+    meta = dict(fingerprint, sha256=content_hash(path), format=_write_frame(df, base_path))
+    _write_meta(meta_path, meta)
+    evict_cache()
+    return df
+
+
+def _remove_entry(base_path):
+    # Parallele Loader (data_loader.load_all) können dieselben Dateien gleichzeitig entfernen
+    for ext in ('.parquet', '.pkl', '.json'):
+        try:
+            os.remove(base_path + ext)
+        except FileNotFoundError:
+            pass
+
+
+def _entry_stat(base_path):
+    """
+    (Zeitpunkt der letzten Nutzung, Größe) eines Eintrags; None, wenn er inzwischen entfernt wurde.
+    """
+    try:
+        mtime = os.path.getmtime(base_path + '.json')
+    except FileNotFoundError:
+        return None
+    size = 0
+    for ext in ('.parquet', '.pkl', '.json'):
+        try:
+            size += os.path.getsize(base_path + ext)
+        except FileNotFoundError:
+            pass
+    return mtime, size
+
+
+def evict_cache(max_bytes=None):
+    """
+    Entfernt die am längsten nicht genutzten Einträge, bis der Cache
+    höchstens `max_bytes` groß ist.
+    """
+    cache_dir = _cache_settings['cache_dir']
+    max_bytes = _cache_settings['max_bytes'] if max_bytes is None else max_bytes
+    if not os.path.isdir(cache_dir):
+        return
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.json'):
+            continue
+        base_path = os.path.join(cache_dir, name[:-len('.json')])
+        stat = _entry_stat(base_path)
+        if stat is not None:
+            entries.append((*stat, base_path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, base_path in sorted(entries):
+        if total <= max_bytes:
+            break
+        _remove_entry(base_path)
+        total -= size
+
+
+def clear_cache():
+    evict_cache(max_bytes=0)
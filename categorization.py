@@ -1,7 +1,12 @@
 import re
+import sys
 import unicodedata
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 
+from instrumentation import instrument
+
 def clean_text(text):
     if pd.isnull(text):
         return ''
@@ -11,9 +16,50 @@ def clean_text(text):
     text = re.sub(r'[^a-zA-Z0-9äöüßáéíóú\s\-]', '', text)
     return text.lower()
 
-def classify_damage_types(df):
-    df['Kurztext_clean'] = df['Kurztext'].apply(clean_text)
-    df['Damage_Type'] = df['Kurztext_clean'].apply(classify_damage_extended_v2)
+_CLEAN_PATTERN = r'[^a-zA-Z0-9äöüßáéíóú\s\-]'
+
+@lru_cache(maxsize=1)
+def _clean_translation_table():
+    """
+    Übersetzungstabelle für str.translate: entfernt alle Kombinationszeichen (Mn) sowie '#'
+    und ersetzt geschützte Leerzeichen – entspricht den Einzelschritten in clean_text.
+    """
+    table = {cp: None for cp in range(sys.maxunicode + 1) if unicodedata.category(chr(cp)) == 'Mn'}
+    table[ord('#')] = None
+    table[ord('\xa0')] = ' '
+    return table
+
+def clean_texts(texts):
+    """
+    Vektorisierte Variante von clean_text für eine ganze Series. Wiederholte Kurztexte
+    werden nur einmal bereinigt und anschließend auf alle Zeilen verteilt.
+    """
+    codes, uniques = pd.factorize(texts)
+    cleaned = (
+        pd.Series(uniques, dtype=object)
+        .astype(str)
+        .str.normalize('NFD')
+        .str.translate(_clean_translation_table())
+        .str.replace(_CLEAN_PATTERN, '', regex=True)
+        .str.lower()
+    )
+    # Code -1 (fehlender Text) zeigt auf den angehängten Leerstring
+    values = np.append(cleaned.to_numpy(dtype=object), '')
+    return pd.Series(values[codes], index=texts.index, name=texts.name)
+
+@instrument()
+def classify_damage_types(df, multi_label=False):
+    """
+    Bereinigt die Kurztexte und ordnet jedem Auftrag ein Schadensbild zu. Mit multi_label=True
+    wird zusätzlich die Bitmaske aller getroffenen Kategorien als 'Damage_Hits' gespeichert
+    (siehe damage_hit_matrix); 'Damage_Type' wird dann daraus abgeleitet.
+    """
+    df['Kurztext_clean'] = clean_texts(df['Kurztext'])
+    if multi_label:
+        df['Damage_Hits'] = damage_hit_bits(df['Kurztext_clean'])
+        df['Damage_Type'] = primary_damage_type(df['Damage_Hits'])
+    else:
+        df['Damage_Type'] = classify_damage_series(df['Kurztext_clean'])
     return df
 
 damage_keywords = {
@@ -29,9 +75,115 @@ damage_keywords = {
     'unknown': []
 }
 
+def compile_damage_keywords(keywords):
+    """
+    Fasst alle Muster zu einem einzigen regulären Ausdruck zusammen. Der erste Lookahead
+    findet Positionen mit irgendeinem Treffer, danach prüft je ein optionaler Lookahead pro
+    Kategorie, ob deren Muster dort beginnt. So liefert ein finditer-Durchlauf alle Kategorien
+    eines Textes. Gibt Ausdruck, Kategorien (Prioritätsreihenfolge) und Gruppennummern zurück.
+    """
+    categories = list(keywords)
+    any_patterns = []
+    category_groups = []
+    for category_idx, category in enumerate(categories):
+        patterns = keywords[category]
+        if not patterns:
+            continue
+        combined = "|".join(f"(?:{pattern})" for pattern in patterns)
+        any_patterns.append(combined)
+        category_groups.append((category_idx, f"(?=(?P<c{category_idx}>{combined})?)"))
+    if not any_patterns:
+        return None, categories, []
+    regex = re.compile("(?=" + "|".join(any_patterns) + ")" + "".join(group for _, group in category_groups))
+    group_indices = [(category_idx, regex.groupindex[f"c{category_idx}"]) for category_idx, _ in category_groups]
+    return regex, categories, group_indices
+
+_damage_regex, _damage_categories, _damage_groups = compile_damage_keywords(damage_keywords)
+
+def damage_hit_bits_text(text):
+    """
+    Bitmaske aller Kategorien, deren Muster im Text vorkommen (Bit i = i-te Kategorie in damage_keywords).
+    """
+    bits = 0
+    if _damage_regex is None:
+        return bits
+    for match in _damage_regex.finditer(text):
+        for category_idx, group_idx in _damage_groups:
+            if match.group(group_idx) is not None:
+                bits |= 1 << category_idx
+    return bits
+
+def primary_damage_type(bits):
+    """
+    Leitet aus Bitmasken (Series) die Hauptkategorie ab: das niedrigste gesetzte Bit,
+    also die Kategorie mit der höchsten Priorität; ohne Treffer 'other'.
+    """
+    values = np.asarray(bits, dtype=np.int64)
+    lowest = values & -values
+    idx = np.zeros(len(values), dtype=np.int64)
+    hit = lowest > 0
+    idx[hit] = np.log2(lowest[hit]).astype(np.int64)
+    labels = np.array(_damage_categories, dtype=object)[idx]
+    labels[~hit] = 'other'
+    return pd.Series(labels, index=getattr(bits, 'index', None), name='Damage_Type')
+
 def classify_damage_extended_v2(text):
-    for category, patterns in damage_keywords.items():
-        for pattern in patterns:
-            if re.search(pattern, text):
-                return category
-    return 'other'
+    """
+    Liefert die erste Kategorie aus damage_keywords (Prioritätsreihenfolge), deren Muster im Text vorkommt.
+    """
+    bits = damage_hit_bits_text(text)
+    if bits == 0:
+        return 'other'
+    return _damage_categories[(bits & -bits).bit_length() - 1]
+
+def damage_hit_bits(texts):
+    """
+    Bitmaske pro Zeile für eine ganze Series bereinigter Kurztexte (ein Scan pro eindeutigem Text).
+    """
+    codes, uniques = pd.factorize(texts)
+    # Code -1 (fehlender Text) zeigt auf den angehängten Eintrag ohne Treffer
+    masks = np.array([damage_hit_bits_text(text) for text in uniques] + [0], dtype=np.int64)
+    return pd.Series(masks[codes], index=texts.index, name='Damage_Hits')
+
+def damage_hit_matrix(bits):
+    """
+    Wandelt Bitmasken in eine boolesche Treffermatrix mit einer Spalte pro Kategorie in damage_keywords.
+    """
+    values = np.asarray(bits, dtype=np.int64)
+    matrix = (values[:, None] >> np.arange(len(_damage_categories))) & 1
+    return pd.DataFrame(matrix.astype(bool), index=getattr(bits, 'index', None), columns=_damage_categories)
+
+def hit_rate(hit_matrix):
+    """
+    Anteil (in %) der Aufträge mit mindestens einem Kategorietreffer.
+    """
+    if hit_matrix.empty:
+        return 0.0
+    return hit_matrix.to_numpy().any(axis=1).mean() * 100
+
+def category_cooccurrence(hit_matrix):
+    """
+    Kategorie x Kategorie: Anzahl Aufträge, die beide Kategorien treffen (Diagonale = Treffer je Kategorie).
+    """
+    values = hit_matrix.to_numpy(dtype=np.int64)
+    return pd.DataFrame(values.T @ values, index=hit_matrix.columns, columns=hit_matrix.columns)
+
+def category_overlap_counts(hit_matrix):
+    """
+    Anzahl Aufträge nach Anzahl getroffener Kategorien (0 = nicht klassifiziert, >1 = Überschneidung).
+    """
+    return (
+        pd.Series(hit_matrix.to_numpy().sum(axis=1), name='Kategorien')
+        .value_counts()
+        .sort_index()
+        .rename('Auftragsanzahl')
+    )
+
+def classify_damage_series(texts):
+    """
+    Klassifiziert eine ganze Series bereinigter Kurztexte; jeder eindeutige Text wird nur einmal ausgewertet.
+    """
+    codes, uniques = pd.factorize(texts)
+    labels = np.array([classify_damage_extended_v2(text) for text in uniques] + ['other'], dtype=object)
+    # Code -1 (fehlender Text) zeigt auf den angehängten 'other'-Eintrag
+    return pd.Series(labels[codes], index=texts.index, name='Damage_Type')
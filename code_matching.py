@@ -0,0 +1,270 @@
+# code_matching.py
+# 👉 Zeichen-n-Gramm-Ähnlichkeitsindex (TF-IDF, dünn besetzt): ordnet Aufträgen ohne Meldung anhand des
+#    Kurztexts den wahrscheinlichsten SAP-Schadenscode ('Kurztext zum Code') zu – als .npz speicherbar
+import argparse
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from categorization import clean_texts
+from config import CODE_INDEX_DIR
+from instrumentation import instrument
+from sap_lookup import _csr, _gather
+
+NGRAM_SIZE = 3       # Zeichen-Trigramme; Schlüssel = 3 Unicode-Codepoints à 21 Bit in einem int64
+TOP_K = 3
+MIN_SCORE = 0.2      # Kosinus-Ähnlichkeit, ab der eine Zuordnung übernommen wird
+_CODEPOINT_BITS = 21
+_SCORE_BLOCK = 4_000_000  # Einträge der dichten Score-Matrix pro Block (Abfragen x Codes)
+
+
+def ngram_keys(texts, n=NGRAM_SIZE):
+    """
+    Alle Zeichen-n-Gramme der Texte (mit je einem Leerzeichen davor und dahinter) als
+    (Textnummer, Schlüssel). Die Texte werden einmal zu einem Codepoint-Array verbunden;
+    die Schlüssel entstehen durch Verschieben und Verodern ohne Schleife pro Text.
+    """
+    if not 1 <= n <= 3:
+        raise ValueError("NGRAM_SIZE muss zwischen 1 und 3 liegen (Schlüssel in 64 Bit).")
+    padded = [f" {text} " for text in texts]
+    lengths = np.fromiter(map(len, padded), dtype=np.int64, count=len(padded))
+    codepoints = np.frombuffer(''.join(padded).encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+    ends = np.repeat(np.cumsum(lengths), lengths)
+    owner = np.repeat(np.arange(len(padded)), lengths)
+    valid = np.flatnonzero(np.arange(len(codepoints)) + n <= ends)
+    keys = np.zeros(len(valid), dtype=np.int64)
+    for offset in range(n):
+        keys = (keys << _CODEPOINT_BITS) | codepoints[valid + offset]
+    return owner[valid], keys
+
+
+def _term_weights(docs, grams, n_grams, idf):
+    """
+    TF-IDF pro (Text, n-Gramm) mit L2-normierten Zeilen; gibt Text, n-Gramm und Gewicht zurück.
+    """
+    pairs, tf = np.unique(docs * n_grams + grams, return_counts=True)
+    docs, grams = pairs // n_grams, pairs % n_grams
+    weights = tf * idf[grams]
+    norms = np.sqrt(np.bincount(docs, weights=weights ** 2))
+    return docs, grams, weights / norms[docs]
+
+
+class CodeMatchIndex:
+    """
+    Schwerpunktvektoren pro SAP-Schadenscode im n-Gramm-Raum, nach n-Gramm invertiert (CSR):
+    postings[indptr[g]:indptr[g + 1]] sind die Codes mit n-Gramm g samt Gewicht. Eine Abfrage
+    berührt damit nur die Codes, die mindestens ein n-Gramm mit dem Kurztext teilen.
+    """
+
+    def __init__(self, vocab, idf, indptr, label_ids, weights, labels):
+        self.vocab = vocab
+        self.idf = idf
+        self.indptr = indptr
+        self.label_ids = label_ids
+        self.weights = weights
+        self.labels = labels
+
+    @classmethod
+    def build(cls, texts, labels):
+        """
+        `texts` (bereinigte Kurztexte) und `labels` (zugehöriger 'Kurztext zum Code') gleicher Länge.
+        Wiederholte Texte werden nur einmal zerlegt und über ihre Häufigkeit gewichtet.
+        """
+        pairs = pd.DataFrame({'text': np.asarray(texts, dtype=object), 'label': np.asarray(labels, dtype=object)}).dropna()
+        pairs = pairs.groupby(['text', 'label'], sort=False).size().reset_index(name='count')
+        text_ids, unique_texts = pd.factorize(pairs['text'])
+        label_ids, unique_labels = pd.factorize(pairs['label'], sort=True)
+
+        docs, keys = ngram_keys(unique_texts)
+        vocab, grams = np.unique(keys, return_inverse=True)
+        # Dokumenthäufigkeit über eindeutige Texte, geglättete IDF wie bei sklearn
+        doc_freq = np.bincount(np.unique(docs * len(vocab) + grams) % len(vocab), minlength=len(vocab))
+        idf = np.log((1 + len(unique_texts)) / (1 + doc_freq)) + 1
+        docs, grams, weights = _term_weights(docs, grams, len(vocab), idf)
+
+        # Summe der Textvektoren pro Code (gewichtet mit der Häufigkeit des Paars), dann normieren
+        doc_indptr, doc_entries = _csr(docs, np.arange(len(docs)), len(unique_texts))
+        owner, entries = _gather(doc_indptr, doc_entries, text_ids)
+        centroid_keys, inverse = np.unique(label_ids[owner] * len(vocab) + grams[entries], return_inverse=True)
+        centroid = np.bincount(inverse, weights=weights[entries] * pairs['count'].to_numpy()[owner])
+        centroid_labels, centroid_grams = centroid_keys // len(vocab), centroid_keys % len(vocab)
+        norms = np.sqrt(np.bincount(centroid_labels, weights=centroid ** 2))
+        centroid /= norms[centroid_labels]
+
+        indptr, order = _csr(centroid_grams, np.arange(len(centroid)), len(vocab))
+        return cls(vocab, idf, indptr, centroid_labels[order].astype(np.int32),
+                   centroid[order].astype(np.float32), np.asarray(unique_labels, dtype=str))
+
+    def _query_weights(self, texts):
+        docs, keys = ngram_keys(texts)
+        grams = np.searchsorted(self.vocab, keys)
+        known = grams < len(self.vocab)
+        known[known] = self.vocab[grams[known]] == keys[known]
+        return _term_weights(docs[known], grams[known], len(self.vocab), self.idf)
+
+    def _scores(self, texts):
+        """
+        Kosinus-Ähnlichkeit (Abfragen x Codes) als dichte Matrix über die invertierten Listen.
+        """
+        docs, grams, weights = self._query_weights(texts)
+        owner, postings = _gather(self.indptr, np.arange(len(self.label_ids)), grams)
+        n_labels = len(self.labels)
+        flat = docs[owner] * n_labels + self.label_ids[postings]
+        scores = np.bincount(flat, weights=weights[owner] * self.weights[postings], minlength=len(texts) * n_labels)
+        return scores.reshape(len(texts), n_labels)
+
+    def top_k(self, texts, k=TOP_K):
+        """
+        Die k ähnlichsten Codes pro Text: (Code-Indizes in self.labels, Scores), je Form (n, k),
+        absteigend sortiert. Jeder eindeutige Text wird nur einmal bewertet.
+        """
+        codes, uniques = pd.factorize(pd.Series(texts, dtype=object).fillna(''))
+        k = min(k, len(self.labels))
+        best = np.empty((len(uniques), k), dtype=np.int64)
+        best_scores = np.empty((len(uniques), k))
+        block = max(_SCORE_BLOCK // max(len(self.labels), 1), 1)
+        for start in range(0, len(uniques), block):
+            scores = self._scores(uniques[start:start + block])
+            part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            part_scores = np.take_along_axis(scores, part, axis=1)
+            order = np.argsort(-part_scores, axis=1, kind='stable')
+            best[start:start + block] = np.take_along_axis(part, order, axis=1)
+            best_scores[start:start + block] = np.take_along_axis(part_scores, order, axis=1)
+        return best[codes], best_scores[codes]
+
+    def match(self, texts, k=TOP_K):
+        """
+        Top-k als Tabelle mit einer Zeile pro Text und Rang: Position, Rang, 'Kurztext zum Code', Score.
+        """
+        best, scores = self.top_k(texts, k)
+        n, k = best.shape
+        return pd.DataFrame({
+            'Position': np.repeat(np.arange(n), k),
+            'Rang': np.tile(np.arange(1, k + 1), n),
+            'Kurztext zum Code': self.labels[best.ravel()],
+            'Score': scores.ravel(),
+        })
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, vocab=self.vocab, idf=self.idf, indptr=self.indptr,
+                 label_ids=self.label_ids, weights=self.weights, labels=self.labels)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['vocab'], data['idf'], data['indptr'], data['label_ids'], data['weights'], data['labels'])
+
+
+def _order_texts(df_orders):
+    if 'Kurztext_clean' in df_orders.columns:
+        return df_orders['Kurztext_clean'].astype(object)
+    return clean_texts(df_orders['Kurztext'])
+
+
+def training_pairs(df_orders, sap_index, df_failurecodes=None):
+    """
+    Trainingspaare (Text, Code-Kurztext): der Katalog selbst ('Kurztext zum Code' -> sich selbst)
+    und alle Aufträge, deren Meldung über den SAP-Nachschlage-Index einen Code hat.
+    """
+    rows, text_ids, _ = sap_index.resolve(df_orders['Meldung'])
+    texts = [_order_texts(df_orders).to_numpy(dtype=object)[rows]]
+    labels = [sap_index.texts[text_ids]]
+    if df_failurecodes is not None:
+        catalog = df_failurecodes['Kurztext zum Code'].dropna()
+        texts.append(clean_texts(catalog).to_numpy(dtype=object))
+        labels.append(catalog.astype(str).to_numpy())
+    return pd.DataFrame({'text': np.concatenate(texts), 'label': np.concatenate(labels).astype(object)})
+
+
+def index_key(pairs):
+    sha = hashlib.sha256()
+    sha.update(f"n={NGRAM_SIZE}".encode('utf-8'))
+    sha.update(pd.util.hash_pandas_object(pairs, index=False).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+@instrument()
+def load_or_build_code_index(df_orders, sap_index, df_failurecodes=None, index_dir=CODE_INDEX_DIR):
+    """
+    Lädt den n-Gramm-Index aus `index_dir`, wenn er für diese Trainingspaare schon gebaut wurde,
+    sonst bauen und speichern (vgl. sap_lookup.load_or_build_index).
+    """
+    pairs = training_pairs(df_orders, sap_index, df_failurecodes)
+    path = os.path.join(index_dir, f"{index_key(pairs)[:32]}.npz")
+    if os.path.exists(path):
+        try:
+            return CodeMatchIndex.load(path)
+        except (OSError, ValueError, KeyError):
+            print("⚠️ Code-Index unlesbar, wird neu aufgebaut.")
+    index = CodeMatchIndex.build(pairs['text'], pairs['label'])
+    index.save(path)
+    return index
+
+
+@instrument()
+def label_uncoded_orders(df_orders, code_index, sap_index, min_score=MIN_SCORE):
+    """
+    Aufträge ohne auflösbare Meldung mit dem ähnlichsten SAP-Schadenscode: Spalten
+    'Kurztext zum Code' und 'Score' (NaN/leer, wenn der beste Score unter `min_score` liegt).
+    """
+    rows, _, _ = sap_index.resolve(df_orders['Meldung'])
+    uncoded = np.setdiff1d(np.arange(len(df_orders)), rows)
+    subset = df_orders.iloc[uncoded]
+    best, scores = code_index.top_k(_order_texts(subset), k=1)
+    accepted = scores[:, 0] >= min_score
+    labelled = subset[[col for col in ('Auftrag', 'Kurztext', 'Order_Duration') if col in subset.columns]].copy()
+    labelled['Kurztext zum Code'] = np.where(accepted, code_index.labels[best[:, 0]], None)
+    labelled['Score'] = scores[:, 0]
+    return labelled
+
+
+def predicted_damage_stats(labelled):
+    """
+    Durchschnittliche Auftragsdauer und Anzahl pro zugeordnetem Code – gleiche Spalten wie
+    SapLookupIndex.damage_stats.
+    """
+    stats = (
+        labelled.dropna(subset=['Kurztext zum Code'])
+        .groupby('Kurztext zum Code')['Order_Duration']
+        .agg(['mean', 'count'])
+        .reset_index()
+        .rename(columns={'mean': 'Durchschnittliche_Auftragsdauer', 'count': 'Auftragsanzahl'})
+    )
+    return stats.sort_values('Durchschnittliche_Auftragsdauer', ascending=False, ignore_index=True)
+
+
+def print_code_matching(labelled):
+    accepted = labelled['Kurztext zum Code'].notna()
+    print(f"\n🔤 Aufträge ohne Meldung: {len(labelled)}, davon per Kurztext einem SAP-Code zugeordnet: "
+          f"{int(accepted.sum())} (Score ≥ {MIN_SCORE})")
+    if 'Order_Duration' in labelled.columns and accepted.any():
+        print(predicted_damage_stats(labelled))
+
+
+if __name__ == "__main__":
+    from data_loader import load_failurecode_data, load_notification_data, load_order_data
+    from sap_lookup import load_or_build_index
+
+    parser = argparse.ArgumentParser(description="SAP-Schadenscodes für Aufträge ohne Meldung aus dem Kurztext ableiten")
+    parser.add_argument('--top', type=int, default=TOP_K, help="Anzahl Vorschläge pro Auftrag")
+    parser.add_argument('--output', help="Vorschläge als CSV (;) speichern")
+    args = parser.parse_args()
+
+    df_orders = load_order_data()
+    df_failurecodes = load_failurecode_data()
+    sap_index = load_or_build_index(load_notification_data(), df_failurecodes)
+    code_index = load_or_build_code_index(df_orders, sap_index, df_failurecodes)
+    labelled = label_uncoded_orders(df_orders, code_index, sap_index)
+    print_code_matching(labelled)
+    if args.output:
+        suggestions = code_index.match(_order_texts(df_orders.loc[labelled.index]), k=args.top)
+        suggestions.insert(0, 'Auftrag', labelled['Auftrag'].to_numpy()[suggestions.pop('Position')])
+        suggestions.to_csv(args.output, sep=';', index=False)
+        print(f"💾 Vorschläge gespeichert: {args.output}")
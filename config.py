@@ -1,7 +1,53 @@
 # config.py
 # 👉 Zentrale Konfigurationsdatei für Dateipfade etc.
+import os
 
 SAP_ORDER_PATH = r"C:/Users/m.mackic/Desktop/Masterarbeit/Correlation/SAP_Orders_4000077_2.xlsx"
 MACHINE_DATA_PATH = r"C:/Users/m.mackic/Desktop/Masterarbeit/Correlation/Reporting_4000077_41023.csv"
 SAP_NOTIFICATION_PATH = r"C:/Users/m.mackic/Desktop/Masterarbeit/Correlation/notifications_and_codes.XLSX"
 SAP_FAILURECODES_PATH = r"C:/Users/m.mackic/Desktop/Masterarbeit/Correlation/failure_codes.XLSX"
+
+# 👉 Cache für die eingelesenen Excel-Exporte (siehe cache.py)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+CACHE_MAX_BYTES = 2 * 1024 ** 3  # 2 GB, älteste Einträge werden zuerst entfernt
+
+# 👉 Inkrementelle Tagesläufe (incremental.py): Wasserstand und Downtime-Aggregate pro Reporting-Datei
+INCREMENTAL_DIR = os.path.join(CACHE_DIR, "incremental")
+
+# 👉 Vorab aggregierter Downtime-Würfel pro Tag und Arbeitsplatz (downtime_cube.py)
+DOWNTIME_CUBE_DIR = os.path.join(CACHE_DIR, "cubes")
+# Pipeline-Würfel heißen nach dem Inhalts-Hash (downtime_cube.cube_path); report_generator.py nutzt eine eigene Datei
+REPORT_CUBE_PATH = os.path.join(DOWNTIME_CUBE_DIR, "report_generator.sqlite")
+
+# 👉 Nachschlage-Index Meldung -> Schadenscode -> Kurztext (sap_lookup.py)
+SAP_INDEX_DIR = os.path.join(CACHE_DIR, "sap_index")
+
+# 👉 n-Gramm-Index Kurztext -> SAP-Schadenscode für Aufträge ohne Meldung (code_matching.py)
+CODE_INDEX_DIR = os.path.join(CACHE_DIR, "code_index")
+
+# 👉 Bootstrap-Konfidenzintervalle pro Schadensbild (bootstrap.py)
+BOOTSTRAP_RESAMPLES = 10_000
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_SEED = 42
+BOOTSTRAP_MAX_DRAWS = 1_000  # größere Gruppen: m-aus-n-Bootstrap mit m = BOOTSTRAP_MAX_DRAWS (None = immer vollständig)
+
+# 👉 Zeilen pro Block beim Streaming der Reporting-CSV
+MACHINE_CHUNK_SIZE = 200_000
+
+# 👉 Batch-Modus (batch_runner.py): Verzeichnis mit mehreren Werks-/Arbeitsplatz-Exporten
+BATCH_DATA_DIR = os.path.dirname(SAP_ORDER_PATH)
+BATCH_MAX_WORKERS = None  # None = Anzahl CPU-Kerne
+# Dateinamensmuster (Groß-/Kleinschreibung egal); <plant> = Werk, <work_center> = Arbeitsplatz
+BATCH_ORDER_PATTERN = r"SAP_Orders_(?P<plant>[^_]+)_.*\.xlsx"
+BATCH_MACHINE_PATTERN = r"Reporting_(?P<plant>[^_]+)_(?P<work_center>[^.]+)\.csv"
+# Meldungen/Fehlercodes: werksspezifisch (…_<plant>.xlsx) oder gemeinsam für alle Werke
+BATCH_NOTIFICATION_PATTERN = r"notifications_and_codes(?:_(?P<plant>[^.]+))?\.xlsx"
+BATCH_FAILURECODE_PATTERN = r"failure_codes(?:_(?P<plant>[^.]+))?\.xlsx"
+
+# 👉 Headless-Rendering der Grafiken (figure_rendering.py)
+FIGURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "figures")
+FIGURE_MAX_WORKERS = None  # None = Anzahl CPU-Kerne
+
+# 👉 PDF-Berichte (report_generator.py)
+REPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+REPORT_LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "csm_greiner-packaging_RGB_a3ba649772.png")
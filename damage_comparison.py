@@ -1,12 +1,21 @@
 import pandas as pd
 from tabulate import tabulate  # Optional: für schönere Konsolenausgabe
 
-def compare_damage_type_durations(df_text, df_sap, df_machine):
+from bootstrap import format_interval
+from instrumentation import instrument
+from reliability import reliability_columns
+
+@instrument()
+def compare_damage_type_durations(df_text, df_sap, df_machine, df_reliability=None, verbose=True):
     """
     Führt eine Vergleichstabelle zusammen aus:
     - Kurztextanalyse (df_text)
     - SAP-Damage-Types (df_sap)
     - Maschinen-Damage-Typen (df_machine)
+    - optional MTBF/MTTR aus reliability.compute_reliability (df_reliability)
+    Vorhandene Bootstrap-Intervalle ('<Spalte>_CI_Low'/'<Spalte>_CI_High', siehe bootstrap.py) werden
+    übernommen und in der Konsolentabelle als 'KI_Text', 'KI_SAP' bzw. 'KI_Machine' angezeigt.
+    Mit verbose=False wird die Tabelle nicht ausgegeben (separat über print_damage_comparison).
     """
 
     # Einheitliche Zuordnung der Schadensbilder – vorher alles lowercase
@@ -28,8 +37,11 @@ def compare_damage_type_durations(df_text, df_sap, df_machine):
         "peripheral equipment": "Peripheral Equipment"
     }
 
+    if df_reliability is not None:
+        df_reliability = df_reliability.copy()
+
     # Mapping anwenden – vereinheitlichen und ggf. Original erhalten
-    for df in [df_text, df_sap, df_machine]:
+    for df in [df_text, df_sap, df_machine] + ([df_reliability] if df_reliability is not None else []):
         if 'Damage_Type' in df.columns:
             df['Damage_Type'] = (
                 df['Damage_Type']
@@ -43,8 +55,13 @@ def compare_damage_type_durations(df_text, df_sap, df_machine):
     # Downtime von Stunden in Minuten umrechnen
     if 'Avg_Downtime_Minutes' in df_machine.columns:
         df_machine = df_machine.copy()
+        machine_cols = ['Damage_Type', 'Downtime_Machine']
         df_machine['Downtime_Machine'] = df_machine['Avg_Downtime_Minutes'] * 60
-        df_machine = df_machine[['Damage_Type', 'Downtime_Machine']]
+        for bound in ('CI_Low', 'CI_High'):
+            if f"Avg_Downtime_Minutes_{bound}" in df_machine.columns:
+                df_machine[f"Downtime_Machine_{bound}"] = df_machine[f"Avg_Downtime_Minutes_{bound}"] * 60
+                machine_cols.append(f"Downtime_Machine_{bound}")
+        df_machine = df_machine[machine_cols]
 
     # Outer Join von Textanalyse und SAP
     df_combined = pd.merge(
@@ -63,16 +80,43 @@ def compare_damage_type_durations(df_text, df_sap, df_machine):
         how='outer'
     )
 
+    if df_reliability is not None:
+        # Nach dem Mapping über Arbeitsplätze zusammenfassen, eine Zeile pro Schadensbild
+        df_reliability = reliability_columns(df_reliability)
+        df_combined = pd.merge(
+            df_combined,
+            df_reliability,
+            on='Damage_Type',
+            how='outer'
+        )
+
     # Optional: auf 1 Nachkommastelle runden
     df_combined = df_combined.round(1)
 
+    if verbose:
+        print_damage_comparison(df_combined)
+    return df_combined
+
+
+def print_damage_comparison(df_combined):
+    """
+    Konsolentabelle zu compare_damage_type_durations: Mittelwerte, Konfidenzintervalle und MTBF/MTTR.
+    """
+    # Konfidenzintervalle für die Anzeige direkt neben den Mittelwerten als '[unten – oben]'
+    display = df_combined[['Damage_Type']].copy()
+    for column, label in (('Order_Duration_Text', 'KI_Text'), ('Order_Duration', 'KI_SAP'), ('Downtime_Machine', 'KI_Machine')):
+        display[column] = df_combined[column]
+        if f"{column}_CI_Low" in df_combined.columns:
+            display[label] = format_interval(df_combined[f"{column}_CI_Low"], df_combined[f"{column}_CI_High"]).to_numpy()
+    for column in df_combined.columns:
+        if column.startswith(('MTBF_', 'MTTR_')):
+            display[column] = df_combined[column]
+
     # Ausgabe als Tabelle in der Konsole
     print("\n📊 Vergleich der durchschnittlichen Auftrags-/Stillstandszeiten:")
     print(tabulate(
-        df_combined[['Damage_Type', 'Order_Duration_Text', 'Order_Duration', 'Downtime_Machine']],
+        display,
         headers='keys',
         tablefmt='fancy_grid',
         showindex=False
     ))
-
-    return df_combined
@@ -1,24 +1,136 @@
 # data_loader.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import pandas as pd
 from config import (
     SAP_ORDER_PATH,
     MACHINE_DATA_PATH,
     SAP_NOTIFICATION_PATH,
-    SAP_FAILURECODES_PATH
+    SAP_FAILURECODES_PATH,
+    MACHINE_CHUNK_SIZE
+)
+from cache import cached_read, configure_cache, get_cache_settings
+from instrumentation import (
+    clear_records, configure_instrumentation, get_instrumentation_settings, get_records, instrument, merge_records
 )
 
-def load_order_data():
-    return pd.read_excel(SAP_ORDER_PATH)
+@instrument()
+def load_order_data(path=SAP_ORDER_PATH):
+    return cached_read(path, pd.read_excel)
 
-def load_machine_data():
-    return pd.read_csv(MACHINE_DATA_PATH, delimiter=';', encoding='latin-1', header=0)
+@instrument()
+def load_machine_data(path=MACHINE_DATA_PATH):
+    return pd.read_csv(path, delimiter=';', encoding='latin-1', header=0)
 
-def load_notification_data():
-    return pd.read_excel(SAP_NOTIFICATION_PATH)
+def iter_machine_data(chunksize=MACHINE_CHUNK_SIZE, path=MACHINE_DATA_PATH):
+    """
+    Liest die Reporting-CSV in Blöcken von `chunksize` Zeilen ein,
+    damit der Speicherbedarf nicht mit der Dateigröße wächst.
+    """
+    with pd.read_csv(path, delimiter=';', encoding='latin-1', header=0, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk
 
-def load_failurecode_data():
-    return pd.read_excel(SAP_FAILURECODES_PATH)
+@instrument()
+def load_notification_data(path=SAP_NOTIFICATION_PATH):
+    return cached_read(path, pd.read_excel)
+
+@instrument()
+def load_failurecode_data(path=SAP_FAILURECODES_PATH):
+    return cached_read(path, pd.read_excel)
 
 def load_data():
     return load_order_data(), load_machine_data()
 
+
+# 👉 Alle vier Quellen parallel laden (Excel-Parsing ist CPU-gebunden und voneinander unabhängig)
+_LOADERS = {
+    'machine': load_machine_data,
+    'orders': load_order_data,
+    'notifications': load_notification_data,
+    'failurecodes': load_failurecode_data,
+}
+
+
+def _optimize(name, df):
+    # Import hier, damit data_loader ohne schema nutzbar bleibt
+    from schema import optimize_machine_data, optimize_order_data
+    if name == 'machine':
+        return optimize_machine_data(df)
+    if name == 'orders':
+        return optimize_order_data(df)
+    return df
+
+
+def _load_source(name, path, cache_settings, optimize, instrumentation_settings=None):
+    """
+    Läuft im Worker-Prozess: übernimmt die Cache- und Messeinstellungen des Hauptprozesses
+    (unter Windows startet jeder Worker mit frischen Modulen) und lädt eine Quelle.
+    Mit `instrumentation_settings` werden die Messungen des Workers zurückgegeben, damit der
+    Hauptprozess sie übernehmen kann; ohne (Aufruf im eigenen Prozess) landen sie direkt dort.
+    """
+    configure_cache(**cache_settings)
+    if instrumentation_settings is not None:
+        configure_instrumentation(**instrumentation_settings)
+        # Bei fork geerbte bzw. aus früheren Aufgaben des Workers stammende Messungen nicht erneut melden
+        clear_records()
+    start = time.perf_counter()
+    df = _LOADERS[name](path)
+    if optimize:
+        df = _optimize(name, df)
+    records = get_records() if instrumentation_settings is not None else []
+    return name, df, time.perf_counter() - start, records
+
+
+@instrument()
+def load_all(paths=None, max_workers=None, optimize=False, parallel=True):
+    """
+    Lädt Maschinendaten, Aufträge, Meldungen und Fehlercodes gleichzeitig in einem Prozesspool.
+    Die Gesamtdauer nähert sich damit der langsamsten Einzeldatei statt der Summe.
+    - paths: optionale abweichende Pfade, z. B. {'orders': '...xlsx'}
+    - optimize: Auftrags-/Maschinendaten direkt im Worker in das kompakte Schema (schema.py)
+      umwandeln – das verkleinert auch die Übergabe an den Hauptprozess
+    - parallel=False lädt nacheinander im eigenen Prozess (z. B. zum Debuggen)
+    Gibt (frames, timings) zurück; timings enthält die Sekunden pro Quelle und 'total'.
+    """
+    default_paths = {
+        'machine': MACHINE_DATA_PATH,
+        'orders': SAP_ORDER_PATH,
+        'notifications': SAP_NOTIFICATION_PATH,
+        'failurecodes': SAP_FAILURECODES_PATH,
+    }
+    default_paths.update(paths or {})
+    cache_settings = get_cache_settings()
+    instrumentation_settings = get_instrumentation_settings()
+    start = time.perf_counter()
+
+    frames, timings = {}, {}
+    if parallel:
+        max_workers = max_workers or min(len(_LOADERS), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_load_source, name, default_paths[name], cache_settings, optimize, instrumentation_settings)
+                for name in _LOADERS
+            ]
+            for future in as_completed(futures):
+                name, df, seconds, records = future.result()
+                frames[name], timings[name] = df, seconds
+                merge_records(records)
+    else:
+        for name in _LOADERS:
+            _, frames[name], timings[name], _ = _load_source(name, default_paths[name], cache_settings, optimize)
+
+    timings['total'] = time.perf_counter() - start
+    # Reihenfolge wie bei den Einzel-Loadern
+    return {name: frames[name] for name in _LOADERS}, timings
+
+
+def print_load_timings(timings):
+    print("\n📦 Ladezeiten:")
+    for name, seconds in timings.items():
+        if name != 'total':
+            print(f"   {name:<14} {seconds:6.2f} s")
+    total_sources = sum(seconds for name, seconds in timings.items() if name != 'total')
+    print(f"   {'gesamt':<14} {timings['total']:6.2f} s (Summe der Einzelquellen: {total_sources:.2f} s)")
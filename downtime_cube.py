@@ -0,0 +1,234 @@
+# downtime_cube.py
+# 👉 Vorab aggregierter Downtime-Würfel (SQLite): Summen und Anzahlen pro Tag und Arbeitsplatz für Downtime
+#    und die Schadensbild-Spalten – Zeiträume und Arbeitsplatz-Auswahlen als indizierte Bereichsabfragen
+import hashlib
+import os
+import sqlite3
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from config import DOWNTIME_CUBE_DIR
+from downtime_from_machine_damage_types import DAMAGE_COLUMNS, READABLE_NAMES
+from duration_parsing import extract_decimal
+from instrumentation import instrument
+from interval_matching import work_center_keys
+from timestamp_parsing import parse_timestamps
+
+# Spaltenname im Würfel -> Spalte der Maschinendaten
+MEASURES = {'downtime': 'Downtime'}
+MEASURES.update({READABLE_NAMES[col].lower().replace(' ', '_'): col for col in DAMAGE_COLUMNS})
+
+_VALUE_COLUMNS = ['rows'] + [f"{measure}_{part}" for measure in MEASURES for part in ('sum', 'sumsq', 'count')]
+
+
+def _schema():
+    values = ',\n    '.join(
+        f"{column} INTEGER NOT NULL DEFAULT 0" if column == 'rows' or column.endswith('_count')
+        else f"{column} REAL NOT NULL DEFAULT 0"
+        for column in _VALUE_COLUMNS
+    )
+    return f"""
+CREATE TABLE IF NOT EXISTS downtime_cube (
+    day TEXT NOT NULL,
+    work_center TEXT NOT NULL,
+    {values},
+    PRIMARY KEY (day, work_center)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_downtime_cube_work_center ON downtime_cube (work_center, day);
+"""
+
+
+def _date_text(value):
+    return None if value is None or pd.isna(value) else pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def aggregate_machine_rows(df_machine):
+    """
+    Verdichtet vorverarbeitete Maschinendaten auf eine Zeile pro Tag und Arbeitsplatz:
+    Zeilenzahl sowie Summe, Quadratsumme und Anzahl gültiger Werte je Kennzahl (fehlende Werte zählen nicht).
+    """
+    days = parse_timestamps(df_machine['Calendar day']).dt.normalize()
+    work_centers = pd.Series(work_center_keys(df_machine['Work Center'].ffill()), index=df_machine.index)
+
+    values = pd.DataFrame(index=df_machine.index)
+    if 'Downtime' in df_machine.columns:
+        values['downtime'] = pd.to_numeric(df_machine['Downtime'], errors='coerce').astype(float)
+    present = [col for col in DAMAGE_COLUMNS if col in df_machine.columns]
+    if present:
+        parsed = extract_decimal(df_machine[present])
+        for measure, col in MEASURES.items():
+            if col in present:
+                values[measure] = parsed[col].astype(float)
+
+    keys = [days.rename('day'), work_centers.rename('work_center')]
+    grouped = values.groupby(keys)
+    squares = (values ** 2).groupby(keys).sum()
+    cube = pd.DataFrame({'rows': grouped.size()})
+    for measure in MEASURES:
+        if measure in values.columns:
+            cube[f"{measure}_sum"] = grouped[measure].sum()
+            cube[f"{measure}_sumsq"] = squares[measure]
+            cube[f"{measure}_count"] = grouped[measure].count()
+        else:
+            cube[f"{measure}_sum"] = 0.0
+            cube[f"{measure}_sumsq"] = 0.0
+            cube[f"{measure}_count"] = 0
+    cube = cube.reset_index()
+    cube['day'] = cube['day'].dt.strftime('%Y-%m-%d')
+    return cube[['day', 'work_center'] + _VALUE_COLUMNS]
+
+
+def cube_path(cube_rows, cube_dir=DOWNTIME_CUBE_DIR):
+    """
+    Dateiname aus dem Inhalts-Hash der aggregierten Zeilen – gleiche Daten ergeben dieselbe
+    Datei, unterschiedliche Datenstände überschreiben sich nicht gegenseitig.
+    """
+    sha = hashlib.sha256()
+    sha.update(pd.util.hash_pandas_object(cube_rows, index=False).to_numpy().tobytes())
+    return os.path.join(cube_dir, f"downtime_cube_{sha.hexdigest()[:16]}.sqlite")
+
+
+class DowntimeCube:
+    """
+    Zugriff auf den gespeicherten Würfel. Hält nur den Pfad (lässt sich daher zwischen
+    Pipeline-Stufen und Prozessen weitergeben); jede Abfrage öffnet eine kurze Verbindung.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _connect(self):
+        if not self.exists():
+            raise FileNotFoundError(f"Downtime-Würfel {self.path} fehlt – mit build_downtime_cube bzw. --rebuild-cache neu aufbauen.")
+        return sqlite3.connect(self.path)
+
+    def add(self, cube_rows):
+        """
+        Addiert Zeilen aus aggregate_machine_rows zu bestehenden Tagen/Arbeitsplätzen (Upsert),
+        z. B. für neu angehängte Maschinendaten.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        columns = ['day', 'work_center'] + _VALUE_COLUMNS
+        updates = ', '.join(f"{column} = {column} + excluded.{column}" for column in _VALUE_COLUMNS)
+        sql = (
+            f"INSERT INTO downtime_cube ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT (day, work_center) DO UPDATE SET {updates}"
+        )
+        rows = cube_rows[columns].astype(object).where(cube_rows[columns].notna(), None).itertuples(index=False, name=None)
+        with sqlite3.connect(self.path) as con:
+            con.executescript(_schema())
+            con.executemany(sql, rows)
+        con.close()
+        return self
+
+    def _where(self, start=None, end=None, work_centers=None):
+        clauses, params = [], []
+        if _date_text(start) is not None:
+            clauses.append("day >= ?")
+            params.append(_date_text(start))
+        if _date_text(end) is not None:
+            clauses.append("day <= ?")
+            params.append(_date_text(end))
+        if work_centers is not None:
+            work_centers = [str(wc) for wc in work_centers]
+            clauses.append(f"work_center IN ({', '.join('?' * len(work_centers))})")
+            params.extend(work_centers)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, start=None, end=None, work_centers=None):
+        """
+        Rohzeilen des Würfels im Zeitraum [start, end] (jeweils einschließlich) für die gewählten Arbeitsplätze.
+        """
+        where, params = self._where(start, end, work_centers)
+        con = self._connect()
+        try:
+            return pd.read_sql_query(f"SELECT * FROM downtime_cube{where} ORDER BY day, work_center", con, params=params)
+        finally:
+            con.close()
+
+    def damage_means(self, start=None, end=None, work_centers=None, confidence=None):
+        """
+        Durchschnittliche Downtime pro Schadensbild im Zeitraum – entspricht dem Mittelwert über
+        alle Maschinenzeilen des Zeitraums (Summe / Anzahl gültiger Werte).
+        Mit `confidence` (z. B. 0.95) zusätzlich Konfidenzintervalle des Mittelwerts aus Summe und
+        Quadratsumme (Normalapproximation) als Avg_Downtime_Minutes_CI_Low/High.
+        """
+        measures = [measure for measure in MEASURES if measure != 'downtime']
+        select = ', '.join(f"SUM({m}_sum), SUM({m}_sumsq), SUM({m}_count)" for m in measures)
+        where, params = self._where(start, end, work_centers)
+        con = self._connect()
+        try:
+            totals = con.execute(f"SELECT {select} FROM downtime_cube{where}", params).fetchone()
+        finally:
+            con.close()
+
+        totals = np.array(totals, dtype=float).reshape(len(measures), 3)
+        total, squares, count = totals[:, 0], totals[:, 1], np.nan_to_num(totals[:, 2])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(count > 0, total / count, np.nan)
+        averages = pd.DataFrame({
+            'Damage_Type': [READABLE_NAMES[MEASURES[m]] for m in measures],
+            'Avg_Downtime_Minutes': means,
+        })
+        if confidence is not None:
+            z = NormalDist().inv_cdf(0.5 + confidence / 2)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                variance = np.clip(squares - count * means ** 2, 0, None) / (count - 1)
+                margin = np.where(count > 1, z * np.sqrt(variance / count), np.nan)
+            averages['Avg_Downtime_Minutes_CI_Low'] = means - margin
+            averages['Avg_Downtime_Minutes_CI_High'] = means + margin
+        return averages
+
+    def daily_downtime(self, start=None, end=None, work_centers=None, min_downtime=None):
+        """
+        Downtime-Summe pro Tag und Arbeitsplatz im Format der Tagesaggregation von
+        downtime_matching.get_top_matched_downtimes (Match_Day, Work Center, Downtime).
+        """
+        where, params = self._where(start, end, work_centers)
+        if min_downtime is not None:
+            where += (" AND" if where else " WHERE") + " downtime_sum > ?"
+            params.append(float(min_downtime))
+        con = self._connect()
+        try:
+            daily = pd.read_sql_query(
+                f"SELECT day, work_center, downtime_sum FROM downtime_cube{where} ORDER BY day, work_center",
+                con, params=params
+            )
+        finally:
+            con.close()
+        return pd.DataFrame({
+            'Match_Day': parse_timestamps(daily['day']).dt.date,
+            'Work Center': daily['work_center'],
+            'Downtime': daily['downtime_sum'].astype(float),
+        })
+
+
+@instrument()
+def build_downtime_cube(df_machine, path=None):
+    """
+    Baut den Würfel aus vorverarbeiteten Maschinendaten neu auf und gibt ein DowntimeCube zurück.
+    Ohne `path` wird die Datei nach dem Inhalt benannt (cube_path); ältere Würfel dieses
+    Namensschemas werden dabei entfernt.
+    """
+    cube_rows = aggregate_machine_rows(df_machine)
+    if path is None:
+        path = cube_path(cube_rows)
+        cube_dir = os.path.dirname(path)
+        if os.path.isdir(cube_dir):
+            for entry in os.listdir(cube_dir):
+                if entry.startswith('downtime_cube_') and entry.endswith('.sqlite') and entry != os.path.basename(path):
+                    os.remove(os.path.join(cube_dir, entry))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    # In eine temporäre Datei schreiben, damit Leser nie einen halb gefüllten Würfel sehen
+    cube = DowntimeCube(tmp_path).add(cube_rows)
+    os.replace(cube.path, path)
+    print(f"🧊 Downtime-Würfel gespeichert: {path}")
+    return DowntimeCube(path)
@@ -1,20 +1,47 @@
+import numpy as np
 import pandas as pd
 
-def analyze_machine_damage_types(df_machine: pd.DataFrame, df_orders: pd.DataFrame) -> pd.DataFrame:
+from bootstrap import mean_ci
+from config import BOOTSTRAP_CONFIDENCE
+from duration_parsing import extract_decimal
+from instrumentation import instrument
+from timestamp_parsing import parse_timestamps
+
+# Zielspalten mit Downtime pro Schadensbild
+DAMAGE_COLUMNS = [
+    'Malfunction\n(1201)',
+    'Machine\n(1401)',
+    'Infrastructure\n(1402)',
+    'Mold\n(1403)',
+    'Peripheral\nEquipment\n(1404)',
+    'Automation\n(1405)'
+]
+
+# Lesbare Namen definieren
+READABLE_NAMES = {
+    'Malfunction\n(1201)': 'Malfunction',
+    'Machine\n(1401)': 'Machine',
+    'Infrastructure\n(1402)': 'Infrastructure',
+    'Mold\n(1403)': 'Mold',
+    'Peripheral\nEquipment\n(1404)': 'Peripheral Equipment',
+    'Automation\n(1405)': 'Automation'
+}
+
+@instrument()
+def analyze_machine_damage_types(df_machine: pd.DataFrame, df_orders: pd.DataFrame, cube=None, store=None,
+                                 bootstrap=False, verbose=True) -> pd.DataFrame:
     """
     Analysiert die durchschnittliche Downtime pro Schadensbild aus den Maschinendaten
     im Zeitraum zwischen frühester und spätester SAP-Order.
-    Gibt ein DataFrame mit 'Damage_Type' + 'Avg_Downtime_Minutes' zurück.
+    Mit `cube` (downtime_cube.DowntimeCube) wird der Zeitraum direkt im Würfel abgefragt,
+    mit `store` (machine_store.MachineStore, Zeitachse 'Calendar day') über Präfixsummen;
+    df_machine wird dann nicht benötigt.
+    Gibt ein DataFrame mit 'Damage_Type' + 'Avg_Downtime_Minutes' zurück; mit bootstrap=True zusätzlich
+    Konfidenzintervalle (Avg_Downtime_Minutes_CI_Low/High) – aus den Einzelwerten per Bootstrap, beim
+    Würfel aus Summe und Quadratsumme pro Tag (Normalapproximation, ohne Rückgriff auf die Rohdaten).
+    Mit verbose=False wird die Tabelle nicht ausgegeben (separat über print_machine_averages).
     """
 
-    # Sicherstellen, dass 'Calendar day' als Datum verfügbar ist
-    if 'Calendar day' not in df_machine.columns:
-        print("❌ Spalte 'Calendar day' fehlt.")
-        return pd.DataFrame()
-
-    df_machine = df_machine.copy()
-    df_machine['Calendar day'] = pd.to_datetime(df_machine['Calendar day'], errors='coerce', dayfirst=True)
-
     # Dynamischer Zeitraum basierend auf SAP-Orders
     start_date = df_orders['Start_ts'].min().date()
     end_date = df_orders['End_ts'].max().date()
@@ -22,70 +49,82 @@ def analyze_machine_damage_types(df_machine: pd.DataFrame, df_orders: pd.DataFra
     print(f"📅 SAP-Zeitraum: {start_date} bis {end_date}")
     '''
 
+    if cube is not None:
+        averages = cube.damage_means(start_date, end_date, confidence=BOOTSTRAP_CONFIDENCE if bootstrap else None)
+        return print_machine_averages(averages) if verbose else averages
+    if store is not None:
+        # Fenster [start, end) -> Enddatum einschließlich
+        names = [READABLE_NAMES[col] for col in DAMAGE_COLUMNS]
+        window_end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+        means = store.window_means(start_date, window_end)
+        averages = pd.DataFrame({'Damage_Type': names, 'Avg_Downtime_Minutes': means[names].to_numpy()})
+        if bootstrap:
+            averages = _add_intervals(averages, store.window(start_date, window_end)[names])
+        return print_machine_averages(averages) if verbose else averages
+
+    # Sicherstellen, dass 'Calendar day' als Datum verfügbar ist
+    if 'Calendar day' not in df_machine.columns:
+        print("❌ Spalte 'Calendar day' fehlt.")
+        return pd.DataFrame()
+
+    df_machine = df_machine.copy()
+    df_machine['Calendar day'] = parse_timestamps(df_machine['Calendar day'])
+
     # Maschinendaten auf den Zeitraum filtern
     df_machine_filtered = df_machine[
         (df_machine['Calendar day'].dt.date >= start_date) &
         (df_machine['Calendar day'].dt.date <= end_date)
     ]
 
-    # Zielspalten mit Downtime pro Schadensbild
-    damage_cols = [
-        'Malfunction\n(1201)',
-        'Machine\n(1401)',
-        'Infrastructure\n(1402)',
-        'Mold\n(1403)',
-        'Peripheral\nEquipment\n(1404)',
-        'Automation\n(1405)'
-    ]
-
     '''
     print("📋 Spaltennamen in df_machine_filtered:")
     print(df_machine_filtered.columns.tolist())
     '''
 
-    # Lesbare Namen definieren
-    readable_names = {
-        'Malfunction\n(1201)': 'Malfunction',
-        'Machine\n(1401)': 'Machine',
-        'Infrastructure\n(1402)': 'Infrastructure',
-        'Mold\n(1403)': 'Mold',
-        'Peripheral\nEquipment\n(1404)': 'Peripheral Equipment',
-        'Automation\n(1405)': 'Automation'
-    }
-
     # 🔄 Bereinigung: Dezimaltrennzeichen, Strings zu Float, nur Zahlen extrahieren
-    for col in damage_cols:
-        if col in df_machine_filtered.columns:
-            #print(f"\n🔍 Erste Rohwerte für '{col}':")
-            #print(df_machine_filtered[col].dropna().astype(str).unique()[:5])
-
-            df_machine_filtered.loc[:, col] = (
-                df_machine_filtered[col]
-                .astype(str)
-                .str.replace(',', '.', regex=False)
-                .str.extract(r'(\d+(?:\.\d+)?)')[0]
-                .astype(float)
-            )
-        else:
+    for col in DAMAGE_COLUMNS:
+        if col not in df_machine_filtered.columns:
             print(f"⚠️ Spalte '{col}' nicht gefunden!")
 
+    present_cols = [col for col in DAMAGE_COLUMNS if col in df_machine_filtered.columns]
+    if present_cols:
+        # Alle Schadensbild-Spalten in einem Durchlauf parsen; direkte Zuweisung ergibt float-Spalten
+        df_machine_filtered = df_machine_filtered.copy()
+        df_machine_filtered[present_cols] = extract_decimal(df_machine_filtered[present_cols])
+
     '''
     # Debug-Ausgabe
     print(f"📊 Gefilterte Zeilen: {len(df_machine_filtered)}")
-    print(df_machine_filtered[damage_cols].head())
-    print(df_machine_filtered[damage_cols].dtypes)
+    print(df_machine_filtered[DAMAGE_COLUMNS].head())
+    print(df_machine_filtered[DAMAGE_COLUMNS].dtypes)
     '''
 
     # Mittelwerte berechnen und Format anpassen
     averages = (
-        df_machine_filtered[damage_cols]
+        df_machine_filtered[DAMAGE_COLUMNS]
         .mean()
-        .rename(index=readable_names)
+        .rename(index=READABLE_NAMES)
         .reset_index()
         .rename(columns={'index': 'Damage_Type', 0: 'Avg_Downtime_Minutes'})
     )
+    if bootstrap:
+        averages = _add_intervals(averages, df_machine_filtered[present_cols].rename(columns=READABLE_NAMES))
+
+    return print_machine_averages(averages) if verbose else averages
 
-    print("\n📊 Durchschnittliche Downtime nach Schadensbild (nur Zeitraum der SAP-Orders):")
-    print(averages)
 
+def _add_intervals(averages, values):
+    """
+    Bootstrap-Intervalle der mittleren Downtime pro Schadensbild aus den Einzelwerten
+    (eine Spalte pro Schadensbild, fehlende Werte zählen nicht).
+    """
+    groups = np.repeat(np.asarray(values.columns, dtype=object), len(values))
+    intervals = mean_ci(values.to_numpy(dtype=float).ravel(order='F'), groups, 'Avg_Downtime_Minutes')
+    return averages.merge(intervals, on='Damage_Type', how='left')
+
+
+def print_machine_averages(averages):
+    print("\n📊 Durchschnittliche Downtime nach Schadensbild (nur Zeitraum der SAP-Orders):")
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(averages)
     return averages
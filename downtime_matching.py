@@ -2,33 +2,46 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-def visualize_matched_downtime_orders(df_machine: pd.DataFrame, df_orders: pd.DataFrame, downtime_threshold=60):
+from duration_parsing import to_float
+from instrumentation import instrument
+from interval_matching import aggregate_interval_matches, work_center_keys
+from schema import align_categories
+from timestamp_parsing import parse_timestamps
+from visualization import show_or_save
+
+@instrument()
+def matched_downtime_top(df_machine: pd.DataFrame, df_orders: pd.DataFrame, downtime_threshold=60, match_mode='day'):
     """
     Verknüpft SAP-Aufträge mit Maschinenstillständen (Datum + Arbeitsplatz)
-    und visualisiert Top 10 Downtime + SAP-Dauer.
+    und liefert die Top 10 nach Downtime inkl. SAP-Dauer (None, wenn nichts über dem Schwellwert liegt).
+    Mit match_mode='interval' werden stattdessen überlappende Zeitfenster
+    (Start_ts–End_ts gegen Start/End date / time) pro Arbeitsplatz verknüpft.
     """
 
     # Vorverarbeitung
-    df_machine['Downtime'] = df_machine['Downtime'].apply(
-        lambda x: float(str(x).replace(',', '.')) if pd.notnull(x) else 0
-    )
-    df_machine['Calendar day'] = pd.to_datetime(df_machine['Calendar day'], format='%d.%m.%Y', errors='coerce')
-    df_orders['Start_ts'] = pd.to_datetime(df_orders['Start_ts'], errors='coerce')
-
-    df_machine['Match_Day'] = df_machine['Calendar day'].dt.date
-    df_orders['Match_Day'] = df_orders['Start_ts'].dt.date
-
-    # Downtime aggregieren
-    grouped = df_machine.groupby(['Match_Day', 'Work Center'], as_index=False)['Downtime'].sum()
-
-    # Merge SAP + Downtime
-    merged = pd.merge(
-        df_orders[['Auftrag', 'Kurztext', 'Arbeitsplatz', 'Order_Duration', 'Match_Day']],
-        grouped,
-        left_on=['Match_Day', 'Arbeitsplatz'],
-        right_on=['Match_Day', 'Work Center'],
-        how='inner'
-    )
+    df_machine['Downtime'] = to_float(df_machine['Downtime'], fill_value=0)
+    df_machine['Calendar day'] = parse_timestamps(df_machine['Calendar day'])
+    df_orders['Start_ts'] = parse_timestamps(df_orders['Start_ts'])
+
+    if match_mode == 'interval':
+        merged = aggregate_interval_matches(df_orders, df_machine)
+    else:
+        df_machine['Match_Day'] = df_machine['Calendar day'].dt.date
+        df_orders['Match_Day'] = df_orders['Start_ts'].dt.date
+
+        # Downtime aggregieren
+        grouped = df_machine.groupby(['Match_Day', 'Work Center'], as_index=False, observed=True)['Downtime'].sum()
+
+        # Merge SAP + Downtime (bei kategorischen Arbeitsplätzen direkt auf den Codes)
+        order_part = df_orders[['Auftrag', 'Kurztext', 'Arbeitsplatz', 'Order_Duration', 'Match_Day']].copy()
+        order_part['Arbeitsplatz'], grouped['Work Center'] = align_categories(order_part['Arbeitsplatz'], grouped['Work Center'])
+        merged = pd.merge(
+            order_part,
+            grouped,
+            left_on=['Match_Day', 'Arbeitsplatz'],
+            right_on=['Match_Day', 'Work Center'],
+            how='inner'
+        )
 
     '''
     auftrag_id = 70004528
@@ -42,16 +55,16 @@ def visualize_matched_downtime_orders(df_machine: pd.DataFrame, df_orders: pd.Da
     filtered = merged[merged['Downtime'] > downtime_threshold].copy()
     if filtered.empty:
         print("⚠️ Keine Einträge mit Downtime über dem Schwellwert gefunden.")
-        return   
+        return None
 
     filtered['Kurztext_mit_Auftrag'] = filtered.apply(
         lambda row: f"{row['Kurztext']} (Auftrag: {int(row['Auftrag'])})", axis=1
     )
 
-    top = filtered[['Kurztext_mit_Auftrag', 'Downtime', 'Order_Duration']].sort_values(by='Downtime', ascending=False).head(10)
+    return filtered[['Kurztext_mit_Auftrag', 'Downtime', 'Order_Duration']].sort_values(by='Downtime', ascending=False).head(10)
 
 
-    # Plot
+def draw_matched_downtime_top(top, save_path=None):
     plt.figure(figsize=(12, 6))
     ax = sns.barplot(
     data=top,
@@ -76,44 +89,78 @@ def visualize_matched_downtime_orders(df_machine: pd.DataFrame, df_orders: pd.Da
     plt.ylabel("Kurztext + Auftrag")
     plt.title("Top 10 Maschinenstillstände mit Order-Dauer-Vergleich")
     plt.tight_layout()
-    plt.show()
+    show_or_save(save_path)
 
 
+def visualize_matched_downtime_orders(df_machine: pd.DataFrame, df_orders: pd.DataFrame, downtime_threshold=60, match_mode='day', save_path=None):
+    """
+    Visualisiert die Top 10 Downtime + SAP-Dauer (siehe matched_downtime_top).
+    Mit save_path wird die Grafik gespeichert statt angezeigt.
+    """
+    top = matched_downtime_top(df_machine, df_orders, downtime_threshold, match_mode)
+    if top is not None:
+        draw_matched_downtime_top(top, save_path)
 
-def get_top_matched_downtimes(df_orders: pd.DataFrame, df_machine: pd.DataFrame, downtime_threshold=60, top_n=10):
+
+@instrument()
+def get_top_matched_downtimes(df_orders: pd.DataFrame, df_machine: pd.DataFrame, downtime_threshold=60, top_n=10, match_mode='day', downtime_agg=None, cube=None):
     """
     Gibt ein DataFrame mit den Top-N Maschinenstillständen + zugeordneten SAP-Aufträgen zurück.
-    Berücksichtigt Datum + Arbeitsplatz (genaues Matching).
+    Berücksichtigt Datum + Arbeitsplatz (genaues Matching), mit match_mode='interval'
+    die überlappenden Zeitfenster pro Arbeitsplatz (Downtime summiert pro Auftrag).
+    downtime_agg: bereits aggregierte Tages-Downtime (Match_Day, Work Center, Downtime), z. B. aus
+    incremental.daily_downtime – df_machine wird dann nicht benötigt (nur match_mode='day').
+    cube: downtime_cube.DowntimeCube – die Tages-Downtime wird für Zeitraum und Arbeitsplätze
+    der Aufträge direkt im Würfel abgefragt (nur match_mode='day').
     """
 
     df_orders = df_orders.copy()
-    df_machine = df_machine.copy()
 
     if 'Start_ts' not in df_orders.columns or 'Arbeitsplatz' not in df_orders.columns:
         print("⚠️ Fehlende Spalten in df_orders.")
         return pd.DataFrame()
 
-    if 'Calendar day' not in df_machine.columns or 'Work Center' not in df_machine.columns or 'Downtime' not in df_machine.columns:
-        print("⚠️ Fehlende Spalten in df_machine.")
-        return pd.DataFrame()
-
-    df_orders['Match_Day'] = pd.to_datetime(df_orders['Start_ts'], errors='coerce').dt.date
-    df_machine['Match_Day'] = pd.to_datetime(df_machine['Calendar day'], dayfirst=True, errors='coerce').dt.date
-
-    df_machine['Work Center'] = df_machine['Work Center'].ffill()
-    df_orders['Arbeitsplatz'] = df_orders['Arbeitsplatz'].astype(str)
-    df_machine['Work Center'] = df_machine['Work Center'].astype(str)
-
-    downtime_agg = df_machine.groupby(['Match_Day', 'Work Center'], as_index=False)['Downtime'].sum()
-    downtime_agg = downtime_agg[downtime_agg['Downtime'] > downtime_threshold]
-
-    merged = pd.merge(
-        df_orders,
-        downtime_agg,
-        left_on=['Match_Day', 'Arbeitsplatz'],
-        right_on=['Match_Day', 'Work Center'],
-        how='inner'
-    )
+    if cube is not None and match_mode != 'interval':
+        order_days = parse_timestamps(df_orders['Start_ts'])
+        downtime_agg = cube.daily_downtime(
+            order_days.min(), order_days.max(),
+            work_centers=pd.unique(work_center_keys(df_orders['Arbeitsplatz'])),
+            min_downtime=downtime_threshold
+        )
+
+    if downtime_agg is None:
+        if 'Calendar day' not in df_machine.columns or 'Work Center' not in df_machine.columns or 'Downtime' not in df_machine.columns:
+            print("⚠️ Fehlende Spalten in df_machine.")
+            return pd.DataFrame()
+
+        df_machine = df_machine.copy()
+        df_machine['Work Center'] = df_machine['Work Center'].ffill()
+
+    if match_mode == 'interval':
+        merged = aggregate_interval_matches(df_orders, df_machine)
+        merged = merged[merged['Downtime'] > downtime_threshold]
+    else:
+        df_orders['Match_Day'] = parse_timestamps(df_orders['Start_ts']).dt.date
+
+        # Einheitliche Schlüssel (Reporting liest Arbeitsplätze mit Lücken als float, z. B. 41023.0)
+        df_orders['Arbeitsplatz'] = pd.Categorical(work_center_keys(df_orders['Arbeitsplatz']))
+        if downtime_agg is None:
+            df_machine['Match_Day'] = parse_timestamps(df_machine['Calendar day']).dt.date
+            df_machine['Work Center'] = pd.Categorical(work_center_keys(df_machine['Work Center']))
+            downtime_agg = df_machine.groupby(['Match_Day', 'Work Center'], as_index=False, observed=True)['Downtime'].sum()
+        else:
+            downtime_agg = downtime_agg.copy()
+            downtime_agg['Work Center'] = pd.Categorical(downtime_agg['Work Center'])
+        downtime_agg = downtime_agg[downtime_agg['Downtime'] > downtime_threshold]
+        df_orders['Arbeitsplatz'], downtime_agg['Work Center'] = align_categories(df_orders['Arbeitsplatz'], downtime_agg['Work Center'])
+
+        merged = pd.merge(
+            df_orders,
+            downtime_agg,
+            left_on=['Match_Day', 'Arbeitsplatz'],
+            right_on=['Match_Day', 'Work Center'],
+            how='inner'
+        )
 
     print("📋 Spalten im merged:", merged.columns.tolist())
     print(merged[['Auftrag', 'Order_Duration']].dropna().head(5))
@@ -123,14 +170,10 @@ def get_top_matched_downtimes(df_orders: pd.DataFrame, df_machine: pd.DataFrame,
         print("⚠️ Keine Zuordnungen mit Downtime über Threshold gefunden.")
         return pd.DataFrame()
 
-    merged['Kurztext_mit_Auftrag'] = merged.apply(
+    # Beschriftung nur für die Top-N-Zeilen erzeugen statt für alle Zuordnungen
+    top_matches = merged.sort_values(by='Downtime', ascending=False).head(top_n).copy()
+    top_matches['Kurztext_mit_Auftrag'] = top_matches.apply(
         lambda row: f"{row['Kurztext']} (Auftrag: {int(row['Auftrag'])})", axis=1
     )
 
-    top_matches = (
-        merged[['Kurztext_mit_Auftrag', 'Downtime']]
-        .sort_values(by='Downtime', ascending=False)
-        .head(top_n)
-    )
-
-    return top_matches
+    return top_matches[['Kurztext_mit_Auftrag', 'Downtime']]
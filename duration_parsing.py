@@ -0,0 +1,86 @@
+# duration_parsing.py
+# 👉 Vektorisierte Umrechnung von Stillstands-/Dauerangaben ("1,5 h", "30 min", "12") in Minuten
+import numpy as np
+import pandas as pd
+
+DURATION_PATTERN = r'^(\d+(?:[\.,]\d*)?)\s*(H|MIN|M)?'
+DECIMAL_PATTERN = r'(\d+(?:\.\d+)?)'
+
+
+def _on_frame(df, func):
+    """
+    Wendet eine Series-Funktion in einem einzigen Aufruf auf alle Spalten an,
+    indem die Werte zu einer langen Series zusammengelegt werden.
+    """
+    flat = pd.Series(df.to_numpy(dtype=object).ravel())
+    parsed = func(flat).to_numpy(dtype=float).reshape(df.shape)
+    return pd.DataFrame(parsed, index=df.index, columns=df.columns)
+
+
+def _on_uniques(series, func):
+    """
+    Wertet `func` nur für die eindeutigen Werte aus und verteilt das Ergebnis zurück –
+    Stillstandsangaben wiederholen sich in den Exporten sehr häufig.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    parsed = func(pd.Series(uniques, dtype=object)).to_numpy(dtype=float)
+    result = np.full(len(series), np.nan)
+    valid = codes >= 0
+    result[valid] = parsed[codes[valid]]
+    return pd.Series(result, index=series.index, name=series.name)
+
+
+def _duration_from_text(uniques):
+    parts = uniques.astype(str).str.strip().str.upper().str.extract(DURATION_PATTERN)
+    number = parts[0].str.replace(',', '.', regex=False).astype(float)
+    factor = np.where(parts[1].str.startswith('H', na=False), 60.0, 1.0)
+    return number * factor
+
+
+def _decimal_from_text(uniques):
+    return (
+        uniques.astype(str)
+        .str.replace(',', '.', regex=False)
+        .str.extract(DECIMAL_PATTERN)[0]
+        .astype(float)
+    )
+
+
+def parse_duration_minutes(values):
+    """
+    Wandelt Dauerangaben mit optionaler Einheit in Minuten um (Stunden * 60).
+    Zahl mit Punkt oder Komma, Einheit 'h' (Stunden) oder 'min'/'m' bzw. ohne Einheit (Minuten);
+    nicht lesbare Werte werden NaN.
+    Akzeptiert eine Series oder ein DataFrame (alle Spalten in einem Durchlauf).
+    """
+    if isinstance(values, pd.DataFrame):
+        return _on_frame(values, parse_duration_minutes)
+    return _on_uniques(values, _duration_from_text)
+
+
+def extract_decimal(values):
+    """
+    Extrahiert die erste Dezimalzahl (Komma oder Punkt) ohne Einheitenumrechnung,
+    wie für die Schadensbild-Spalten (1201–1405) der Maschinendaten.
+    Akzeptiert eine Series oder ein DataFrame (alle Spalten in einem Durchlauf).
+    """
+    if isinstance(values, pd.DataFrame):
+        return _on_frame(values, extract_decimal)
+    # 'nan' enthält keine Ziffern – fehlende Werte bleiben wie bisher NaN
+    return _on_uniques(values, _decimal_from_text)
+
+
+def to_float(values, fill_value=0):
+    """
+    Wandelt bereits numerische bzw. reine Zahlen-Strings ("12,5") in float um,
+    fehlende Werte werden durch `fill_value` ersetzt.
+    """
+    if isinstance(values, pd.DataFrame):
+        return values.apply(to_float, fill_value=fill_value)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float).fillna(fill_value)
+    parsed = _on_uniques(
+        values,
+        lambda uniques: uniques.astype(str).str.replace(',', '.', regex=False).astype(float)
+    )
+    return parsed.fillna(fill_value)
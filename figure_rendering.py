@@ -0,0 +1,184 @@
+# figure_rendering.py
+# 👉 Headless-Rendering: Grafiken im Agg-Backend parallel als Dateien schreiben, per Inhalts-Hash gecacht
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from config import FIGURE_DIR, FIGURE_MAX_WORKERS
+from downtime_matching import draw_matched_downtime_top, matched_downtime_top
+from sap_damage_type_analysis import plot_sap_damage_types
+from visualization import (
+    boxplot_priority_data,
+    damage_type_distribution_data,
+    draw_boxplot_priorities,
+    draw_damage_type_distribution
+)
+
+_figure_settings = {
+    'output_dir': FIGURE_DIR,
+    'max_workers': FIGURE_MAX_WORKERS,
+}
+
+INDEX_FILE = 'figures.json'
+
+
+def configure_figures(output_dir=None, max_workers=None):
+    """
+    Passt Zielverzeichnis und Anzahl Worker-Prozesse zur Laufzeit an (z. B. über main.py).
+    """
+    if output_dir is not None:
+        _figure_settings['output_dir'] = output_dir
+    if max_workers is not None:
+        _figure_settings['max_workers'] = max_workers
+
+
+def figure_job(name, func, *args, **kwargs):
+    """
+    Eine zu rendernde Grafik: `func(*args, save_path=..., **kwargs)` zeichnet sie.
+    `func` muss eine Modulfunktion sein (wird an die Worker-Prozesse übergeben).
+    """
+    return {'name': name, 'func': func, 'args': args, 'kwargs': kwargs}
+
+
+def _update_hash(sha, value):
+    if isinstance(value, pd.DataFrame):
+        sha.update(repr(list(value.columns)).encode('utf-8'))
+        sha.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        sha.update(repr(value.name).encode('utf-8'))
+        sha.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    else:
+        sha.update(repr(value).encode('utf-8'))
+
+
+def figure_key(job):
+    """
+    Hash über Eingabedaten, Parameter und den Quelltext des Moduls der Zeichenfunktion –
+    ändert sich nichts davon, wird die Grafik nicht neu gezeichnet.
+    """
+    sha = hashlib.sha256(job['name'].encode('utf-8'))
+    with open(inspect.getsourcefile(job['func']), 'rb') as f:
+        sha.update(f.read())
+    sha.update(job['func'].__name__.encode('utf-8'))
+    for value in job['args']:
+        _update_hash(sha, value)
+    for name in sorted(job['kwargs']):
+        sha.update(name.encode('utf-8'))
+        _update_hash(sha, job['kwargs'][name])
+    return sha.hexdigest()
+
+
+def _read_index(output_dir):
+    try:
+        with open(os.path.join(output_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(output_dir, index):
+    path = os.path.join(output_dir, INDEX_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render(func, args, kwargs, path):
+    # Erst in eine temporäre Datei schreiben, damit abgebrochene Läufe keine halben Grafiken hinterlassen
+    root, ext = os.path.splitext(path)
+    tmp_path = f"{root}.tmp{ext}"
+    func(*args, save_path=tmp_path, **kwargs)
+    os.replace(tmp_path, path)
+    return path
+
+
+def render_jobs(pending, max_workers=None):
+    """
+    Rendert die Paare (job, Zielpfad) parallel im Agg-Backend. Fehler einzelner Grafiken werden
+    gemeldet und brechen die übrigen nicht ab. Gibt die Menge der erfolgreich geschriebenen Pfade zurück.
+    """
+    if not pending:
+        return set()
+    max_workers = max_workers or _figure_settings['max_workers']
+    rendered = set()
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+        futures = [
+            (job, executor.submit(_render, job['func'], job['args'], job['kwargs'], path))
+            for job, path in pending
+        ]
+        for job, future in futures:
+            try:
+                rendered.add(future.result())
+            except Exception as e:
+                print(f"❌ Grafik '{job['name']}' konnte nicht gerendert werden: {e}")
+    return rendered
+
+
+def render_figures(jobs, output_dir=None, max_workers=None, fmt='png'):
+    """
+    Schreibt alle Grafiken als Dateien nach `output_dir`. Unveränderte Grafiken (gleicher
+    Inhalts-Hash, Datei vorhanden) werden übersprungen, die übrigen parallel im Agg-Backend
+    gerendert. Gibt {Name: Dateipfad} der verfügbaren Grafiken zurück.
+    """
+    output_dir = output_dir or _figure_settings['output_dir']
+    os.makedirs(output_dir, exist_ok=True)
+    index = _read_index(output_dir)
+
+    paths, todo = {}, []
+    for job in jobs:
+        path = os.path.join(output_dir, f"{job['name']}.{fmt}")
+        key = figure_key(job)
+        if index.get(job['name']) == key and os.path.exists(path):
+            print(f"💾 Grafik '{job['name']}': unverändert")
+            paths[job['name']] = path
+        else:
+            todo.append((job, key, path))
+
+    if todo:
+        rendered = render_jobs([(job, path) for job, _, path in todo], max_workers)
+        for job, key, path in todo:
+            if path in rendered:
+                paths[job['name']] = path
+                index[job['name']] = key
+                print(f"🖼️ Grafik '{job['name']}': gespeichert unter {paths[job['name']]}")
+            else:
+                index.pop(job['name'], None)
+        _write_index(output_dir, index)
+    return paths
+
+
+def build_figure_jobs(df_machine, df_orders, df_sap=None, downtime_threshold=60, match_mode='interval'):
+    """
+    Bereitet die Standardgrafiken im Hauptprozess vor (nur die kleinen Plotdaten gehen an die
+    Worker): Prioritäten-Boxplot, Top-10-Stillstände, Schadensverteilung und SAP-Schadensbilder.
+    """
+    jobs = []
+
+    df_box = boxplot_priority_data(df_orders)
+    if df_box is not None:
+        jobs.append(figure_job('boxplot_prioritaet', draw_boxplot_priorities, df_box))
+    else:
+        print("⚠️ Nicht genügend Daten für den Boxplot.")
+
+    top = matched_downtime_top(df_machine.copy(), df_orders.copy(), downtime_threshold, match_mode)
+    if top is not None:
+        jobs.append(figure_job('top10_downtime', draw_matched_downtime_top, top))
+
+    distribution = damage_type_distribution_data(df_orders)
+    if distribution is not None:
+        jobs.append(figure_job('damage_type_distribution', draw_damage_type_distribution, *distribution))
+
+    if df_sap is not None and not df_sap.empty:
+        jobs.append(figure_job('sap_damage_types', plot_sap_damage_types, df_sap))
+
+    return jobs
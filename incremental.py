@@ -0,0 +1,313 @@
+# incremental.py
+# 👉 Inkrementelle Verarbeitung der wachsenden Reporting-CSV: Wasserstand (Byte-Offset / letzter Calendar day)
+#    und gespeicherte Downtime-Aggregate pro Arbeitsplatz und Tag – jeder Lauf liest nur die neu angehängten Zeilen
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+
+from analysis import _correlation_keys, correlate_downtime_grouped
+from config import INCREMENTAL_DIR, MACHINE_CHUNK_SIZE, MACHINE_DATA_PATH
+from instrumentation import instrument
+from online_stats import GroupedMoments, group_moments
+from preprocessing import preprocess_machine_increment
+from timestamp_parsing import parse_timestamps
+
+ENCODING = 'latin-1'  # ein Byte pro Zeichen -> Byte-Offsets entsprechen Zeichenpositionen
+TAIL_BYTES = 4096
+STATE_VERSION = 1
+AGGREGATE_COLUMNS = ['Downtime', 'count', 'mean', 'm2']
+
+
+class _ByteRange(io.RawIOBase):
+    """
+    Lesezugriff auf einen Ausschnitt [Offset, Ende) einer geöffneten Binärdatei,
+    damit pd.read_csv den neuen Teil blockweise lesen kann, ohne ihn ganz in den Speicher zu holen.
+    """
+
+    def __init__(self, f, remaining):
+        self._f = f
+        self._remaining = remaining
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self._remaining)
+        if n <= 0:
+            return 0
+        data = self._f.read(n)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+def _state_dir(path, state_dir=None):
+    # Ein Zustand pro Reporting-Datei (absoluter Pfad), damit Batch-Läufe sich nicht überschreiben
+    if state_dir is not None:
+        return state_dir
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(INCREMENTAL_DIR, key)
+
+
+def _read_state(state_dir):
+    try:
+        with open(os.path.join(state_dir, 'state.json'), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        aggregates = pd.read_pickle(os.path.join(state_dir, 'aggregates.pkl'))
+    except (OSError, ValueError):
+        return None, None
+    if state.get('version') != STATE_VERSION:
+        return None, None
+    return state, aggregates
+
+
+def _write_state(state_dir, state, aggregates):
+    # Erst die Aggregate, dann den Wasserstand – bricht ein Lauf ab, passt der alte Zustand noch zusammen
+    os.makedirs(state_dir, exist_ok=True)
+    agg_path = os.path.join(state_dir, 'aggregates.pkl')
+    aggregates.to_pickle(agg_path + '.tmp')
+    os.replace(agg_path + '.tmp', agg_path)
+
+    state_path = os.path.join(state_dir, 'state.json')
+    with open(state_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, default=str)
+    os.replace(state_path + '.tmp', state_path)
+
+
+def _fingerprint(f, offset):
+    # Anfang der Datei und Bytes vor dem Wasserstand: erkennt überschriebene statt angehängte Dateien
+    sha = hashlib.sha256()
+    f.seek(0)
+    sha.update(f.read(min(offset, TAIL_BYTES)))
+    start = max(0, offset - TAIL_BYTES)
+    f.seek(start)
+    sha.update(f.read(offset - start))
+    return sha.hexdigest()
+
+
+def _header_end(f):
+    """
+    Ende der Kopfzeile (Byte-Offset hinter dem Zeilenumbruch). Die Spaltennamen enthalten
+    Zeilenumbrüche in Anführungszeichen, daher zählt erst ein Umbruch außerhalb von Anführungszeichen.
+    """
+    f.seek(0)
+    head = f.read(1 << 16)
+    quotes = 0
+    for pos, byte in enumerate(head):
+        if byte == ord('"'):
+            quotes += 1
+        elif byte == ord('\n') and quotes % 2 == 0:
+            return pos + 1
+    raise ValueError("Kopfzeile der Reporting-CSV nicht gefunden.")
+
+
+def _header_columns(f, header_end):
+    f.seek(0)
+    header = f.read(header_end)
+    return pd.read_csv(io.BytesIO(header), sep=';', encoding=ENCODING, nrows=0).columns
+
+
+def _calendar_day_index(columns):
+    if 'Calendar day' not in columns:
+        raise ValueError("Spalte 'Calendar day' fehlt in der Kopfzeile der Reporting-CSV.")
+    return list(columns).index('Calendar day')
+
+
+def _is_data_line(line, day_index):
+    # Zeilen ohne Datum in 'Calendar day' (z. B. die Fußzeile 'Result') zählen nicht als Daten;
+    # csv.reader beachtet Trennzeichen in Anführungszeichen wie pd.read_csv
+    fields = next(csv.reader([line.decode(ENCODING)], delimiter=';'), [])
+    if len(fields) <= day_index:
+        return False
+    day = fields[day_index].strip()
+    return len(day) == 10 and day[2] == '.' and day[5] == '.'
+
+
+def _data_end(f, offset, size, day_index):
+    """
+    Ende der letzten vollständigen Datenzeile ab `offset`: eine noch unvollständig geschriebene
+    letzte Zeile und nachfolgende Fußzeilen bleiben für den nächsten Lauf liegen. So bleibt der
+    Wasserstand auch gültig, wenn der Export die Fußzeile beim nächsten Mal hinter neue Zeilen schreibt.
+    """
+    block = TAIL_BYTES
+    while True:
+        start = max(offset, size - block)
+        f.seek(start)
+        tail = f.read(size - start)
+        line_end = tail.rfind(b'\n')
+        while line_end >= 0:
+            line_start = tail.rfind(b'\n', 0, line_end) + 1
+            if line_start == 0 and start > offset:
+                break  # Zeile am Blockanfang evtl. abgeschnitten -> größeren Block lesen
+            if _is_data_line(tail[line_start:line_end].rstrip(b'\r'), day_index):
+                return start + line_end + 1
+            line_end = line_start - 1
+        if start == offset:
+            return offset
+        block *= 2
+
+
+def _aggregate(df):
+    """
+    Downtime-Summe und Momente (Anzahl, Mittelwert, m2) pro Arbeitsplatz und Tag – mit denselben
+    Schlüsseln wie analysis.correlate_downtime_grouped(by='day').
+    """
+    keys = _correlation_keys(df, None, 'day')[0]
+    downtime = pd.to_numeric(df['Downtime'], errors='coerce')
+    aggregates = group_moments(downtime, keys)
+    aggregates.insert(0, 'Downtime', downtime.groupby(keys, observed=True).sum())
+    return aggregates
+
+
+def merge_aggregates(stored, new):
+    """
+    Führt zwei Aggregat-Tabellen zusammen: Summen addieren, Momente nach Welford/Chan kombinieren.
+    """
+    if stored is None or stored.empty:
+        return new
+    if new.empty:
+        return stored
+    moments = GroupedMoments(stored[['count', 'mean', 'm2']]).merge(GroupedMoments(new[['count', 'mean', 'm2']])).stats
+    downtime = stored['Downtime'].add(new['Downtime'], fill_value=0).reindex(moments.index)
+    return pd.concat([downtime.rename('Downtime'), moments], axis=1)[AGGREGATE_COLUMNS].sort_index()
+
+
+def _process_range(path, header_end, offset, end, carry, chunksize):
+    """
+    Liest die Zeilen zwischen `offset` und `end` blockweise, führt den Forward-Fill mit dem
+    gespeicherten Carry fort und aggregiert jeden Block.
+    """
+    with open(path, 'rb') as f:
+        columns = _header_columns(f, header_end)
+        f.seek(offset)
+        stream = io.BufferedReader(_ByteRange(f, end - offset))
+        aggregates, rows, last_day = None, 0, None
+        with pd.read_csv(stream, sep=';', encoding=ENCODING, header=None, names=columns, chunksize=chunksize) as reader:
+            for chunk in reader:
+                rows += len(chunk)
+                chunk, carry = preprocess_machine_increment(chunk, carry)
+                if chunk.empty:
+                    continue
+                aggregates = merge_aggregates(aggregates, _aggregate(chunk))
+                chunk_day = parse_timestamps(chunk['Calendar day']).max()
+                if pd.notna(chunk_day) and (last_day is None or chunk_day > last_day):
+                    last_day = chunk_day
+    return aggregates, carry, rows, last_day
+
+
+@instrument()
+def update_downtime_aggregates(path=MACHINE_DATA_PATH, state_dir=None, rebuild=False, chunksize=MACHINE_CHUNK_SIZE):
+    """
+    Bringt die gespeicherten Downtime-Aggregate pro Arbeitsplatz und Tag auf den Stand der Reporting-CSV.
+    Nur die seit dem letzten Lauf angehängten Zeilen werden gelesen, vorverarbeitet und zu den
+    gespeicherten Aggregaten addiert. Ist die Datei kürzer geworden oder wurde der bereits
+    verarbeitete Teil verändert, wird vollständig neu aufgebaut.
+    Gibt die Aggregate zurück (Index Work Center/Day, Spalten Downtime (Summe), count, mean, m2).
+    """
+    state_dir = _state_dir(path, state_dir)
+    state, aggregates = (None, None) if rebuild else _read_state(state_dir)
+    size = os.path.getsize(path)
+
+    with open(path, 'rb') as f:
+        if state is not None and (state['path'] != os.path.abspath(path) or size < state['offset']
+                                  or _fingerprint(f, state['offset']) != state['fingerprint']):
+            print(f"⚠️ {os.path.basename(path)} wurde nicht nur ergänzt – Aggregate werden neu aufgebaut.")
+            state, aggregates = None, None
+
+        header_end = _header_end(f)
+        day_index = _calendar_day_index(_header_columns(f, header_end))
+        offset = header_end if state is None else state['offset']
+        end = _data_end(f, offset, size, day_index)
+
+    if end <= offset and state is not None:
+        print(f"✅ Keine neuen Zeilen in {os.path.basename(path)} (Stand: {state['last_calendar_day']}).")
+        return aggregates
+
+    carry = None if state is None or state['carry'] is None else pd.Series(state['carry'])
+    new_aggregates, rows, last_day = None, 0, None
+    if end > offset:
+        new_aggregates, carry, rows, last_day = _process_range(path, header_end, offset, end, carry, chunksize)
+    aggregates = merge_aggregates(aggregates, new_aggregates if new_aggregates is not None else _empty_aggregates())
+
+    previous_day = None if state is None else state['last_calendar_day']
+    if last_day is not None:
+        last_day = last_day.strftime('%Y-%m-%d')
+        if previous_day is not None:
+            last_day = max(last_day, previous_day)
+    else:
+        last_day = previous_day
+
+    with open(path, 'rb') as f:
+        fingerprint = _fingerprint(f, end)
+    new_state = {
+        'version': STATE_VERSION,
+        'path': os.path.abspath(path),
+        'offset': end,
+        'fingerprint': fingerprint,
+        'rows': (0 if state is None else state['rows']) + rows,
+        'last_calendar_day': last_day,
+        'carry': None if carry is None else {k: (None if pd.isna(v) else v) for k, v in carry.items()},
+    }
+    _write_state(state_dir, new_state, aggregates)
+    print(f"🔄 {rows:,} neue Zeilen verarbeitet ({new_state['rows']:,} insgesamt, Stand: {last_day}), "
+          f"{len(aggregates):,} Arbeitsplatz-Tage gespeichert.")
+    return aggregates
+
+
+def _empty_aggregates():
+    index = pd.MultiIndex.from_arrays([pd.Index([], dtype=object), pd.DatetimeIndex([])], names=['Work Center', 'Day'])
+    return pd.DataFrame(
+        {column: pd.Series(dtype='int64' if column == 'count' else float) for column in AGGREGATE_COLUMNS}, index=index
+    )
+
+
+def load_downtime_aggregates(path=MACHINE_DATA_PATH, state_dir=None):
+    """
+    Gespeicherte Aggregate ohne Aktualisierung; None, wenn noch kein Lauf stattgefunden hat.
+    """
+    return _read_state(_state_dir(path, state_dir))[1]
+
+
+def daily_downtime(aggregates):
+    """
+    Aggregate im Format der Tagesaggregation von downtime_matching.get_top_matched_downtimes
+    (Spalten Match_Day als Datum, Work Center, Downtime).
+    """
+    daily = aggregates['Downtime'].reset_index()
+    daily['Match_Day'] = daily['Day'].dt.date
+    return daily[['Match_Day', 'Work Center', 'Downtime']]
+
+
+def downtime_moments(aggregates):
+    """
+    Momente pro Arbeitsplatz und Tag für analysis.correlate_downtime_grouped(machine_stats=...).
+    """
+    return aggregates[['count', 'mean', 'm2']]
+
+
+if __name__ == "__main__":
+    from data_loader import load_order_data
+    from downtime_matching import get_top_matched_downtimes
+    from preprocessing import preprocess_order_data
+
+    parser = argparse.ArgumentParser(description="Tageslauf: nur neue Zeilen der Reporting-CSV verarbeiten")
+    parser.add_argument('--machine', default=MACHINE_DATA_PATH, help="Reporting-CSV")
+    parser.add_argument('--rebuild', action='store_true', help="Aggregate vollständig neu aufbauen")
+    parser.add_argument('--threshold', type=float, default=60, help="Downtime-Schwelle in Minuten für die Top-Liste")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--no-orders', action='store_true', help="Nur Aggregate aktualisieren, keine Auswertung")
+    args = parser.parse_args()
+
+    downtime_aggregates = update_downtime_aggregates(args.machine, rebuild=args.rebuild)
+    if not args.no_orders:
+        orders = preprocess_order_data(load_order_data())
+        orders.columns = orders.columns.str.strip()
+        correlate_downtime_grouped(None, orders, by='day', machine_stats=downtime_moments(downtime_aggregates))
+        top = get_top_matched_downtimes(orders, None, downtime_threshold=args.threshold, top_n=args.top,
+                                        downtime_agg=daily_downtime(downtime_aggregates))
+        print(top)
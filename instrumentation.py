@@ -0,0 +1,227 @@
+# instrumentation.py
+# 👉 Messpunkte für Pipeline-Funktionen: Wand-/CPU-Zeit, Speicherspitze, Zeilen, optional cProfile – als JSON Lines und Übersicht
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_settings = {
+    'enabled': False,
+    'jsonl_path': None,
+    'profile_dir': None,
+    'trace_memory': True,
+}
+_records = []
+_memory_stack = []
+_profiling = {'active': False}
+
+
+def configure_instrumentation(enabled=None, jsonl_path=None, profile_dir=None, trace_memory=None):
+    """
+    Schaltet die Messpunkte zur Laufzeit ein (z. B. über die CLI-Flags in main.py).
+    - jsonl_path: jede Messung als JSON-Zeile anhängen
+    - profile_dir: pro Messpunkt eine cProfile-Datei (<name>.prof) schreiben
+    - trace_memory: Speicherspitze per tracemalloc (verlangsamt Python-lastigen Code deutlich)
+    """
+    if enabled is not None:
+        _settings['enabled'] = enabled
+    if jsonl_path is not None:
+        _settings['jsonl_path'] = jsonl_path
+    if profile_dir is not None:
+        _settings['profile_dir'] = profile_dir
+    if trace_memory is not None:
+        _settings['trace_memory'] = trace_memory
+
+
+def get_instrumentation_settings():
+    return dict(_settings)
+
+
+def get_records():
+    return list(_records)
+
+
+def clear_records():
+    _records.clear()
+
+
+def merge_records(records):
+    """
+    Übernimmt Messungen aus Worker-Prozessen in die Übersicht des Hauptprozesses
+    (in die JSONL-Datei hat der Worker sie bereits selbst geschrieben).
+    """
+    _records.extend(records)
+
+
+def count_rows(value):
+    """
+    Zeilen in DataFrames/Series, auch verschachtelt in dicts, Listen und Tupeln; None, wenn keine enthalten sind.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        counts = [count_rows(item) for item in value]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+def _max_rss_mb():
+    # Höchststand des Arbeitsspeichers des Prozesses (Linux: KB, macOS: Bytes)
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1024 ** 2 if sys.platform == 'darwin' else max_rss / 1024
+
+
+def _start_memory():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started = True
+    else:
+        started = False
+    current, peak = tracemalloc.get_traced_memory()
+    # Spitze des umgebenden Messpunkts sichern, bevor sie zurückgesetzt wird
+    _memory_stack.append({'started': started, 'baseline': current, 'outer_peak': peak, 'inner_peak': 0})
+    tracemalloc.reset_peak()
+
+
+def _stop_memory():
+    _, peak = tracemalloc.get_traced_memory()
+    frame = _memory_stack.pop()
+    peak = max(peak, frame['inner_peak'])
+    if frame['started']:
+        tracemalloc.stop()
+    elif _memory_stack:
+        _memory_stack[-1]['inner_peak'] = max(_memory_stack[-1]['inner_peak'], peak, frame['outer_peak'])
+    return (peak - frame['baseline']) / 1024 ** 2
+
+
+def _emit(record):
+    _records.append(record)
+    path = _settings['jsonl_path']
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+
+
+def timed_call(name, func, *args, **kwargs):
+    """
+    Ruft func auf und misst dabei Wandzeit, CPU-Zeit, Speicherspitze sowie Ein-/Ausgabezeilen.
+    Ist die Instrumentierung ausgeschaltet, wird func unverändert aufgerufen.
+    """
+    if not _settings['enabled']:
+        return func(*args, **kwargs)
+
+    profiler = None
+    if _settings['profile_dir'] and not _profiling['active']:
+        # Nur der äußerste Messpunkt profiliert – cProfile lässt sich nicht verschachteln
+        profiler = cProfile.Profile()
+        _profiling['active'] = True
+    if _settings['trace_memory']:
+        _start_memory()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    error = None
+    try:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            output = func(*args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+    except BaseException as e:
+        # Auch KeyboardInterrupt/SystemExit protokollieren – sonst fehlt `output` im finally-Block
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        peak_mb = _stop_memory() if _settings['trace_memory'] else None
+        profile_path = None
+        if profiler is not None:
+            _profiling['active'] = False
+            os.makedirs(_settings['profile_dir'], exist_ok=True)
+            profile_path = os.path.join(_settings['profile_dir'], f"{name}.prof")
+            profiler.dump_stats(profile_path)
+        record = {
+            'name': name,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(time.time() - wall)),
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'peak_mb': round(peak_mb, 3) if peak_mb is not None else None,
+            'max_rss_mb': _max_rss_mb(),
+            'rows_in': count_rows(list(args) + list(kwargs.values())),
+            'rows_out': count_rows(output) if error is None else None,
+            'profile': profile_path,
+            'error': error,
+        }
+        _emit(record)
+    return output
+
+
+def instrument(name=None):
+    """
+    Decorator: misst jeden Aufruf der Funktion über timed_call. Ohne aktivierte
+    Instrumentierung kostet er nur einen Funktionsaufruf.
+    """
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return timed_call(label, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summary(records=None):
+    """
+    Übersicht pro Messpunkt: Aufrufe, Summe Wand-/CPU-Zeit, größte Speicherspitze, Zeilen.
+    """
+    df = pd.DataFrame(_records if records is None else records)
+    if df.empty:
+        return df
+    return (
+        df.groupby('name', sort=False)
+        .agg(
+            Aufrufe=('wall_s', 'size'),
+            Wandzeit_s=('wall_s', 'sum'),
+            CPU_s=('cpu_s', 'sum'),
+            Spitze_MB=('peak_mb', 'max'),
+            Zeilen_ein=('rows_in', 'max'),
+            Zeilen_aus=('rows_out', 'max'),
+        )
+        .sort_values('Wandzeit_s', ascending=False)
+        .round(3)
+    )
+
+
+def print_summary():
+    if not _settings['enabled']:
+        return
+    table = summary()
+    if table.empty:
+        return
+    print("\n⏱️ Messpunkte (Summe pro Funktion):")
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 200):
+        print(table)
+    if _settings['jsonl_path']:
+        print(f"💾 Messwerte angehängt an {_settings['jsonl_path']}")
+    if _settings['profile_dir']:
+        print(f"💾 cProfile-Dateien in {_settings['profile_dir']} (z. B. python -m pstats <datei>.prof)")
@@ -0,0 +1,155 @@
+# interval_matching.py
+# 👉 Zeitintervall-Join zwischen SAP-Aufträgen (Start_ts–End_ts) und Maschinenintervallen pro Arbeitsplatz
+import numpy as np
+import pandas as pd
+
+from duration_parsing import to_float
+from instrumentation import instrument
+from timestamp_parsing import parse_timestamps
+
+ORDER_KEY = 'Arbeitsplatz'
+MACHINE_KEY = 'Work Center'
+MACHINE_START = 'Start date / time'
+MACHINE_END = 'End date / time'
+
+
+def work_center_keys(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Nur die Kategorien umwandeln und über die Codes verteilen (-1 = fehlend -> 'nan')
+        categories = work_center_keys(pd.Series(series.cat.categories))
+        return np.append(categories, 'nan')[series.cat.codes.to_numpy()]
+    # Ganzzahlige Arbeitsplätze, die durch fehlende Werte als float gelesen wurden (41023.0), wie '41023' behandeln
+    if pd.api.types.is_float_dtype(series):
+        try:
+            series = series.astype('Int64')
+        except (TypeError, ValueError):
+            pass
+    return series.astype(str).to_numpy()
+
+
+def _as_ns(series):
+    return parse_timestamps(series).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+
+def overlapping_interval_pairs(df_orders, df_machine, tolerance=None):
+    """
+    Findet alle Paare (Auftrag, Maschinenzeile) desselben Arbeitsplatzes, deren Zeitfenster sich
+    überschneiden. Das Auftragsfenster wird optional um `tolerance` (pd.Timedelta) nach beiden
+    Seiten erweitert.
+
+    Pro Arbeitsplatz werden die Maschinenintervalle nach Start sortiert; für jeden Auftrag liefert
+    eine binäre Suche den Kandidatenbereich (Start < Auftragsende, Start >= Auftragsstart minus
+    längstes Intervall). Aufwand O((n + m) log m) plus Anzahl Kandidaten statt Kreuzprodukt.
+
+    Gibt die Positionen (iloc) der Aufträge und Maschinenzeilen sowie die Überlappung in Minuten zurück.
+    """
+    pad = 0 if tolerance is None else pd.Timedelta(tolerance).value
+
+    order_start = _as_ns(df_orders['Start_ts'])
+    order_end = _as_ns(df_orders['End_ts'])
+    m_start = _as_ns(df_machine[MACHINE_START])
+    m_end = _as_ns(df_machine[MACHINE_END])
+    nat = np.iinfo(np.int64).min
+
+    o_valid = (order_start != nat) & (order_end != nat)
+    with np.errstate(over='ignore'):
+        o_start = order_start - pad
+        o_end = order_end + pad
+    m_valid = (m_start != nat) & (m_end != nat) & (m_end > m_start)
+
+    # Arbeitsplatz-Schlüssel vereinheitlichen (SAP liefert z. B. Zahlen, Reporting Strings)
+    o_keys = work_center_keys(df_orders[ORDER_KEY])
+    m_keys = work_center_keys(df_machine[MACHINE_KEY])
+
+    m_positions = np.flatnonzero(m_valid)
+    o_positions = np.flatnonzero(o_valid)
+    m_groups = pd.Series(m_positions).groupby(m_keys[m_positions]).indices
+    o_groups = pd.Series(o_positions).groupby(o_keys[o_positions]).indices
+
+    order_parts, machine_parts = [], []
+    for key, o_local in o_groups.items():
+        if key not in m_groups:
+            continue
+        m_idx = m_positions[m_groups[key]]
+        m_idx = m_idx[np.argsort(m_start[m_idx], kind='stable')]
+        starts = m_start[m_idx]
+        ends = m_end[m_idx]
+        max_len = (ends - starts).max()
+
+        o_idx = o_positions[o_local]
+        s = o_start[o_idx]
+        e = o_end[o_idx]
+
+        lo = np.searchsorted(starts, s - max_len, side='left')
+        hi = np.searchsorted(starts, e, side='left')
+        counts = np.maximum(hi - lo, 0)
+        total = counts.sum()
+        if total == 0:
+            continue
+
+        # Kandidatenbereiche [lo, hi) ohne Python-Schleife aufspannen
+        rep = np.repeat(np.arange(len(o_idx)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        cand = np.repeat(lo, counts) + offsets
+
+        keep = ends[cand] > s[rep]
+        order_parts.append(o_idx[rep[keep]])
+        machine_parts.append(m_idx[cand[keep]])
+
+    if not order_parts:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=float)
+
+    order_pos = np.concatenate(order_parts)
+    machine_pos = np.concatenate(machine_parts)
+    # Überlappung immer bezogen auf das ursprüngliche Auftragsfenster (ohne Toleranz)
+    overlap_ns = (
+        np.minimum(order_end[order_pos], m_end[machine_pos])
+        - np.maximum(order_start[order_pos], m_start[machine_pos])
+    )
+    overlap_minutes = np.clip(overlap_ns, 0, None) / 60e9
+    return order_pos, machine_pos, overlap_minutes
+
+
+@instrument()
+def interval_join(df_orders, df_machine, order_cols=None, machine_cols=None, tolerance=None):
+    """
+    Verknüpft Aufträge und Maschinenzeilen über überlappende Zeitfenster pro Arbeitsplatz.
+    Ergebnis: eine Zeile pro überlappendem Paar mit den gewählten Spalten und 'Overlap_Minutes'.
+    """
+    order_pos, machine_pos, overlap = overlapping_interval_pairs(df_orders, df_machine, tolerance)
+    order_cols = list(df_orders.columns) if order_cols is None else order_cols
+    machine_cols = list(df_machine.columns) if machine_cols is None else machine_cols
+
+    left = df_orders[order_cols].iloc[order_pos].reset_index(drop=True)
+    right = df_machine[machine_cols].iloc[machine_pos].reset_index(drop=True)
+    right = right[[col for col in right.columns if col not in left.columns]]
+    joined = pd.concat([left, right], axis=1)
+    joined['Overlap_Minutes'] = overlap
+    return joined
+
+
+@instrument()
+def aggregate_interval_matches(df_orders, df_machine):
+    """
+    Summiert pro Auftrag die Downtime aller überlappenden Maschinenintervalle.
+    Liefert Auftrag, Kurztext, Arbeitsplatz, Order_Duration, Downtime, Overlap_Minutes und Matched_Intervals.
+    """
+    df_machine = df_machine[[MACHINE_KEY, MACHINE_START, MACHINE_END, 'Downtime']].copy()
+    df_machine['Downtime'] = to_float(df_machine['Downtime'], fill_value=0)
+
+    order_cols = ['Auftrag', 'Kurztext', 'Arbeitsplatz', 'Order_Duration', 'Start_ts', 'End_ts']
+    order_pos, machine_pos, overlap = overlapping_interval_pairs(df_orders, df_machine)
+
+    matched = pd.DataFrame({
+        'order_pos': order_pos,
+        'Downtime': df_machine['Downtime'].to_numpy()[machine_pos],
+        'Overlap_Minutes': overlap,
+    })
+    per_order = matched.groupby('order_pos').agg(
+        Downtime=('Downtime', 'sum'),
+        Overlap_Minutes=('Overlap_Minutes', 'sum'),
+        Matched_Intervals=('Downtime', 'size')
+    )
+    result = df_orders[order_cols].iloc[per_order.index].reset_index(drop=True)
+    return pd.concat([result, per_order.reset_index(drop=True)], axis=1)
@@ -0,0 +1,180 @@
+# machine_store.py
+# 👉 Zeitlich sortierter Maschinendaten-Speicher pro Arbeitsplatz: Fensterabfragen per binärer Suche,
+#    Summen über Präfixsummen, Trends pro Schicht/Tag/Woche/Monat und gleitende Summen
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from downtime_from_machine_damage_types import DAMAGE_COLUMNS, READABLE_NAMES
+from duration_parsing import extract_decimal
+from instrumentation import instrument
+from interval_matching import work_center_keys
+from timestamp_parsing import parse_timestamps
+
+MEASURES = ['Downtime'] + [READABLE_NAMES[col] for col in DAMAGE_COLUMNS]
+
+# Zeitraster für Trends; Schichten beginnen um 06:00, 14:00 und 22:00
+FREQUENCIES = {'shift': '8h', 'day': 'D', 'week': 'W-SUN', 'month': 'MS'}
+SHIFT_OFFSET = '6h'
+
+
+class MachineStore:
+    """
+    Maschinendaten nach (Arbeitsplatz, Zeit) sortiert in einem DataFrame mit DatetimeIndex;
+    jeder Arbeitsplatz belegt einen zusammenhängenden Zeilenbereich. Kennzahlen (Downtime und
+    Schadensbild-Spalten) sind beim Aufbau einmal als float geparst.
+    - window(): Zeilen eines Fensters [start, end) als Slice (ohne Kopie bei einem Arbeitsplatz)
+    - window_totals()/window_means(): Summen/Mittelwerte pro Fenster in O(log n) über Präfixsummen
+    - resample()/rolling(): Trends pro Schicht/Tag/Woche/Monat für alle Arbeitsplätze in einem Durchlauf
+    """
+
+    def __init__(self, frame, bounds, time_column):
+        self.frame = frame
+        self.bounds = bounds  # Arbeitsplatz -> (erste Zeile, Ende)
+        self.time_column = time_column
+        self._times = frame.index.asi8
+        values = frame[MEASURES].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        # Präfixsummen mit führender Nullzeile: Summe über Zeilen [a, b) = csum[b] - csum[a]
+        self._value_csum = np.vstack([np.zeros((1, len(MEASURES))), np.cumsum(np.where(valid, values, 0.0), axis=0)])
+        self._count_csum = np.vstack([np.zeros((1, len(MEASURES)), dtype=np.int64), np.cumsum(valid, axis=0)])
+
+    @classmethod
+    def from_frame(cls, df_machine, time_column='Start date / time'):
+        """
+        Baut den Speicher aus vorverarbeiteten Maschinendaten. `time_column` bestimmt die Zeitachse:
+        'Start date / time' für Schicht-/Tagestrends, 'Calendar day' für dieselbe Tageszuordnung wie
+        analyze_machine_damage_types. Zeilen ohne gültigen Zeitpunkt werden nicht übernommen.
+        """
+        times = parse_timestamps(df_machine[time_column])
+        frame = pd.DataFrame({
+            'Work Center': work_center_keys(df_machine['Work Center'].ffill()),
+            'Downtime': pd.to_numeric(df_machine['Downtime'], errors='coerce').astype(float)
+            if 'Downtime' in df_machine.columns else np.nan,
+        }, index=df_machine.index)
+        present = [col for col in DAMAGE_COLUMNS if col in df_machine.columns]
+        parsed = extract_decimal(df_machine[present]) if present else pd.DataFrame(index=df_machine.index)
+        for col in DAMAGE_COLUMNS:
+            frame[READABLE_NAMES[col]] = parsed[col].astype(float) if col in present else np.nan
+
+        frame.index = pd.DatetimeIndex(times, name=time_column)
+        frame = frame[frame.index.notna()]
+        # Stabil sortieren: gleiche Zeitpunkte behalten die Reihenfolge des Exports
+        order = np.lexsort((frame.index.asi8, frame['Work Center'].to_numpy()))
+        frame = frame.iloc[order]
+
+        work_centers = frame['Work Center'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, work_centers[1:] != work_centers[:-1]]) if len(frame) else np.array([], dtype=int)
+        ends = np.r_[starts[1:], len(frame)]
+        bounds = {work_centers[a]: (int(a), int(b)) for a, b in zip(starts, ends)}
+        return cls(frame, bounds, time_column)
+
+    @property
+    def work_centers(self):
+        return list(self.bounds)
+
+    def _rows(self, start, end, work_centers):
+        """
+        Zeilenbereiche [a, b) pro Arbeitsplatz für das Fenster [start, end) per binärer Suche.
+        """
+        start = np.iinfo(np.int64).min if start is None else pd.Timestamp(start).value
+        end = np.iinfo(np.int64).max if end is None else pd.Timestamp(end).value
+        selected = self.bounds if work_centers is None else {
+            str(wc): self.bounds[str(wc)] for wc in work_centers if str(wc) in self.bounds
+        }
+        ranges = {}
+        for wc, (lo, hi) in selected.items():
+            times = self._times[lo:hi]
+            ranges[wc] = (lo + int(np.searchsorted(times, start, side='left')),
+                          lo + int(np.searchsorted(times, end, side='left')))
+        return ranges
+
+    def window(self, start=None, end=None, work_centers=None):
+        """
+        Zeilen im Fenster [start, end). Für einen einzelnen Arbeitsplatz ein Slice des Speichers
+        (nicht verändern), sonst die aneinandergehängten Slices.
+        """
+        parts = [self.frame.iloc[a:b] for a, b in self._rows(start, end, work_centers).values()]
+        if len(parts) == 1:
+            return parts[0]
+        return pd.concat(parts) if parts else self.frame.iloc[0:0]
+
+    def window_totals(self, start=None, end=None, work_centers=None):
+        """
+        Summe und Anzahl gültiger Werte je Kennzahl pro Arbeitsplatz im Fenster [start, end),
+        ohne die Zeilen anzufassen. Spalten '<Kennzahl>' (Summe) und '<Kennzahl>_count'.
+        """
+        ranges = self._rows(start, end, work_centers)
+        a = np.array([r[0] for r in ranges.values()], dtype=np.int64)
+        b = np.array([r[1] for r in ranges.values()], dtype=np.int64)
+        sums = self._value_csum[b] - self._value_csum[a]
+        counts = self._count_csum[b] - self._count_csum[a]
+        columns = {measure: sums[:, i] for i, measure in enumerate(MEASURES)}
+        columns.update({f"{measure}_count": counts[:, i] for i, measure in enumerate(MEASURES)})
+        return pd.DataFrame(columns, index=pd.Index(list(ranges), name='Work Center'))
+
+    def window_means(self, start=None, end=None, work_centers=None):
+        """
+        Mittelwert je Kennzahl über alle gewählten Arbeitsplätze im Fenster [start, end) –
+        wie der Spaltenmittelwert der gefilterten Maschinenzeilen.
+        """
+        totals = self.window_totals(start, end, work_centers)
+        sums = totals[MEASURES].sum()
+        counts = totals[[f"{measure}_count" for measure in MEASURES]].sum().to_numpy()
+        return (sums / np.where(counts > 0, counts, np.nan)).rename('Mean')
+
+    def resample(self, freq='day', work_centers=None, columns=None, how='sum'):
+        """
+        Kennzahlen pro Arbeitsplatz und Zeitraster ('shift', 'day', 'week', 'month' oder ein
+        pandas-Offset) in einem vektorisierten groupby. Index (Work Center, Zeitraum).
+        """
+        columns = MEASURES if columns is None else columns
+        frame = self.frame if work_centers is None else self.window(work_centers=work_centers)
+        grouper = pd.Grouper(
+            level=self.time_column, freq=FREQUENCIES.get(freq, freq),
+            **({'origin': 'start_day', 'offset': SHIFT_OFFSET} if freq == 'shift' else {})
+        )
+        return frame.groupby([frame['Work Center'], grouper], sort=True)[columns].agg(how)
+
+    def rolling(self, window, freq='day', work_centers=None, columns=None, how='sum'):
+        """
+        Gleitende Summe (bzw. `how`) über `window` (z. B. '7D' oder Anzahl Perioden) auf den
+        Werten pro Zeitraster – Lücken ohne Maschinendaten zählen als 0.
+        """
+        columns = MEASURES if columns is None else columns
+        binned = self.resample(freq, work_centers, columns)
+        parts = {}
+        for wc, part in binned.groupby(level='Work Center', sort=True):
+            part = part.droplevel('Work Center')
+            part = part.asfreq(FREQUENCIES.get(freq, freq), fill_value=0.0)
+            parts[wc] = getattr(part.rolling(window, min_periods=1), how)()
+        if not parts:
+            return binned.iloc[0:0]
+        return pd.concat(parts, names=['Work Center'])
+
+
+@instrument()
+def build_machine_store(df_machine, time_column='Start date / time'):
+    return MachineStore.from_frame(df_machine, time_column)
+
+
+if __name__ == "__main__":
+    from data_loader import load_machine_data
+    from preprocessing import preprocess_machine_data
+
+    parser = argparse.ArgumentParser(description="Downtime-Trends pro Arbeitsplatz aus den Maschinendaten")
+    parser.add_argument('--freq', default='week', help="shift, day, week, month oder pandas-Offset")
+    parser.add_argument('--rolling', help="Gleitendes Fenster, z. B. 4 (Perioden) oder 28D")
+    parser.add_argument('--work-center', action='append', help="Nur diese Arbeitsplätze (mehrfach möglich)")
+    args = parser.parse_args()
+
+    store = build_machine_store(preprocess_machine_data(load_machine_data()))
+    if args.rolling:
+        window = int(args.rolling) if args.rolling.isdigit() else args.rolling
+        trend = store.rolling(window, args.freq, args.work_center)
+    else:
+        trend = store.resample(args.freq, args.work_center)
+    with pd.option_context('display.max_rows', 200, 'display.width', 200):
+        print(f"\n📈 Downtime pro Arbeitsplatz und Zeitraum ({args.freq}):")
+        print(trend)
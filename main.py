@@ -1,70 +1,189 @@
-from data_loader import load_machine_data, load_order_data
-from preprocessing import preprocess_machine_data, preprocess_order_data, merge_data
+import argparse
+
+from cache import configure_cache
+from config import SAP_ORDER_PATH, MACHINE_DATA_PATH, SAP_NOTIFICATION_PATH, SAP_FAILURECODES_PATH
+from data_loader import load_all, print_load_timings
+from preprocessing import preprocess_machine_data, preprocess_order_data
 from categorization import classify_damage_types
-from analysis import analyze_priorities, correlate_downtime, print_damage_stats
+from analysis import analyze_priorities, correlate_downtime_grouped, damage_type_stats, print_damage_stats
 from visualization import plot_boxplot_priorities
 from downtime_matching import visualize_matched_downtime_orders
-from sap_damage_type_analysis import analyze_sap_damage_types
-from data_loader import load_notification_data, load_failurecode_data
-from downtime_from_machine_damage_types import analyze_machine_damage_types
-from damage_comparison import compare_damage_type_durations
+from sap_damage_type_analysis import analyze_sap_damage_types, plot_sap_damage_types, print_sap_damage_stats
+from sap_lookup import load_or_build_index
+from code_matching import label_uncoded_orders, load_or_build_code_index, print_code_matching
+from downtime_cube import DowntimeCube, build_downtime_cube
+from downtime_from_machine_damage_types import analyze_machine_damage_types, print_machine_averages
+from damage_comparison import compare_damage_type_durations, print_damage_comparison
+from figure_rendering import build_figure_jobs, configure_figures, render_figures
+from instrumentation import configure_instrumentation, print_summary
+from pipeline import Pipeline
+from reliability import compute_reliability, print_reliability
+from schema import optimize_machine_data, optimize_order_data
 from visualization import plot_damage_type_distribution
 
 
-print("📦 Skript gestartet")
+# 👉 Pipeline-Stufen – jede Stufe arbeitet auf Kopien, da Ergebnisse zwischen Stufen geteilt werden
 
 # 1. Daten laden
-df_machine = load_machine_data()
-df_orders = load_order_data()
-df_notifications = load_notification_data()
-df_failurecodes = load_failurecode_data()
+def stage_load():
+    # Alle Quellen parallel laden, kompaktes Schema direkt in den Worker-Prozessen
+    frames, timings = load_all(optimize=True)
+    print_load_timings(timings)
+    return frames
 
 
 # 2. Vorverarbeitung
-df_machine = preprocess_machine_data(df_machine)
-df_orders = preprocess_order_data(df_orders)
-df_merged = merge_data(df_machine, df_orders)
-df_orders.columns = df_orders.columns.str.strip()
+def stage_preprocess(raw):
+    df_machine = preprocess_machine_data(raw['machine'].copy())
+    df_orders = preprocess_order_data(raw['orders'].copy())
+    df_orders.columns = df_orders.columns.str.strip()
+    # Downtime ist erst nach dem Parsen numerisch -> float32, wo verlustfrei
+    return {'machine': optimize_machine_data(df_machine, report=False), 'orders': df_orders}
 
 
 # 3. Schadensklassifikation
-df_orders = classify_damage_types(df_orders)
+def stage_classify(prepared):
+    return optimize_order_data(classify_damage_types(prepared['orders'].copy()), report=False)
+
+
+# Statistiken pro Schadensbild mit Bootstrap-Intervallen – einmal berechnet für Ausgabe und Vergleichstabelle
+def stage_text_stats(df_orders):
+    return damage_type_stats(df_orders, bootstrap=True)
+
 
 # 4. Analyse
-analyze_priorities(df_orders)
-correlate_downtime(df_merged)
-print_damage_stats(df_orders)
+def stage_analysis(prepared, df_orders, damage_stats):
+    analyze_priorities(df_orders)
+    # Korrelation aus Gruppenmomenten pro Arbeitsplatz und Tag – ohne explodierenden Merge
+    correlate_downtime_grouped(prepared['machine'], df_orders, by='day')
+    print_damage_stats(df_orders, damage_stats=damage_stats)
+
 
 # SAP-Schadensbilder
-df_sap = analyze_sap_damage_types(df_orders, df_notifications, df_failurecodes)
+def stage_sap(df_orders, raw):
+    # Grafik separat in der Plot-Stufe, damit sie auch bei Cache-Treffern erscheint.
+    # Nachschlage-Index einmal pro Meldungs-/Code-Tabelle bauen und wiederverwenden (auch über Werke im Batch)
+    index = load_or_build_index(raw['notifications'], raw['failurecodes'])
+    return analyze_sap_damage_types(df_orders, raw['notifications'], raw['failurecodes'], show_plot=False, index=index,
+                                    bootstrap=True, verbose=False)
 
-# Maschinenstillstände pro Schadensbild
-df_machine_avg = analyze_machine_damage_types(df_machine, df_orders)
 
-# Kurztextanalyse nach Schadensbild
-df_text = classify_damage_types(df_orders)
+# SAP-Schadenscodes für Aufträge ohne Meldung aus dem Kurztext (n-Gramm-Ähnlichkeit zu codierten Aufträgen)
+def stage_code_matching(df_orders, raw):
+    sap_index = load_or_build_index(raw['notifications'], raw['failurecodes'])
+    code_index = load_or_build_code_index(df_orders, sap_index, raw['failurecodes'])
+    return label_uncoded_orders(df_orders, code_index, sap_index)
 
-df_text_avg = (
-    df_orders[['Damage_Type', 'Order_Duration']]
-    .dropna()
-    .groupby('Damage_Type')
-    .mean()
-    .reset_index()
-    .rename(columns={'Order_Duration': 'Order_Duration_Text'})
-)
 
-# Vergleichstabelle erzeugen
-print(type(df_text), type(df_sap), type(df_machine_avg))
-df_combined = compare_damage_type_durations(df_text_avg, df_sap, df_machine_avg)
+# Downtime-Würfel pro Tag und Arbeitsplatz (SQLite) – Folgestufen fragen nur noch Zeiträume ab.
+# Ohne `path` ist die Datei nach dem Inhalt benannt; fehlt sie bei einem Cache-Treffer, wird neu gebaut
+def stage_cube(prepared, path=None):
+    return build_downtime_cube(prepared['machine'], path)
 
 
+# Maschinenstillstände pro Schadensbild (Mittelwerte und Konfidenzintervalle als Bereichsabfrage im Würfel)
+def stage_machine(cube, df_orders):
+    return analyze_machine_damage_types(None, df_orders, cube=cube, bootstrap=True, verbose=False)
 
-# 5. Visualisierung
-plot_boxplot_priorities(df_orders)
-visualize_matched_downtime_orders(df_machine, df_orders, downtime_threshold=60)
-plot_damage_type_distribution(df_orders)
+
+# MTBF / MTTR pro Arbeitsplatz und Schadensbild
+def stage_reliability(prepared, df_orders):
+    return compute_reliability(prepared['machine'], df_orders)
 
 
+# Vergleichstabelle erzeugen (Kurztextanalyse nach Schadensbild vs. SAP vs. Maschine)
+def stage_comparison(damage_stats, df_sap, df_machine_avg, df_reliability=None):
+    # Mittelwerte und Konfidenzintervalle aus stage_text_stats übernehmen statt neu zu berechnen
+    columns = {
+        'Durchschnittliche_Auftragsdauer': 'Order_Duration_Text',
+        'CI_Low': 'Order_Duration_Text_CI_Low',
+        'CI_High': 'Order_Duration_Text_CI_High',
+    }
+    df_text_avg = (
+        damage_stats[['Damage_Type'] + [column for column in columns if column in damage_stats.columns]]
+        .rename(columns=columns)
+        .dropna(subset=['Order_Duration_Text'])
+    )
+    return compare_damage_type_durations(df_text_avg, df_sap.copy(), df_machine_avg.copy(), df_reliability, verbose=False)
 
 
+# Konsolenausgabe der gecachten Ergebnisse – nicht persistiert, damit sie auch bei Cache-Treffern erscheint
+def stage_report(df_sap, labelled, df_machine_avg, df_reliability, df_comparison):
+    if df_sap is not None:
+        print_sap_damage_stats(df_sap)
+    if labelled is not None:
+        print_code_matching(labelled)
+    print_machine_averages(df_machine_avg)
+    print_reliability(df_reliability)
+    print_damage_comparison(df_comparison)
 
+
+# 5. Visualisierung
+def stage_plots(prepared, df_orders, df_sap):
+    plot_boxplot_priorities(df_orders)
+    visualize_matched_downtime_orders(prepared['machine'].copy(), df_orders.copy(), downtime_threshold=60, match_mode='interval')
+    plot_damage_type_distribution(df_orders)
+    if df_sap is not None:
+        plot_sap_damage_types(df_sap)
+
+
+# 5. Visualisierung (headless): Grafiken als Dateien, parallel und per Inhalts-Hash gecacht
+def stage_figures(prepared, df_orders, df_sap):
+    jobs = build_figure_jobs(prepared['machine'], df_orders, df_sap, downtime_threshold=60, match_mode='interval')
+    return render_figures(jobs)
+
+
+def build_pipeline(enabled=True, rebuild=False, headless=False):
+    pipeline = Pipeline(enabled=enabled, rebuild=rebuild)
+    # Code-Abhängigkeiten (transitiv importierte Projektmodule) ermittelt die Pipeline selbst
+    pipeline.add('load', stage_load,
+                 files=[SAP_ORDER_PATH, MACHINE_DATA_PATH, SAP_NOTIFICATION_PATH, SAP_FAILURECODES_PATH], persist=False)
+    pipeline.add('preprocess', stage_preprocess, deps=['load'])
+    pipeline.add('classify', stage_classify, deps=['preprocess'])
+    pipeline.add('text_stats', stage_text_stats, deps=['classify'])
+    pipeline.add('analysis', stage_analysis, deps=['preprocess', 'classify', 'text_stats'], persist=False)
+    pipeline.add('sap', stage_sap, deps=['classify', 'load'])
+    pipeline.add('code_matching', stage_code_matching, deps=['classify', 'load'])
+    pipeline.add('cube', stage_cube, deps=['preprocess'], validate=DowntimeCube.exists)
+    pipeline.add('machine', stage_machine, deps=['cube', 'classify'])
+    pipeline.add('reliability', stage_reliability, deps=['preprocess', 'classify'])
+    pipeline.add('comparison', stage_comparison, deps=['text_stats', 'sap', 'machine', 'reliability'])
+    pipeline.add('report', stage_report, deps=['sap', 'code_matching', 'machine', 'reliability', 'comparison'], persist=False)
+    if headless:
+        pipeline.add('plots', stage_figures, deps=['preprocess', 'classify', 'sap'], persist=False)
+    else:
+        pipeline.add('plots', stage_plots, deps=['preprocess', 'classify', 'sap'], persist=False)
+    return pipeline
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Korrelationsanalyse SAP-Aufträge / Maschinenstillstände")
+    parser.add_argument('--no-cache', action='store_true', help="Excel-Exporte und Stufen ohne Cache berechnen")
+    parser.add_argument('--rebuild-cache', action='store_true', help="Cache-Einträge neu aufbauen")
+    parser.add_argument('--headless', action='store_true',
+                        help="Grafiken nicht anzeigen, sondern parallel als Dateien speichern (Agg-Backend)")
+    parser.add_argument('--figure-dir', help="Zielverzeichnis für --headless")
+    parser.add_argument('--instrument', action='store_true',
+                        help="Zeit, CPU, Speicherspitze und Zeilen pro Stufe/Funktion messen und am Ende ausgeben")
+    parser.add_argument('--metrics', help="Messwerte zusätzlich als JSON Lines an diese Datei anhängen")
+    parser.add_argument('--profile', metavar='DIR', help="cProfile-Datei pro Pipeline-Stufe in DIR schreiben")
+    parser.add_argument('--no-trace-memory', action='store_true', help="Speicherspitze nicht per tracemalloc messen")
+    args = parser.parse_args()
+    configure_cache(enabled=not args.no_cache, rebuild=args.rebuild_cache)
+    configure_figures(output_dir=args.figure_dir)
+    configure_instrumentation(
+        enabled=bool(args.instrument or args.metrics or args.profile),
+        jsonl_path=args.metrics,
+        profile_dir=args.profile,
+        trace_memory=not args.no_trace_memory
+    )
+    if args.headless:
+        import matplotlib
+        matplotlib.use('Agg')
+
+    print("📦 Skript gestartet")
+
+    pipeline = build_pipeline(enabled=not args.no_cache, rebuild=args.rebuild_cache, headless=args.headless)
+    pipeline.run_all()
+    pipeline.print_report()
+    print_summary()
@@ -0,0 +1,103 @@
+# online_stats.py
+# 👉 Zusammenführbare Akkumulatoren (Anzahl, Mittelwert, Varianz nach Welford/Chan) für Streaming-Analysen
+import numpy as np
+import pandas as pd
+
+
+def _combine(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """
+    Parallele Welford-Kombination (Chan et al.) zweier Teilmengen; funktioniert
+    elementweise für Skalare und NumPy-Arrays. Leere Teilmengen (n = 0) sind erlaubt.
+    """
+    n_a = np.asarray(n_a, dtype=float)
+    n_b = np.asarray(n_b, dtype=float)
+    mean_a = np.where(n_a > 0, mean_a, 0.0)
+    mean_b = np.where(n_b > 0, mean_b, 0.0)
+    n = n_a + n_b
+    safe_n = np.where(n > 0, n, 1.0)
+    delta = mean_b - mean_a
+    mean = np.where(n > 0, mean_a + delta * n_b / safe_n, np.nan)
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / safe_n
+    return n, mean, m2
+
+
+def group_moments(values, keys):
+    """
+    Anzahl, Mittelwert und Summe der quadrierten Abweichungen (m2) der nicht-fehlenden Werte
+    pro Gruppe. `keys` ist eine Liste gleich langer Schlüssel-Series. Gruppen ohne gültige
+    Werte erscheinen mit count 0 (wie bei groupby().mean()).
+    """
+    # In float64 aggregieren, auch wenn die Spalte kompakt als float32 vorliegt
+    grouped = values.astype(float).groupby(keys, observed=True)
+    count = grouped.count()
+    return pd.DataFrame({
+        'count': count,
+        'mean': grouped.mean(),
+        'm2': (grouped.var(ddof=0) * count).fillna(0.0),
+    })
+
+
+class RunningMoments:
+    """
+    Anzahl, Mittelwert und Varianz eines Werte-Stroms; chunkweise aktualisierbar
+    und über merge() mit Akkumulatoren anderer Prozesse kombinierbar.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = np.nan
+        self.m2 = 0.0
+
+    def update(self, values):
+        values = pd.to_numeric(pd.Series(values), errors='coerce').dropna()
+        if values.empty:
+            return self
+        n_b = len(values)
+        mean_b = values.mean()
+        m2_b = ((values - mean_b) ** 2).sum()
+        n, mean, m2 = _combine(self.count, self.mean, self.m2, n_b, mean_b, m2_b)
+        self.count, self.mean, self.m2 = int(n), float(mean), float(m2)
+        return self
+
+    def merge(self, other):
+        n, mean, m2 = _combine(self.count, self.mean, self.m2, other.count, other.mean, other.m2)
+        self.count, self.mean, self.m2 = int(n), float(mean), float(m2)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+
+class GroupedMoments:
+    """
+    RunningMoments pro Gruppe, als DataFrame (Index = Gruppenschlüssel, Spalten count/mean/m2).
+    update() aggregiert einen Chunk per groupby und kombiniert ihn vektorisiert mit dem Bestand.
+    """
+
+    def __init__(self, stats=None):
+        self.stats = stats if stats is not None else pd.DataFrame(columns=['count', 'mean', 'm2'], dtype=float)
+
+    def update(self, values, keys):
+        return self.merge(GroupedMoments(group_moments(pd.to_numeric(values, errors='coerce'), keys)))
+
+    def merge(self, other):
+        if self.stats.empty:
+            self.stats = other.stats.copy()
+            return self
+        if other.stats.empty:
+            return self
+        index = self.stats.index.union(other.stats.index)
+        a = self.stats.reindex(index)
+        b = other.stats.reindex(index)
+        n, mean, m2 = _combine(
+            a['count'].fillna(0).to_numpy(), a['mean'].to_numpy(), a['m2'].fillna(0).to_numpy(),
+            b['count'].fillna(0).to_numpy(), b['mean'].to_numpy(), b['m2'].fillna(0).to_numpy()
+        )
+        # Anzahl wieder ganzzahlig wie bei group_moments, unabhängig davon, wie oft kombiniert wurde
+        self.stats = pd.DataFrame({'count': n.astype(np.int64), 'mean': mean, 'm2': m2}, index=index)
+        return self
+
+    def variance(self):
+        count = self.stats['count']
+        return (self.stats['m2'] / (count - 1)).where(count > 1)
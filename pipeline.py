@@ -0,0 +1,245 @@
+# pipeline.py
+# 👉 Kleine Pipeline-Engine: Stufen als Abhängigkeitsgraph, Ergebnisse im Speicher und auf der Festplatte memoisiert
+import ast
+import hashlib
+import importlib.util
+import inspect
+import os
+import pickle
+import time
+
+from cache import file_fingerprint, get_cache_settings
+from instrumentation import timed_call
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+_import_cache = {}  # Quelldatei -> (mtime_ns, {importierter Name: Modulname})
+
+
+def _project_source(module_name):
+    # Quelldatei eines Projektmoduls; None für Standardbibliothek und installierte Pakete
+    try:
+        spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError):
+        return None
+    origin = getattr(spec, 'origin', None)
+    if origin is None or not origin.endswith('.py') or not os.path.abspath(origin).startswith(_PROJECT_DIR + os.sep):
+        return None
+    return os.path.abspath(origin)
+
+
+def _imports(path):
+    """
+    Alle Importe einer Quelldatei (auch in Funktionsrümpfen) als {gebundener Name: Modulname}.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    cached = _import_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                names[alias.asname or alias.name.split('.')[0]] = alias.name
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            for alias in node.names:
+                names[alias.asname or alias.name] = node.module
+    _import_cache[path] = (mtime, names)
+    return names
+
+
+def _code_names(code):
+    # Namen aus dem Code-Objekt einschließlich innerer Funktionen und Lambdas
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+
+def referenced_sources(func):
+    """
+    Quelldateien der Projektmodule, von denen `func` abhängt: die Module der Namen, die die Funktion
+    verwendet, und transitiv alles, was diese Module importieren. Hilfsfunktionen aus dem Modul von
+    `func` werden verfolgt, statt das ganze Modul (z. B. main.py mit allen Importen) aufzunehmen.
+    Gibt die sortierten Dateipfade und die verfolgten Funktionen zurück.
+    """
+    home_path = os.path.abspath(inspect.getsourcefile(func))
+    home_imports = _imports(home_path)
+    sources, functions, pending = set(), set(), [func]
+    while pending:
+        current = pending.pop()
+        if current in functions:
+            continue
+        functions.add(current)
+        for name in _code_names(current.__code__):
+            obj = current.__globals__.get(name)
+            if inspect.isfunction(obj) and os.path.abspath(inspect.getsourcefile(obj)) == home_path:
+                pending.append(obj)
+                continue
+            module_name = home_imports.get(name)
+            if module_name is None and inspect.ismodule(obj):
+                module_name = obj.__name__
+            path = _project_source(module_name) if module_name else None
+            if path is not None and path != home_path:
+                sources.add(path)
+
+    pending = list(sources)
+    while pending:
+        for module_name in set(_imports(pending.pop()).values()):
+            path = _project_source(module_name)
+            if path is not None and path != home_path and path not in sources:
+                sources.add(path)
+                pending.append(path)
+    return sorted(sources), functions
+
+
+class Stage:
+    """
+    Eine Pipeline-Stufe. `func` erhält die Ergebnisse der Stufen in `deps` als Argumente.
+    Der Cache-Schlüssel ergibt sich aus dem Quelltext von `func` und aller Projektmodule, die sie
+    transitiv verwendet (referenced_sources), den Fingerprints von `files`, `params` und den
+    Schlüsseln der Abhängigkeiten. `modules` ergänzt Module, die sich nicht aus den Importen ablesen lassen.
+    Stufen mit persist=False (z. B. Laden, Plots) werden nur im Speicher gehalten
+    und in jedem Lauf höchstens einmal ausgeführt. `validate` prüft ein von der Festplatte
+    geladenes Ergebnis (z. B. ob eine referenzierte Datei noch existiert); ist es ungültig,
+    wird die Stufe neu berechnet.
+    Stufen dürfen ihre Eingaben nicht verändern – sie werden zwischen Stufen geteilt.
+    """
+
+    def __init__(self, name, func, deps=(), files=(), modules=(), params=None, persist=True, validate=None):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.files = list(files)
+        self.modules = list(modules)
+        self.params = params or {}
+        self.persist = persist
+        self.validate = validate
+
+    def code_version(self):
+        sha = hashlib.sha256(inspect.getsource(self.func).encode('utf-8'))
+        sources, functions = referenced_sources(self.func)
+        # Hilfsfunktionen aus dem Modul der Stufe, nach Namen sortiert für einen stabilen Schlüssel
+        for helper in sorted(functions - {self.func}, key=lambda f: f.__qualname__):
+            sha.update(inspect.getsource(helper).encode('utf-8'))
+        paths = set(sources) | {os.path.abspath(inspect.getsourcefile(module)) for module in self.modules}
+        for path in sorted(paths):
+            with open(path, 'rb') as f:
+                sha.update(f.read())
+        return sha.hexdigest()
+
+
+class Pipeline:
+    def __init__(self, cache_dir=None, enabled=True, rebuild=False):
+        self.cache_dir = cache_dir or os.path.join(get_cache_settings()['cache_dir'], 'stages')
+        self.enabled = enabled
+        self.rebuild = rebuild
+        self.stages = {}
+        self._keys = {}
+        self._memory = {}
+        self.report = []
+
+    def add(self, name, func, deps=(), files=(), modules=(), params=None, persist=True, validate=None):
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stufe '{name}' hängt von unbekannter Stufe '{dep}' ab.")
+        self.stages[name] = Stage(name, func, deps, files, modules, params, persist, validate)
+        return self
+
+    def stage_key(self, name):
+        if name not in self._keys:
+            stage = self.stages[name]
+            sha = hashlib.sha256(name.encode('utf-8'))
+            sha.update(stage.code_version().encode('utf-8'))
+            for path in stage.files:
+                fingerprint = file_fingerprint(path)
+                sha.update(f"{fingerprint['path']}|{fingerprint['size']}|{fingerprint['mtime_ns']}".encode('utf-8'))
+            sha.update(repr(sorted(stage.params.items())).encode('utf-8'))
+            for dep in stage.deps:
+                sha.update(self.stage_key(dep).encode('utf-8'))
+            self._keys[name] = sha.hexdigest()
+        return self._keys[name]
+
+    def _disk_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}_{self.stage_key(name)[:16]}.pkl")
+
+    def _load_from_disk(self, name):
+        path = self._disk_path(name)
+        if not os.path.exists(path):
+            return False, None
+        try:
+            with open(path, 'rb') as f:
+                return True, pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False, None
+
+    def _save_to_disk(self, name, output):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._disk_path(name)
+        # Veraltete Einträge derselben Stufe entfernen
+        for entry in os.listdir(self.cache_dir):
+            if entry.startswith(f"{name}_") and entry.endswith('.pkl'):
+                os.remove(os.path.join(self.cache_dir, entry))
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def _record(self, name, status, seconds):
+        self.report.append((name, status, seconds))
+        if status == 'memory':
+            return
+        icons = {'disk': '💾', 'miss': '🔄', 'run': '▶️'}
+        labels = {
+            'disk': 'Cache-Treffer (Festplatte)',
+            'miss': 'Cache-Fehlschlag, neu berechnet',
+            'run': 'ausgeführt (nicht gecacht)',
+        }
+        print(f"{icons[status]} Stufe '{name}': {labels[status]} ({seconds:.2f} s)")
+
+    def run(self, name):
+        """
+        Liefert das Ergebnis der Stufe `name`. Abhängigkeiten werden nur berechnet,
+        wenn die Stufe selbst nicht aus dem Cache geladen werden kann.
+        """
+        stage = self.stages[name]
+        key = self.stage_key(name)
+        start = time.perf_counter()
+
+        if key in self._memory:
+            self._record(name, 'memory', time.perf_counter() - start)
+            return self._memory[key]
+
+        use_disk = self.enabled and stage.persist
+        if use_disk and not self.rebuild:
+            found, output = self._load_from_disk(name)
+            if found and (stage.validate is None or stage.validate(output)):
+                self._memory[key] = output
+                self._record(name, 'disk', time.perf_counter() - start)
+                return output
+
+        inputs = [self.run(dep) for dep in stage.deps]
+        start = time.perf_counter()
+        output = timed_call(f"stage.{name}", stage.func, *inputs)
+        if use_disk:
+            self._save_to_disk(name, output)
+        self._memory[key] = output
+        self._record(name, 'miss' if stage.persist else 'run', time.perf_counter() - start)
+        return output
+
+    def run_all(self):
+        """
+        Führt alle Endstufen (ohne nachgelagerte Stufen) aus; Zwischenstufen werden
+        nur berechnet, soweit sie nicht aus dem Cache kommen.
+        """
+        used = {dep for stage in self.stages.values() for dep in stage.deps}
+        return {name: self.run(name) for name in self.stages if name not in used}
+
+    def print_report(self):
+        print("\n🧭 Pipeline-Übersicht:")
+        for name, status, seconds in self.report:
+            if status == 'memory':
+                continue
+            print(f"   {name:<12} {status:<7} {seconds:8.2f} s")
@@ -1,43 +1,75 @@
 import pandas as pd
-import re
 
+from duration_parsing import parse_duration_minutes
+from instrumentation import instrument
+from interval_matching import interval_join
+from timestamp_parsing import parse_time_of_day, parse_timestamps
+
+columns_to_fill = [
+    'Plant', 'Work Center', 'ArticleNr - new (MD)',
+    'Material', 'Production Order',
+    'Start date / time', 'End date / time'
+]
+
+@instrument()
 def preprocess_machine_data(df):
-    columns_to_fill = [
-        'Plant', 'Work Center', 'ArticleNr - new (MD)',
-        'Material', 'Production Order',
-        'Start date / time', 'End date / time'
-    ]
     df[columns_to_fill] = df[columns_to_fill].ffill()
-    df['Start date / time'] = pd.to_datetime(df['Start date / time'], format='%d.%m.%Y %H:%M:%S', errors='coerce')
-    df['End date / time'] = pd.to_datetime(df['End date / time'], format='%d.%m.%Y %H:%M:%S', errors='coerce')
+    return _parse_machine_columns(df)
+
+def preprocess_machine_chunks(chunks):
+    """
+    Streaming-Variante von preprocess_machine_data: verarbeitet die Chunks aus
+    data_loader.iter_machine_data einzeln und gibt sie vorverarbeitet zurück.
+    Der Forward-Fill wird über die Chunk-Grenzen hinweg fortgeführt.
+    """
+    carry = None
+    for chunk in chunks:
+        chunk, carry = preprocess_machine_increment(chunk, carry)
+        yield chunk
+
+def preprocess_machine_increment(chunk, carry=None):
+    """
+    Vorverarbeitung eines einzelnen Chunks mit fortgeführtem Forward-Fill (siehe ffill_with_carry).
+    Gibt den vorverarbeiteten Chunk und den Carry für den nächsten Chunk zurück – der Carry kann
+    auch zwischen Läufen gespeichert werden (incremental.py).
+    """
+    chunk, carry = ffill_with_carry(chunk, carry)
+    return _parse_machine_columns(chunk), carry
 
-    # 👉 Formatprüfung und Parsing von 'Calendar day'
+def ffill_with_carry(chunk, carry=None):
+    """
+    Forward-Fill innerhalb eines Chunks; führende Lücken werden mit den letzten
+    Werten des vorherigen Chunks (`carry`) gefüllt. Gibt Chunk und neuen Carry zurück.
+    """
+    filled = chunk[columns_to_fill].ffill()
+    if carry is not None:
+        filled = filled.fillna(carry)
+    chunk[columns_to_fill] = filled
+    if filled.empty:
+        return chunk, carry
+    return chunk, filled.iloc[-1]
+
+def _parse_machine_columns(df):
+    df['Start date / time'] = parse_timestamps(df['Start date / time'])
+    df['End date / time'] = parse_timestamps(df['End date / time'])
+
+    # 👉 Parsing von 'Calendar day'; Zeilen ohne gültiges Datum (z. B. Fußzeile 'Result') entfallen.
+    #    Direkte Spaltenzuweisung, damit die Spalte datetime64 bleibt und nachgelagert nicht neu geparst wird
     if 'Calendar day' in df.columns:
-        df['Calendar day'] = df['Calendar day'].astype(str)
-        df = df[df['Calendar day'].str.match(r'\d{2}\.\d{2}\.\d{4}', na=False)]
-        df.loc[:, 'Calendar day'] = pd.to_datetime(df['Calendar day'], errors='coerce', dayfirst=True)
+        df['Calendar day'] = parse_timestamps(df['Calendar day'])
+        df = df[df['Calendar day'].notna()]
 
     if '[-] Malfunction' in df.columns:
         df = df.rename(columns={'[-] Malfunction': 'Downtime'})
-        df.loc[:, 'Downtime'] = df['Downtime'].apply(parse_downtime)
+        df['Downtime'] = parse_duration_minutes(df['Downtime'])
     return df
 
-def parse_downtime(val):
-    if pd.isnull(val):
-        return None
-    val = str(val).strip().upper()
-    match = re.match(r"(\d+(?:[\.,]\d*)?)\s*(H|MIN|M)?", val)
-    if not match:
-        return None
-    number = float(match.group(1).replace(',', '.'))
-    unit = match.group(2)
-    return number * 60 if unit and unit.startswith('H') else number
-
+@instrument()
 def preprocess_order_data(df):
-    df['Eckstarttermin'] = pd.to_datetime(df['Eckstarttermin'], errors='coerce')
-    df['Iststart Uhrzeit'] = pd.to_timedelta(df['Iststart Uhrzeit'].astype(str), errors='coerce')
-    df['Eckendtermin'] = pd.to_datetime(df['Eckendtermin'], errors='coerce')
-    df['Term. Ende Uhrzeit'] = pd.to_timedelta(df['Term. Ende Uhrzeit'].astype(str), errors='coerce')
+    df['Eckstarttermin'] = parse_timestamps(df['Eckstarttermin'])
+    df['Iststart Uhrzeit'] = parse_time_of_day(df['Iststart Uhrzeit'])
+    df['Eckendtermin'] = parse_timestamps(df['Eckendtermin'])
+    df['Term. Ende Uhrzeit'] = parse_time_of_day(df['Term. Ende Uhrzeit'])
 
     df['Start_ts'] = df['Eckstarttermin'] + df['Iststart Uhrzeit']
     df['End_ts'] = df['Eckendtermin'] + df['Term. Ende Uhrzeit']
@@ -50,5 +82,14 @@ def preprocess_order_data(df):
     df = df[(df['Order_Duration'] > 0) & (df['Order_Duration'] < 10000)]
     return df
 
-def merge_data(df_machine, df_orders):
-    return pd.merge(df_machine, df_orders, left_on='Work Center', right_on='Arbeitsplatz', how='inner')
+@instrument()
+def merge_data(df_machine, df_orders, tolerance=None):
+    """
+    Verknüpft Maschinendaten und Aufträge über den Arbeitsplatz. Ohne `tolerance` entsteht
+    jede Kombination pro Arbeitsplatz (nahezu kartesisches Produkt). Mit `tolerance`
+    (z. B. pd.Timedelta('2h')) werden nur Maschinenintervalle verknüpft, die das um die
+    Toleranz erweiterte Auftragsfenster überlappen – der Speicher wächst dann mit den Treffern.
+    """
+    if tolerance is None:
+        return pd.merge(df_machine, df_orders, left_on='Work Center', right_on='Arbeitsplatz', how='inner')
+    return interval_join(df_orders, df_machine, tolerance=tolerance)
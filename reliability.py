@@ -0,0 +1,148 @@
+# reliability.py
+# 👉 MTBF (mittlere Zeit zwischen Ausfällen) und MTTR (mittlere Reparaturdauer) pro Arbeitsplatz und Schadensbild –
+#    aus SAP-Aufträgen (Start_ts/End_ts) und Maschinendaten, über sortierte gruppenweise Differenzen ohne Python-Schleifen
+import numpy as np
+import pandas as pd
+
+from downtime_from_machine_damage_types import DAMAGE_COLUMNS, READABLE_NAMES
+from duration_parsing import extract_decimal
+from instrumentation import instrument
+from interval_matching import MACHINE_START, _as_ns, work_center_keys
+
+TOTAL_LABEL = 'Gesamt'  # Alle Ausfälle eines Arbeitsplatzes unabhängig vom Schadensbild
+SOURCE_ORDERS = 'Auftrag'
+SOURCE_MACHINE = 'Maschine'
+_NAT = np.iinfo(np.int64).min
+
+
+def _group_metrics(codes, starts, repairs, n_groups):
+    """
+    Kennzahlen pro Gruppe aus Ausfallereignissen (Gruppencode, Beginn in ns, Reparaturdauer in ns):
+    Ereignisse nach (Gruppe, Beginn) sortieren; Zeit zwischen Ausfällen = Beginn minus Ende der
+    vorherigen Reparatur derselben Gruppe (Überschneidungen zählen als 0).
+    """
+    order = np.lexsort((starts, codes))
+    codes, starts, repairs = codes[order], starts[order], repairs[order]
+
+    same_group = codes[1:] == codes[:-1]
+    gaps = np.clip(starts[1:] - (starts[:-1] + repairs[:-1]), 0, None)[same_group]
+    gap_codes = codes[1:][same_group]
+
+    failures = np.bincount(codes, minlength=n_groups)
+    intervals = np.bincount(gap_codes, minlength=n_groups)
+    gap_sum = np.bincount(gap_codes, weights=gaps.astype(float), minlength=n_groups)
+    repair_sum = np.bincount(codes, weights=repairs.astype(float), minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mtbf_hours = np.where(intervals > 0, gap_sum / np.maximum(intervals, 1) / 3600e9, np.nan)
+        mttr_minutes = np.where(failures > 0, repair_sum / np.maximum(failures, 1) / 60e9, np.nan)
+    return failures, intervals, mtbf_hours, mttr_minutes
+
+
+def _tidy(source, work_centers, damage_types, starts, repairs):
+    group_codes, groups = pd.factorize(pd.MultiIndex.from_arrays([work_centers, damage_types]))
+    failures, intervals, mtbf, mttr = _group_metrics(group_codes, starts, repairs, len(groups))
+    return pd.DataFrame({
+        'Quelle': source,
+        'Work Center': groups.get_level_values(0),
+        'Damage_Type': groups.get_level_values(1),
+        'Ausfälle': failures,
+        'Intervalle': intervals,
+        'MTBF_Hours': mtbf,
+        'MTTR_Minutes': mttr,
+    })
+
+
+def order_reliability(df_orders):
+    """
+    Jeder SAP-Auftrag ist ein Ausfall von Start_ts bis End_ts – pro Arbeitsplatz und Damage_Type
+    sowie pro Arbeitsplatz insgesamt (Damage_Type 'Gesamt').
+    """
+    start = _as_ns(df_orders['Start_ts'])
+    end = _as_ns(df_orders['End_ts'])
+    valid = np.flatnonzero((start != _NAT) & (end != _NAT) & (end >= start))
+    work_centers = work_center_keys(df_orders['Arbeitsplatz'])[valid]
+    damage_types = df_orders['Damage_Type'].astype(str).to_numpy()[valid] if 'Damage_Type' in df_orders.columns \
+        else np.full(len(valid), TOTAL_LABEL)
+
+    # Jedes Ereignis zweimal: unter seinem Schadensbild und unter 'Gesamt'
+    n = len(valid)
+    labels = np.concatenate([damage_types, np.full(n, TOTAL_LABEL)])
+    return _tidy(
+        SOURCE_ORDERS, np.tile(work_centers, 2), labels,
+        np.tile(start[valid], 2), np.tile(end[valid] - start[valid], 2)
+    )
+
+
+def machine_reliability(df_machine):
+    """
+    Maschinenzeilen mit Downtime > 0 sind Ausfälle ('Gesamt'); je Schadensbild-Spalte
+    (1201–1405, Stunden) zählen die Zeilen mit Wert > 0. Reparaturdauer = Downtime bzw. Spaltenwert.
+    """
+    start = _as_ns(df_machine[MACHINE_START])
+    valid = start != _NAT
+    work_centers = work_center_keys(df_machine['Work Center'].ffill())
+
+    present = [col for col in DAMAGE_COLUMNS if col in df_machine.columns]
+    minutes = [pd.to_numeric(df_machine['Downtime'], errors='coerce').to_numpy(dtype=float)]
+    if present:
+        # Schadensbild-Spalten sind in Stunden erfasst
+        minutes.append(extract_decimal(df_machine[present]).to_numpy(dtype=float) * 60)
+    minutes = np.column_stack(minutes)
+    labels = np.array([TOTAL_LABEL] + [READABLE_NAMES[col] for col in present])
+
+    # Alle (Zeile, Kennzahl)-Paare mit Ausfall in einem Schritt
+    rows, measures = np.nonzero((minutes > 0) & valid[:, None])
+    repairs = (minutes[rows, measures] * 60e9).astype(np.int64)
+    return _tidy(SOURCE_MACHINE, work_centers[rows], labels[measures], start[rows], repairs)
+
+
+@instrument()
+def compute_reliability(df_machine, df_orders):
+    """
+    Tidy-Tabelle mit einer Zeile pro Quelle ('Auftrag'/'Maschine'), Arbeitsplatz und Schadensbild:
+    Ausfälle, Intervalle (Anzahl gemessener Abstände), MTBF_Hours, MTTR_Minutes.
+    """
+    parts = []
+    if df_orders is not None:
+        parts.append(order_reliability(df_orders))
+    if df_machine is not None:
+        parts.append(machine_reliability(df_machine))
+    table = pd.concat(parts, ignore_index=True)
+    return table.sort_values(['Quelle', 'Work Center', 'Damage_Type'], ignore_index=True)
+
+
+def summarize_reliability(table, by=('Quelle', 'Damage_Type')):
+    """
+    Fasst die Tabelle über Arbeitsplätze zusammen: MTBF gewichtet mit der Anzahl der Intervalle,
+    MTTR mit der Anzahl der Ausfälle (entspricht dem Mittel über alle Ereignisse).
+    """
+    weighted = table.assign(
+        _gap=table['MTBF_Hours'].fillna(0) * table['Intervalle'],
+        _repair=table['MTTR_Minutes'].fillna(0) * table['Ausfälle'],
+    )
+    grouped = weighted.groupby(list(by), sort=True)[['Ausfälle', 'Intervalle', '_gap', '_repair']].sum()
+    grouped['MTBF_Hours'] = grouped['_gap'] / grouped['Intervalle'].where(grouped['Intervalle'] > 0)
+    grouped['MTTR_Minutes'] = grouped['_repair'] / grouped['Ausfälle'].where(grouped['Ausfälle'] > 0)
+    return grouped.drop(columns=['_gap', '_repair']).reset_index()
+
+
+def reliability_columns(table):
+    """
+    Breite Form pro Damage_Type für compare_damage_type_durations:
+    MTBF_<Quelle>_h und MTTR_<Quelle>_min. Die Zeilen 'Gesamt' entfallen (kein Schadensbild);
+    MTTR der Aufträge entfällt, da sie der mittleren Auftragsdauer (Order_Duration) entspricht.
+    """
+    summary = summarize_reliability(table[table['Damage_Type'] != TOTAL_LABEL])
+    wide = summary.pivot(index='Damage_Type', columns='Quelle', values=['MTBF_Hours', 'MTTR_Minutes'])
+    wide = wide.drop(columns=[('MTTR_Minutes', SOURCE_ORDERS)], errors='ignore')
+    wide.columns = [
+        f"MTBF_{source}_h" if metric == 'MTBF_Hours' else f"MTTR_{source}_min"
+        for metric, source in wide.columns
+    ]
+    return wide.reset_index()
+
+
+def print_reliability(table):
+    print("\n🔧 MTBF / MTTR pro Arbeitsplatz und Schadensbild:")
+    with pd.option_context('display.max_rows', 100, 'display.max_columns', None, 'display.width', 200):
+        print(table.round(1))
@@ -1,28 +1,38 @@
+import hashlib
+import io
+import json
+import os
+from functools import lru_cache
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from fpdf import FPDF
-import os
 
+from config import REPORT_CUBE_PATH, REPORT_DIR, REPORT_LOGO_PATH
 from downtime_matching import visualize_matched_downtime_orders, get_top_matched_downtimes
 from categorization import classify_damage_types
+from figure_rendering import figure_job, figure_key, render_jobs
+from interval_matching import work_center_keys
 
+REPORT_TITLE = "Automatisch generierter Analysebericht"
 
-def save_boxplot(df_orders, path):
-    plt.figure(figsize=(10, 6))
+
+def save_boxplot(df_orders, save_path):
     df_plot = df_orders[['Priorität', 'Order_Duration']].dropna()
     if not df_plot.empty and df_plot['Priorität'].nunique() > 1:
+        plt.figure(figsize=(10, 6))
         sns.boxplot(x='Priorität', y='Order_Duration', data=df_plot)
         plt.xlabel('Priorität')
         plt.ylabel('Auftragsdauer (Minuten)')
         plt.title('Verteilung der Auftragsdauer nach Priorität')
         plt.ylim(0, 2000)
         plt.tight_layout()
-        plt.savefig(path)
+        plt.savefig(save_path)
         plt.close()
 
 
-def save_top_downtime_plot(df_top, path):
+def save_top_downtime_plot(df_top, save_path):
     if df_top.empty:
         print("⚠️ Keine Top-Downtime-Einträge gefunden.")
         return
@@ -37,61 +47,216 @@ def save_top_downtime_plot(df_top, path):
         ax.text(value + 5, i, f"{int(value)} min", va='center')
 
     plt.tight_layout()
-    plt.savefig(path)
+    plt.savefig(save_path)
     plt.close()
 
 
-def generate_report(df_orders, df_top):
+# 👉 Abschnitte als gecachte Artefakte: Dateiname = Abschnitt + Hash der Eingabedaten
+
+def report_sections(df_orders, df_top):
+    """
+    Abschnitte eines Berichts (Überschrift + Grafik-Job); Abschnitte ohne Daten entfallen.
+    Jeder Job erhält nur die Spalten, die er zeichnet – nur deren Änderung erzeugt die Grafik neu.
+    """
+    sections = []
+
+    df_box = df_orders[['Priorität', 'Order_Duration']].dropna()
+    if not df_box.empty and df_box['Priorität'].nunique() > 1:
+        sections.append({
+            'title': "Verteilung der Auftragsdauer nach Priorität",
+            'job': figure_job('boxplot_prioritaet', save_boxplot, df_box),
+        })
+
+    if df_top is not None and not df_top.empty:
+        sections.append({
+            'title': "Top 10 Maschinenstillstände",
+            'job': figure_job('top_downtime', save_top_downtime_plot, df_top),
+        })
+
+    return sections
+
+
+@lru_cache(maxsize=None)
+def _load_logo(path):
+    # Einmal pro Lauf einlesen, alle Berichte verwenden dieselben Bytes
+    if not os.path.exists(path):
+        print(f"⚠️ Logo nicht gefunden: {path}")
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _report_key(title, sections, logo):
+    sha = hashlib.sha256(title.encode('utf-8'))
+    sha.update(hashlib.sha256(logo or b'').digest())
+    for section in sections:
+        sha.update(section['title'].encode('utf-8'))
+        sha.update(section['key'].encode('utf-8'))
+    return sha.hexdigest()
+
+
+def _read_report_meta(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _assemble_pdf(title, sections, logo, output_path):
+    """
+    Setzt das PDF aus den bereits gerenderten Abschnittsgrafiken zusammen.
+    Überschriften ohne Emojis – die Standardschriften von FPDF kennen nur Latin-1.
+    """
     pdf = FPDF()
     pdf.add_page()
 
     # Deckblatt mit Logo
     pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 10, "Automatisch generierter Analysebericht", ln=True, align="C")
-    pdf.image("correlation_analysis_modular/csm_greiner-packaging_RGB_a3ba649772.png", x=60, y=30, w=90)
+    pdf.cell(0, 10, title, ln=True, align="C")
+    if logo is not None:
+        pdf.image(io.BytesIO(logo), x=60, y=30, w=90)
     pdf.ln(80)
 
     pdf.set_font("Arial", "", 12)
     pdf.multi_cell(0, 10, "Dieser Bericht enthält eine Übersicht über Auftragsprioritäten und Maschinenstillstände.")
     pdf.ln(5)
 
-    # Boxplot hinzufügen
-    boxplot_path = "correlation_analysis_modular/boxplot_prioritaet.png"
-    save_boxplot(df_orders, boxplot_path)
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "📊 Verteilung der Auftragsdauer nach Priorität", ln=True)
-    pdf.image(boxplot_path, x=15, y=30, w=180)
-    pdf.ln(90)
-
-    # Downtime Balkendiagramm
-    downtime_path = "correlation_analysis_modular/top_downtime.png"
-    save_top_downtime_plot(df_top, downtime_path)
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "🔧 Top 10 Maschinenstillstände", ln=True)
-    pdf.image(downtime_path, x=15, y=30, w=180)
-    pdf.ln(10)
+    for section in sections:
+        pdf.add_page()
+        pdf.set_font("Arial", "B", 14)
+        pdf.cell(0, 10, section['title'], ln=True)
+        pdf.image(section['path'], x=15, y=30, w=180)
+        pdf.ln(90)
 
-    # PDF speichern
-    pdf.output("correlation_analysis_modular/abschlussbericht.pdf")
-    print("✅ Bericht wurde als abschlussbericht.pdf gespeichert.")
+    tmp_path = output_path + '.tmp'
+    pdf.output(tmp_path)
+    os.replace(tmp_path, output_path)
+
+
+def generate_reports(report_inputs, output_dir=None, max_workers=None):
+    """
+    Erzeugt mehrere Berichte in einem Aufruf.
+    report_inputs: {Berichtsname: {'orders': df_orders, 'top': df_top, 'title': optional}}
+
+    Abschnittsgrafiken liegen inhaltsadressiert unter <output_dir>/sections und werden nur
+    gerendert, wenn es sie für diese Daten noch nicht gibt (gleiche Abschnitte verschiedener
+    Berichte teilen sich eine Datei). Ein PDF wird nur neu zusammengesetzt, wenn sich Titel,
+    Logo oder einer seiner Abschnitte geändert haben. Gibt {Berichtsname: PDF-Pfad} zurück.
+    """
+    output_dir = output_dir or REPORT_DIR
+    sections_dir = os.path.join(output_dir, 'sections')
+    os.makedirs(sections_dir, exist_ok=True)
+    logo = _load_logo(REPORT_LOGO_PATH)
+
+    plans, pending = {}, {}
+    for name, inputs in report_inputs.items():
+        sections = report_sections(inputs['orders'], inputs.get('top'))
+        for section in sections:
+            section['key'] = figure_key(section['job'])
+            section['path'] = os.path.join(sections_dir, f"{section['job']['name']}_{section['key'][:16]}.png")
+            if not os.path.exists(section['path']):
+                pending.setdefault(section['path'], section['job'])
+        plans[name] = sections
+
+    # Alle fehlenden Abschnitte aller Berichte gemeinsam parallel rendern
+    render_jobs([(job, path) for path, job in pending.items()], max_workers)
+    print(f"🖼️ Abschnitte: {len(pending)} neu gerendert, "
+          f"{sum(len(s) for s in plans.values()) - len(pending)} aus dem Cache")
+
+    paths = {}
+    for name, sections in plans.items():
+        title = report_inputs[name].get('title', REPORT_TITLE)
+        sections = [section for section in sections if os.path.exists(section['path'])]
+        output_path = os.path.join(output_dir, f"{name}.pdf")
+        meta_path = output_path + '.json'
+        key = _report_key(title, sections, logo)
+
+        meta = _read_report_meta(meta_path)
+        if meta is not None and meta.get('key') == key and os.path.exists(output_path):
+            print(f"💾 Bericht {name}.pdf unverändert.")
+        else:
+            _assemble_pdf(title, sections, logo, output_path)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'sections': [section['path'] for section in sections]}, f)
+            print(f"✅ Bericht wurde als {name}.pdf gespeichert.")
+        paths[name] = output_path
+
+    prune_sections(output_dir)
+    return paths
+
+
+def prune_sections(output_dir=None):
+    """
+    Entfernt Abschnittsgrafiken, auf die kein Bericht im Verzeichnis mehr verweist.
+    """
+    output_dir = output_dir or REPORT_DIR
+    sections_dir = os.path.join(output_dir, 'sections')
+    used = set()
+    for entry in os.listdir(output_dir):
+        if entry.endswith('.pdf.json'):
+            meta = _read_report_meta(os.path.join(output_dir, entry)) or {}
+            used.update(os.path.abspath(path) for path in meta.get('sections', []))
+    for entry in os.listdir(sections_dir):
+        path = os.path.join(sections_dir, entry)
+        if os.path.abspath(path) not in used:
+            os.remove(path)
+
+
+def generate_report(df_orders, df_top, output_dir=None, name='abschlussbericht'):
+    return generate_reports({name: {'orders': df_orders, 'top': df_top}}, output_dir)[name]
+
+
+def work_center_report_inputs(df_orders, df_machine, downtime_threshold=60, cube=None):
+    """
+    Teilt Aufträge und Maschinendaten nach Arbeitsplatz auf – ein Bericht pro Arbeitsplatz.
+    Mit `cube` (downtime_cube.DowntimeCube) wird die Tages-Downtime pro Arbeitsplatz
+    im Würfel abgefragt, statt die Maschinendaten aufzuteilen.
+    """
+    order_keys = work_center_keys(df_orders['Arbeitsplatz'])
+    if cube is None:
+        df_machine = df_machine.assign(**{'Work Center': df_machine['Work Center'].ffill()})
+        machine_keys = work_center_keys(df_machine['Work Center'])
+
+    inputs = {}
+    for work_center in sorted(set(order_keys) - {'nan'}):
+        orders_wc = df_orders[order_keys == work_center]
+        machine_wc = None if cube is not None else df_machine[machine_keys == work_center]
+        inputs[f"abschlussbericht_{work_center}"] = {
+            'orders': orders_wc,
+            'top': get_top_matched_downtimes(orders_wc, machine_wc, downtime_threshold=downtime_threshold, cube=cube),
+            'title': f"{REPORT_TITLE} - Arbeitsplatz {work_center}",
+        }
+    return inputs
 
 
 # Hauptlogik
 if __name__ == "__main__":
+    import argparse
+
     from data_loader import load_data
+    from downtime_cube import build_downtime_cube
     from preprocessing import preprocess_machine_data, preprocess_order_data
 
+    parser = argparse.ArgumentParser(description="PDF-Analysebericht erzeugen")
+    parser.add_argument('--output-dir', default=REPORT_DIR, help="Zielverzeichnis für Berichte und Abschnitte")
+    parser.add_argument('--per-work-center', action='store_true', help="Einen Bericht pro Arbeitsplatz erzeugen")
+    args = parser.parse_args()
+
     print("📦 Skript gestartet")
 
-    df_machine, df_orders = load_data()
+    df_orders, df_machine = load_data()
     df_machine = preprocess_machine_data(df_machine)
     df_orders = preprocess_order_data(df_orders)
+    df_orders.columns = df_orders.columns.str.strip()
     df_orders = classify_damage_types(df_orders)
 
-    # Berechne Top-Downtime-Einträge
-    top_matches = get_top_matched_downtimes(df_machine, df_orders, downtime_threshold=60)
+    if args.per_work_center:
+        cube = build_downtime_cube(df_machine, REPORT_CUBE_PATH)
+        generate_reports(work_center_report_inputs(df_orders, df_machine, downtime_threshold=60, cube=cube), args.output_dir)
+    else:
+        # Berechne Top-Downtime-Einträge
+        top_matches = get_top_matched_downtimes(df_orders, df_machine, downtime_threshold=60)
 
-    # Generiere Bericht
-    generate_report(df_orders, top_matches)
+        # Generiere Bericht
+        generate_report(df_orders, top_matches, args.output_dir)
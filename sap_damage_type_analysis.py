@@ -2,80 +2,92 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-def analyze_sap_damage_types(df_orders, df_notifications, df_failurecodes):
+from bootstrap import mean_ci
+from instrumentation import instrument
+from sap_lookup import SapLookupIndex
+from visualization import show_or_save
+
+@instrument()
+def analyze_sap_damage_types(df_orders, df_notifications, df_failurecodes, show_plot=True, index=None, bootstrap=False,
+                             verbose=True):
     """
     Verknüpft SAP-Aufträge mit Schadenscodes aus Notification-Daten,
     berechnet die durchschnittliche Auftragsdauer und die Auftragsanzahl pro SAP-Schadensbild.
+    Die Zuordnung Meldung -> Code -> Kurztext läuft über einen Nachschlage-Index (sap_lookup.py)
+    statt über Merges; mit `index` wird ein bereits gebauter Index wiederverwendet
+    (Meldungen und Fehlercodes werden dann nicht benötigt).
+    Mit show_plot=False wird nur gerechnet (Grafik separat über plot_sap_damage_types).
+    Mit bootstrap=True kommen Bootstrap-Konfidenzintervalle der mittleren Auftragsdauer hinzu
+    (Order_Duration_CI_Low/High, siehe bootstrap.py).
+    Mit verbose=False wird die Tabelle nicht ausgegeben (separat über print_sap_damage_stats).
     """
 
-    # 🧱 Schritt 1: Join SAP Orders mit Notifications
-    df_orders = df_orders.copy()
-    df_notifications = df_notifications.copy()
-    df_joined = pd.merge(
-        df_orders,
-        df_notifications,
-        left_on='Meldung',
-        right_on='Meldung',
-        how='inner'
-    )
-
-    if df_joined.empty:
-        print("⚠️ Keine Übereinstimmungen zwischen SAP Orders und Notifications gefunden.")
+    if 'Order_Duration' not in df_orders.columns:
+        print("⚠️ Spalte 'Order_Duration' nicht gefunden.")
         return
 
-    # 🔗 Schritt 2: Join mit Failurecodes
-    df_joined = pd.merge(
-        df_joined,
-        df_failurecodes,
-        left_on=['Codegruppe', 'Codierungscode'],
-        right_on=['Codegruppe', 'Code'],
-        how='left'
-    )
+    # 🧱 Schritt 1 + 2: Meldung -> Schadenscode -> Kurztext über den Index
+    if index is None:
+        index = SapLookupIndex.build(df_notifications, df_failurecodes)
+    df_stats = index.damage_stats(df_orders['Order_Duration'], df_orders['Meldung'])
 
-    if 'Order_Duration' not in df_joined.columns:
-        print("⚠️ Spalte 'Order_Duration' nicht gefunden.")
+    if df_stats is None:
+        print("⚠️ Keine Übereinstimmungen zwischen SAP Orders und Notifications gefunden.")
         return
 
-    # 🧮 Schritt 3: Gruppierung: Mittelwert UND Auftragsanzahl
-    df_stats = (
-        df_joined.groupby('Kurztext zum Code')
-        .agg(
-            Durchschnittliche_Auftragsdauer=('Order_Duration', 'mean'),
-            Auftragsanzahl=('Order_Duration', 'count')
-        )
-        .reset_index()
-        .sort_values(by='Durchschnittliche_Auftragsdauer', ascending=False)
-    )
+    # 🧮 Schritt 3: Mittelwert UND Auftragsanzahl pro Schadensbild, absteigend nach Dauer
+    df_stats = df_stats.sort_values(by='Durchschnittliche_Auftragsdauer', ascending=False)
 
     if df_stats.empty:
         print("⚠️ Keine Schadensbilder mit Auftragsdauer gefunden.")
         return
 
-    print("📊 Statistiken pro SAP-Schadensbild:")
-    print(df_stats)
+    if bootstrap:
+        samples = index.damage_samples(df_orders['Order_Duration'], df_orders['Meldung'])
+        intervals = mean_ci(samples['Order_Duration'], samples['Kurztext zum Code'], 'Order_Duration')
+        df_stats = df_stats.merge(intervals.rename(columns={'Damage_Type': 'Kurztext zum Code'}),
+                                  on='Kurztext zum Code', how='left')
+
+    # 🟢 Rückgabe für Weiterverarbeitung
+    df_stats.rename(columns={'Kurztext zum Code': 'Damage_Type'}, inplace=True)
+    df_stats.rename(columns={'Durchschnittliche_Auftragsdauer': 'Order_Duration'}, inplace=True)
+
+    if verbose:
+        print_sap_damage_stats(df_stats)
 
     # 📈 Schritt 4: Visualisierung
+    if show_plot:
+        plot_sap_damage_types(df_stats)
+    return df_stats
+
+
+def print_sap_damage_stats(df_stats):
+    print("📊 Statistiken pro SAP-Schadensbild:")
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(df_stats)
+
+
+def plot_sap_damage_types(df_stats, save_path=None):
+    """
+    Balkendiagramm der durchschnittlichen Auftragsdauer und Auftragsanzahl pro SAP-Schadensbild
+    (Ergebnis von analyze_sap_damage_types).
+    """
     plt.figure(figsize=(12, 6))
     ax = sns.barplot(
         data=df_stats,
-        x='Durchschnittliche_Auftragsdauer',
-        y='Kurztext zum Code',
+        x='Order_Duration',
+        y='Damage_Type',
         palette='magma',
         legend=False
     )
 
     # ➡️ Auftragsanzahl auf die Balken schreiben
-    for i, (duration, count) in enumerate(zip(df_stats['Durchschnittliche_Auftragsdauer'], df_stats['Auftragsanzahl'])):
+    for i, (duration, count) in enumerate(zip(df_stats['Order_Duration'], df_stats['Auftragsanzahl'])):
         ax.text(duration + 5, i, f"{count} Aufträge", va='center')
 
     plt.xlabel("Durchschnittliche Auftragsdauer (Minuten)")
     plt.ylabel("SAP-Schadensbild")
     plt.title("Durchschnittliche Auftragsdauer und Auftragsanzahl pro SAP-Schadensbild")
     plt.tight_layout()
-    plt.show()
-
-    # 🟢 Rückgabe für Weiterverarbeitung
-    df_stats.rename(columns={'Kurztext zum Code': 'Damage_Type'}, inplace=True)
-    df_stats.rename(columns={'Durchschnittliche_Auftragsdauer': 'Order_Duration'}, inplace=True)
-    return df_stats
+    show_or_save(save_path)
 
@@ -0,0 +1,163 @@
+# sap_lookup.py
+# 👉 Vorab gebauter Nachschlage-Index Meldung -> Schadenscode -> 'Kurztext zum Code' (CSR-Arrays, als .npz speicherbar)
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import SAP_INDEX_DIR
+from instrumentation import instrument
+
+NOTIFICATION_COLUMNS = ['Meldung', 'Codegruppe', 'Codierungscode']
+FAILURECODE_COLUMNS = ['Codegruppe', 'Code', 'Kurztext zum Code']
+
+
+def _lookup_values(values):
+    # Meldungsnummern numerisch vergleichen (Aufträge lesen sie wegen Lücken als float, z. B. 1154.0)
+    values = pd.Series(values)
+    numeric = pd.to_numeric(values, errors='coerce')
+    if numeric.notna().sum() == values.notna().sum():
+        return numeric.to_numpy(dtype=float)
+    return values.astype(str).to_numpy(dtype=str)
+
+
+def _csr(group_keys, values, n_groups):
+    """
+    Gruppiert `values` nach `group_keys` (0..n_groups-1, stabile Reihenfolge) zu indptr/values,
+    d. h. values[indptr[g]:indptr[g + 1]] gehören zu Gruppe g.
+    """
+    order = np.argsort(group_keys, kind='stable')
+    indptr = np.zeros(n_groups + 1, dtype=np.int64)
+    np.cumsum(np.bincount(group_keys, minlength=n_groups), out=indptr[1:])
+    return indptr, values[order]
+
+
+def _gather(indptr, values, groups):
+    """
+    Alle Werte der Gruppen `groups` hintereinander; zusätzlich, zu welcher Position in `groups`
+    jeder Wert gehört. Vektorisiert über np.repeat statt Schleife.
+    """
+    starts = indptr[groups]
+    lengths = indptr[groups + 1] - starts
+    owner = np.repeat(np.arange(len(groups)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return owner, values[np.repeat(starts, lengths) + offsets]
+
+
+class SapLookupIndex:
+    """
+    Meldung -> Liste der Schadenstexte (über Codegruppe/Codierungscode) als CSR-Struktur:
+    meldungen[i] hat die Texte texts[text_ids[indptr[i]:indptr[i + 1]]]. Mehrfache Codes pro
+    Meldung bzw. mehrfach gepflegte Codes ergeben – wie bei den bisherigen Merges – mehrere Einträge.
+    """
+
+    def __init__(self, meldungen, indptr, text_ids, texts):
+        self.meldungen = meldungen
+        self.indptr = indptr
+        self.text_ids = text_ids
+        self.texts = texts
+        self._lookup = pd.Index(meldungen)
+
+    @classmethod
+    def build(cls, df_notifications, df_failurecodes):
+        # Codes (Codegruppe, Code) -> ganzzahliger Schlüssel; Texte -> ganzzahliger Schlüssel
+        codes = pd.MultiIndex.from_arrays([df_failurecodes['Codegruppe'], df_failurecodes['Code']])
+        code_keys, code_values = pd.factorize(codes)
+        text_keys, texts = pd.factorize(df_failurecodes['Kurztext zum Code'], sort=True)
+        # Codes ohne Text erscheinen nach dem Merge nur als NaN und fallen in der Gruppierung weg
+        has_text = text_keys >= 0
+        code_indptr, code_texts = _csr(code_keys[has_text], text_keys[has_text], len(code_values))
+
+        # Meldungszeilen -> Codeschlüssel (-1: Code nicht im Katalog)
+        notification_codes = code_values.get_indexer(
+            pd.MultiIndex.from_arrays([df_notifications['Codegruppe'], df_notifications['Codierungscode']])
+        )
+        meldung_keys, meldungen = pd.factorize(_lookup_values(df_notifications['Meldung']))
+        known = (notification_codes >= 0) & (meldung_keys >= 0)
+        owner, row_texts = _gather(code_indptr, code_texts, notification_codes[known])
+        indptr, text_ids = _csr(meldung_keys[known][owner], row_texts, len(meldungen))
+        return cls(np.asarray(meldungen), indptr, text_ids, np.asarray(texts, dtype=str))
+
+    def resolve(self, meldung):
+        """
+        Auftragszeilen zu Schadenstexten: gibt (Zeilenposition im Auftrag, Text-ID) für jede
+        Kombination zurück sowie, ob überhaupt eine Meldung gefunden wurde.
+        """
+        positions = self._lookup.get_indexer(_lookup_values(meldung))
+        matched = np.flatnonzero(positions >= 0)
+        rows, text_ids = _gather(self.indptr, self.text_ids, positions[matched])
+        return matched[rows], text_ids, len(matched) > 0
+
+    def damage_samples(self, order_duration, meldung):
+        """
+        Auftragsdauer und Schadenstext je (Auftrag, Code)-Kombination – die Einzelwerte hinter
+        damage_stats, z. B. für Bootstrap-Intervalle. None, wenn keine Meldung gefunden wurde.
+        """
+        rows, text_ids, found = self.resolve(meldung)
+        if not found:
+            return None
+        durations = pd.to_numeric(pd.Series(order_duration), errors='coerce').to_numpy(dtype=float)[rows]
+        return pd.DataFrame({'Kurztext zum Code': self.texts[text_ids], 'Order_Duration': durations})
+
+    def damage_stats(self, order_duration, meldung):
+        """
+        Durchschnittliche Auftragsdauer und Anzahl gültiger Dauern pro Schadenstext
+        (entspricht groupby('Kurztext zum Code') nach den Merges).
+        """
+        rows, text_ids, found = self.resolve(meldung)
+        if not found:
+            return None
+        durations = pd.to_numeric(pd.Series(order_duration), errors='coerce').to_numpy(dtype=float)[rows]
+        valid = ~np.isnan(durations)
+        n_texts = len(self.texts)
+        present = np.bincount(text_ids, minlength=n_texts) > 0
+        count = np.bincount(text_ids[valid], minlength=n_texts)
+        total = np.bincount(text_ids[valid], weights=durations[valid], minlength=n_texts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+        return pd.DataFrame({
+            'Kurztext zum Code': self.texts[present],
+            'Durchschnittliche_Auftragsdauer': mean[present],
+            'Auftragsanzahl': count[present].astype(np.int64),
+        })
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, meldungen=self.meldungen, indptr=self.indptr, text_ids=self.text_ids, texts=self.texts)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['meldungen'], data['indptr'], data['text_ids'], data['texts'])
+
+
+def index_key(df_notifications, df_failurecodes):
+    """
+    Inhalts-Hash der für den Index relevanten Spalten – gleiche Meldungs-/Code-Tabellen
+    (z. B. gemeinsam genutzt von mehreren Werken im Batch) ergeben denselben Index.
+    """
+    sha = hashlib.sha256()
+    for df, columns in ((df_notifications, NOTIFICATION_COLUMNS), (df_failurecodes, FAILURECODE_COLUMNS)):
+        sha.update(repr([str(df[col].dtype) for col in columns]).encode('utf-8'))
+        sha.update(pd.util.hash_pandas_object(df[columns], index=False).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+@instrument()
+def load_or_build_index(df_notifications, df_failurecodes, index_dir=SAP_INDEX_DIR):
+    """
+    Lädt den Index aus `index_dir`, wenn er für diese Tabellen schon gebaut wurde, sonst bauen und speichern.
+    """
+    path = os.path.join(index_dir, f"{index_key(df_notifications, df_failurecodes)[:32]}.npz")
+    if os.path.exists(path):
+        try:
+            return SapLookupIndex.load(path)
+        except (OSError, ValueError, KeyError):
+            print("⚠️ SAP-Nachschlage-Index unlesbar, wird neu aufgebaut.")
+    index = SapLookupIndex.build(df_notifications, df_failurecodes)
+    index.save(path)
+    return index
@@ -0,0 +1,148 @@
+# schema.py
+# 👉 Kompaktes Speicherschema für Auftrags- und Maschinendaten (Kategorien, Arrow-Strings, kleinere Zahlentypen)
+import numpy as np
+import pandas as pd
+
+ORDER_CATEGORY_COLUMNS = ['Arbeitsplatz', 'Priorität', 'Damage_Type']
+ORDER_STRING_COLUMNS = ['Kurztext', 'Kurztext_clean']
+MACHINE_CATEGORY_COLUMNS = [
+    'Plant', 'Work Center', 'Material', 'ArticleNr - new (MD)', 'Production Order'
+]
+MACHINE_FLOAT_COLUMNS = [
+    'Downtime',
+    'Malfunction\n(1201)',
+    'Machine\n(1401)',
+    'Infrastructure\n(1402)',
+    'Mold\n(1403)',
+    'Peripheral\nEquipment\n(1404)',
+    'Automation\n(1405)'
+]
+
+
+def _arrow_string_dtype():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return pd.StringDtype('pyarrow')
+
+
+def _to_category(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    return series.astype('category')
+
+
+def _to_numeric_if_lossless(series):
+    """
+    Objektspalten, die nur Zahlen enthalten (z. B. Downtime nach .loc-Zuweisung), in float umwandeln.
+    Spalten mit Text (z. B. "0,5" vor dem Parsen) bleiben unverändert.
+    """
+    if series.dtype != object:
+        return series
+    converted = pd.to_numeric(series, errors='coerce')
+    if converted.notna().sum() != series.notna().sum():
+        return series
+    return converted.astype(float)
+
+
+def _downcast_float(series):
+    """
+    float64 -> float32 nur, wenn alle Werte exakt darstellbar sind (z. B. 1,5 h = 90 min).
+    """
+    if series.dtype != np.float64:
+        return series
+    values = series.to_numpy()
+    as_float32 = values.astype(np.float32)
+    if np.array_equal(as_float32.astype(np.float64), values, equal_nan=True):
+        return pd.Series(as_float32, index=series.index, name=series.name)
+    return series
+
+
+def _downcast_int(series):
+    if pd.api.types.is_integer_dtype(series.dtype) and not pd.api.types.is_extension_array_dtype(series.dtype):
+        return pd.to_numeric(series, downcast='integer')
+    return series
+
+
+def optimize_dtypes(df, category_columns=(), string_columns=(), float_columns=(), report=True, label=''):
+    """
+    Wandelt Spalten in speichersparende Typen um und gibt optional einen Speicherbericht aus.
+    - category_columns: wiederholte Texte/Schlüssel -> category (Gruppierungen/Merges auf Codes)
+    - string_columns: freie Texte -> Arrow-Strings (falls pyarrow installiert)
+    - float_columns: Zahlen in Objektspalten -> float, float32 wo verlustfrei
+    Ganzzahlen werden generell verkleinert.
+    """
+    before = df.memory_usage(deep=True) if report else None
+    df = df.copy()
+
+    for col in category_columns:
+        if col in df.columns:
+            df[col] = _to_category(df[col])
+
+    string_dtype = _arrow_string_dtype()
+    if string_dtype is not None:
+        for col in string_columns:
+            if col in df.columns and df[col].dtype == object:
+                df[col] = df[col].astype(string_dtype)
+
+    for col in float_columns:
+        if col in df.columns:
+            df[col] = _downcast_float(_to_numeric_if_lossless(df[col]))
+
+    for col in df.columns:
+        df[col] = _downcast_int(df[col])
+
+    if report:
+        print_memory_report(before, df.memory_usage(deep=True), label)
+    return df
+
+
+def optimize_order_data(df, report=True):
+    return optimize_dtypes(
+        df,
+        category_columns=ORDER_CATEGORY_COLUMNS,
+        string_columns=ORDER_STRING_COLUMNS,
+        report=report,
+        label='Aufträge'
+    )
+
+
+def optimize_machine_data(df, report=True):
+    return optimize_dtypes(
+        df,
+        category_columns=MACHINE_CATEGORY_COLUMNS,
+        float_columns=MACHINE_FLOAT_COLUMNS,
+        report=report,
+        label='Maschinendaten'
+    )
+
+
+def memory_report(before, after):
+    """
+    Speicherbedarf pro Spalte vor/nach der Umwandlung (Bytes) inkl. Faktor.
+    """
+    report = pd.DataFrame({'Vorher_Bytes': before, 'Nachher_Bytes': after}).fillna(0).astype(int)
+    report['Faktor'] = (report['Vorher_Bytes'] / report['Nachher_Bytes'].replace(0, np.nan)).round(1)
+    return report
+
+
+def print_memory_report(before, after, label=''):
+    report = memory_report(before, after)
+    total_before = report['Vorher_Bytes'].sum() / 1024 ** 2
+    total_after = report['Nachher_Bytes'].sum() / 1024 ** 2
+    print(f"\n🧮 Speicherbedarf {label}: {total_before:.1f} MB -> {total_after:.1f} MB")
+    changed = report[report['Vorher_Bytes'] != report['Nachher_Bytes']]
+    if not changed.empty:
+        print(changed.sort_values('Vorher_Bytes', ascending=False))
+
+
+def align_categories(left, right):
+    """
+    Bringt zwei kategorische Series auf dieselben Kategorien, damit Merges direkt
+    auf den Codes laufen. Nicht-kategorische Series bleiben unverändert.
+    """
+    if not (isinstance(left.dtype, pd.CategoricalDtype) and isinstance(right.dtype, pd.CategoricalDtype)):
+        return left, right
+    categories = left.cat.categories.union(right.cat.categories)
+    return left.cat.set_categories(categories), right.cat.set_categories(categories)
@@ -0,0 +1,255 @@
+# synthetic_data.py
+# 👉 Synthetische Eingabedaten (Reporting-CSV, SAP-Aufträge, Meldungen, Fehlercodes) in frei wählbarer Größe
+import argparse
+import datetime
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from categorization import damage_keywords
+
+EXCEL_MAX_ROWS = 1_048_575  # Excel-Limit ohne Kopfzeile
+
+MACHINE_DAMAGE_COLUMNS = [
+    'Malfunction\n(1201)',
+    'Machine\n(1401)',
+    'Infrastructure\n(1402)',
+    'Mold\n(1403)',
+    'Peripheral\nEquipment\n(1404)',
+    'Automation\n(1405)'
+]
+
+# Typische Schreibweisen im Reporting-Export (Dezimalkomma, Einheiten, leere Zellen)
+DOWNTIME_VALUES = ['1,5 h', '30 min', '12', '2 h', '90', '0,5 h', '45', '5 min', '3,25 h', '0']
+DAMAGE_VALUES = ['0,5', '1', '2,25', '0,1', '3', '0,75', '1,1', '0,2']
+
+# Diakritische Schreibweisen, wie sie in SAP-Kurztexten vorkommen (clean_texts entfernt sie wieder)
+CZECH_SPELLINGS = {
+    'lozisk': 'ložisk', 'valec': 'válec', 'sroub': 'šroub', 'zavit': 'závit', 'drzak': 'držák',
+    'jistic': 'jistič', 'civka': 'cívka', 'napajeni': 'napájení', 'spinac': 'spínač',
+    'koncak': 'koncák', 'rele': 'relé', 'ridici': 'řídicí', 'prevodnik': 'převodník',
+    'strizn': 'střižn', 'vlozka': 'vložka', 'brous': 'brus', 'pistnic': 'pístnic',
+    'tesn': 'těsn', 'pruzin': 'pružin', 'pritlak': 'přítlak', 'unik vzduch': 'únik vzduch',
+    'membran': 'membrán', 'vakuova': 'vakuová', 'tlumic': 'tlumič', 'hadic': 'hadic',
+    'snimac': 'snímač', 'cidlo': 'čidlo', 'meric': 'měřič', 'mereni': 'měření',
+    'osvetlen': 'osvětlen', 'zasuvka': 'zásuvka', 'mazani': 'mazání', 'vytapeni': 'vytápění',
+    'rizeni': 'řízení', 'bezpecnost': 'bezpečnost', 'zabezpeceni': 'zabezpečení',
+    'havari': 'havári', 'udrzba': 'údržba', 'cisteni': 'čištění', 'serizeni': 'seřízení',
+    'vymena': 'výměna', 'prohlidka': 'prohlídka',
+}
+FILLER_WORDS = ['nefunguje', 'vadný', 'linka', 'stroj', 'prasklý', 'nový', 'porucha', '#MK2', '(urgent)', 'Prüfung']
+
+SAP_DAMAGE_CODES = ['Mechanical', 'Electrical', 'Mold', 'Automation', 'Infrastructure', 'Peripheral Equipment']
+
+
+def keyword_vocabulary(keywords=damage_keywords):
+    """
+    Einzelwörter aus den Mustern in damage_keywords (Form \\b(a|b|c)\\b), in tschechischer
+    Schreibweise mit Diakritika, wo bekannt.
+    """
+    words = []
+    for patterns in keywords.values():
+        for pattern in patterns:
+            match = re.fullmatch(r'\\b\((.*)\)\\b', pattern)
+            alternatives = match.group(1).split('|') if match else []
+            words.extend(CZECH_SPELLINGS.get(word, word) for word in alternatives)
+    return sorted(set(words))
+
+
+def _texts(rng, n_rows, n_unique=5000):
+    vocabulary = keyword_vocabulary()
+    # ~20 % der Texte ohne Schlüsselwort, damit auch 'other' vorkommt
+    unique_texts = []
+    for _ in range(n_unique):
+        n_words = rng.integers(1, 4)
+        pool = FILLER_WORDS if rng.random() < 0.2 else vocabulary
+        words = list(rng.choice(pool, size=n_words)) + list(rng.choice(FILLER_WORDS, size=rng.integers(0, 2)))
+        unique_texts.append(' '.join(words))
+    return np.array(unique_texts, dtype=object)[rng.integers(0, n_unique, n_rows)]
+
+
+def _format_minutes(minutes, start, with_time=True):
+    """
+    Minuten ab `start` als 'dd.mm.YYYY HH:MM:SS' (bzw. nur Datum). Tage und Uhrzeiten werden
+    getrennt nur einmal formatiert und dann zusammengesetzt – strftime pro Zeile wäre zu langsam.
+    """
+    minutes = np.asarray(minutes)
+    days = minutes // (24 * 60)
+    n_days = int(days.max()) + 1 if len(days) else 0
+    day_strings = np.asarray(pd.date_range(start, periods=n_days, freq='D').strftime('%d.%m.%Y'), dtype=object)
+    if not with_time:
+        return day_strings[days]
+    time_strings = np.array([f" {m // 60:02d}:{m % 60:02d}:00" for m in range(24 * 60)], dtype=object)
+    return day_strings[days] + time_strings[minutes % (24 * 60)]
+
+
+def _sparse_choice(rng, values, n_rows, fill_rate):
+    chosen = np.array(values, dtype=object)[rng.integers(0, len(values), n_rows)]
+    chosen[rng.random(n_rows) >= fill_rate] = np.nan
+    return chosen
+
+
+def generate_machine_data(n_rows, work_centers=('41023', '41024'), plant='4000077',
+                          start='2024-01-01', days=365, seed=0):
+    """
+    Reporting-Export wie nach pd.read_csv(';', latin-1): ein Intervall pro Zeile, sortiert nach
+    Arbeitsplatz und Start; die Intervalle eines Arbeitsplatzes schließen lückenlos aneinander an. Plant/Work Center/Artikel/Material/Fertigungsauftrag stehen nur in
+    der ersten Zeile eines Fertigungsauftrags (Forward-Fill nötig), Downtime als Text ("1,5 h"),
+    Schadensbild-Spalten 1201–1405 mit Dezimalkomma. Am Ende steht die Ergebniszeile 'Result'.
+    """
+    rng = np.random.default_rng(seed)
+    n_rows = max(int(n_rows) - 1, 1)
+
+    wc = np.sort(rng.integers(0, len(work_centers), n_rows))
+    start_min = rng.integers(0, days * 24 * 60, n_rows)
+    order = np.lexsort((start_min, wc))
+    wc, start_min = wc[order], start_min[order]
+    # Ende = Start des nächsten Intervalls am selben Arbeitsplatz (mind. 1 Minute)
+    end_min = start_min + rng.integers(5, 8 * 60, n_rows)
+    same_wc = np.append(wc[1:] == wc[:-1], False)
+    end_min[same_wc] = start_min[1:][same_wc[:-1]]
+    end_min = np.maximum(end_min, start_min + 1)
+
+    # Fertigungsaufträge: Blöcke von 1–20 Zeilen, neuer Block auch bei Arbeitsplatzwechsel
+    new_block = rng.random(n_rows) < 0.1
+    new_block[0] = True
+    new_block[1:] |= wc[1:] != wc[:-1]
+    block_id = np.cumsum(new_block) - 1
+
+    wc_values = np.asarray(work_centers, dtype=float)
+    df = pd.DataFrame({
+        'Plant': np.where(new_block, float(plant), np.nan),
+        'Work Center': np.where(new_block, wc_values[wc], np.nan),
+        'ArticleNr - new (MD)': np.where(new_block, 'A' + (block_id % 500).astype(str).astype(object), np.nan),
+        'Material': np.where(new_block, 'M' + (block_id % 200).astype(str).astype(object), np.nan),
+        'Production Order': np.where(new_block, 500_000 + block_id, np.nan),
+        'Start date / time': _format_minutes(start_min, start),
+        'End date / time': _format_minutes(end_min, start),
+        'Calendar day': _format_minutes(start_min, start, with_time=False),
+        '[-] Malfunction': _sparse_choice(rng, DOWNTIME_VALUES, n_rows, 0.8),
+    })
+    for col in MACHINE_DAMAGE_COLUMNS:
+        df[col] = _sparse_choice(rng, DAMAGE_VALUES, n_rows, 0.4)
+
+    footer = pd.DataFrame({'Calendar day': ['Result']})
+    return pd.concat([df, footer], ignore_index=True)
+
+
+def generate_order_data(n_rows, work_centers=('41023', '41024'), start='2024-01-01', days=365,
+                        notification_rate=0.7, seed=0):
+    """
+    SAP-Auftragsexport wie nach pd.read_excel: Eckstart-/Eckendtermin als Datum,
+    Iststart/Term. Ende Uhrzeit als Uhrzeit, tschechische Kurztexte aus dem damage_keywords-Vokabular.
+    Etwa `notification_rate` der Aufträge hat eine Meldung (sonst NaN).
+    """
+    rng = np.random.default_rng(seed + 1)
+    n_rows = int(n_rows)
+    start_min = rng.integers(0, days * 24 * 60, n_rows)
+    end_min = start_min + rng.integers(10, 12 * 60, n_rows)
+
+    # Uhrzeiten als datetime.time – 1440 Objekte, per Index verteilt
+    times = np.array([datetime.time(m // 60, m % 60) for m in range(24 * 60)], dtype=object)
+    base = pd.Timestamp(start)
+
+    meldung = np.where(rng.random(n_rows) < notification_rate, 1_000_000 + np.arange(n_rows), np.nan)
+    return pd.DataFrame({
+        'Auftrag': 70_000_000 + np.arange(n_rows),
+        'Kurztext': _texts(rng, n_rows),
+        'Arbeitsplatz': np.asarray(work_centers, dtype=np.int64)[rng.integers(0, len(work_centers), n_rows)],
+        'Priorität': rng.integers(1, 4, n_rows),
+        'Meldung': meldung,
+        'Eckstarttermin': base + pd.to_timedelta(start_min // (24 * 60), unit='D'),
+        'Iststart Uhrzeit': times[start_min % (24 * 60)],
+        'Eckendtermin': base + pd.to_timedelta(end_min // (24 * 60), unit='D'),
+        'Term. Ende Uhrzeit': times[end_min % (24 * 60)],
+    })
+
+
+def generate_failurecode_data(code_groups=('PM01', 'PM02')):
+    """
+    Fehlercode-Katalog: jede Codegruppe mit denselben SAP-Schadensbildern.
+    """
+    return pd.DataFrame([
+        {'Codegruppe': group, 'Code': code, 'Kurztext zum Code': text}
+        for group in code_groups
+        for code, text in enumerate(SAP_DAMAGE_CODES, start=1)
+    ])
+
+
+def generate_notification_data(df_orders, df_failurecodes, seed=0):
+    """
+    Meldungen zu allen Aufträgen mit Meldungsnummer, je mit einem Code aus dem Katalog.
+    """
+    rng = np.random.default_rng(seed + 2)
+    meldung = df_orders['Meldung'].dropna().astype(np.int64).to_numpy()
+    picks = rng.integers(0, len(df_failurecodes), len(meldung))
+    return pd.DataFrame({
+        'Meldung': meldung,
+        'Codegruppe': df_failurecodes['Codegruppe'].to_numpy()[picks],
+        'Codierungscode': df_failurecodes['Code'].to_numpy()[picks],
+    })
+
+
+def default_work_centers(n_machine_rows, rows_per_work_center=10_000):
+    """
+    Arbeitsplätze passend zur Datenmenge: etwa `rows_per_work_center` Reporting-Zeilen pro
+    Arbeitsplatz und Jahr (mind. 41023 und 41024) – größere Exporte umfassen mehr Linien,
+    nicht dichtere Intervalle.
+    """
+    count = max(2, int(n_machine_rows) // rows_per_work_center)
+    return tuple(str(41023 + i) for i in range(count))
+
+
+def generate_dataset(n_orders, n_machine_rows=None, work_centers=None, days=365, seed=0):
+    """
+    Alle vier Eingaben in zueinander passender Form (gleiche Arbeitsplätze, Zeitraum, Meldungen).
+    Ohne `work_centers` wird die Anzahl Arbeitsplätze aus der Größe abgeleitet (default_work_centers).
+    """
+    n_machine_rows = n_orders if n_machine_rows is None else n_machine_rows
+    work_centers = default_work_centers(n_machine_rows) if work_centers is None else work_centers
+    df_orders = generate_order_data(n_orders, work_centers, days=days, seed=seed)
+    df_failurecodes = generate_failurecode_data()
+    return {
+        'machine': generate_machine_data(n_machine_rows, work_centers, days=days, seed=seed),
+        'orders': df_orders,
+        'notifications': generate_notification_data(df_orders, df_failurecodes, seed=seed),
+        'failurecodes': df_failurecodes,
+    }
+
+
+def write_dataset(frames, directory, plant='4000077', work_center='41023'):
+    """
+    Schreibt die Daten mit den Dateinamen der echten Exporte (siehe config.py / batch_runner.py).
+    Gibt die Pfade zurück.
+    """
+    for name in ['orders', 'notifications']:
+        if len(frames[name]) > EXCEL_MAX_ROWS:
+            raise ValueError(f"'{name}' hat {len(frames[name]):,} Zeilen – mehr als Excel erlaubt ({EXCEL_MAX_ROWS:,}).")
+
+    os.makedirs(directory, exist_ok=True)
+    paths = {
+        'machine': os.path.join(directory, f"Reporting_{plant}_{work_center}.csv"),
+        'orders': os.path.join(directory, f"SAP_Orders_{plant}_1.xlsx"),
+        'notifications': os.path.join(directory, "notifications_and_codes.xlsx"),
+        'failurecodes': os.path.join(directory, "failure_codes.xlsx"),
+    }
+    # Plant, Work Center, Fertigungsauftrag als Ganzzahlen wie im echten Export
+    frames['machine'].to_csv(paths['machine'], sep=';', index=False, encoding='latin-1', float_format='%.0f')
+    for name in ['orders', 'notifications', 'failurecodes']:
+        frames[name].to_excel(paths[name], index=False)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetische Eingabedaten erzeugen")
+    parser.add_argument('directory', help="Zielverzeichnis")
+    parser.add_argument('--orders', type=int, default=10_000, help="Anzahl SAP-Aufträge")
+    parser.add_argument('--machine-rows', type=int, help="Zeilen im Reporting-Export (Standard: wie --orders)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    data = generate_dataset(args.orders, args.machine_rows, seed=args.seed)
+    for source, path in write_dataset(data, args.directory).items():
+        print(f"💾 {source:<14} {len(data[source]):>10,} Zeilen -> {path}")
@@ -0,0 +1,123 @@
+# timestamp_parsing.py
+# 👉 Schnelles Parsen von Datums-/Zeitspalten: Format einmal erkennen, nur eindeutige Werte parsen
+#    und zurückverteilen; bereits geparste Spalten (datetime64/timedelta64) werden durchgereicht
+import numpy as np
+import pandas as pd
+
+# Kandidaten in Prüfreihenfolge – deutsche Exporte zuerst (Tag vor Monat)
+DATETIME_FORMATS = (
+    '%d.%m.%Y %H:%M:%S',
+    '%d.%m.%Y %H:%M',
+    '%d.%m.%Y',
+    '%d.%m.%y',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y',
+)
+SAMPLE_SIZE = 200
+# Ab so vielen eindeutigen Werten werden Datum und Uhrzeit getrennt geparst
+# (wenige Tage x wenige Uhrzeiten statt jeder Kombination einzeln)
+SPLIT_THRESHOLD = 5000
+
+_detected_formats = {}  # Spaltenname -> erkanntes Format
+
+
+def _sample(uniques):
+    step = max(len(uniques) // SAMPLE_SIZE, 1)
+    return uniques[::step][:SAMPLE_SIZE]
+
+
+def _parsed_share(sample, fmt):
+    return pd.to_datetime(sample, format=fmt, errors='coerce').notna().mean()
+
+
+def detect_format(uniques, formats=DATETIME_FORMATS, key=None):
+    """
+    Format, das die meisten Werte einer Stichprobe liest (None, wenn keines passt).
+    Mit `key` wird das Ergebnis gemerkt und bei späteren Aufrufen (z. B. weiteren Chunks
+    derselben Spalte) nur noch gegengeprüft: es bleibt nur, solange es jeden Wert der
+    Stichprobe liest, sonst wird neu erkannt.
+    """
+    sample = pd.Index(_sample(uniques))
+    cached = _detected_formats.get(key)
+    if cached is not None and _parsed_share(sample, cached) == 1:
+        return cached
+
+    shares = [_parsed_share(sample, fmt) for fmt in formats]
+    best = int(np.argmax(shares)) if shares else -1
+    fmt = formats[best] if best >= 0 and shares[best] > 0 else None
+    if key is not None and fmt is not None:
+        _detected_formats[key] = fmt
+    return fmt
+
+
+def _parse_strings(uniques, fmt):
+    """
+    Eindeutige Strings mit festem Format parsen. Viele Datum+Uhrzeit-Kombinationen werden in
+    Datum und Uhrzeit zerlegt, die jeweils nur einmal pro eindeutigem Teil geparst werden.
+    """
+    date_fmt, _, time_fmt = fmt.partition(' ')
+    if not time_fmt or len(uniques) < SPLIT_THRESHOLD:
+        return pd.to_datetime(uniques, format=fmt, errors='coerce')
+
+    # np.char.partition arbeitet auf dem Unicode-Array ohne Python-Schleife pro Wert
+    parts = np.char.partition(np.asarray(uniques, dtype=str), ' ')
+    days = _map_uniques(pd.Series(parts[:, 0]), lambda values: pd.to_datetime(values, format=date_fmt, errors='coerce'))
+    clock = _map_uniques(
+        pd.Series(parts[:, 2]),
+        lambda values: pd.to_datetime(values, format=time_fmt, errors='coerce') - pd.Timestamp('1900-01-01')
+    )
+    return pd.DatetimeIndex(days.to_numpy() + clock.to_numpy())
+
+
+def _map_uniques(series, parse):
+    """
+    Wendet `parse` nur auf die eindeutigen Werte an und verteilt das Ergebnis über die Codes zurück.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    parsed = parse(pd.Index(uniques, dtype=object))
+    values = np.asarray(parsed)
+    result = np.full(len(series), np.array('NaT', dtype=values.dtype))
+    valid = codes >= 0
+    result[valid] = values[codes[valid]]
+    return pd.Series(result, index=series.index, name=series.name)
+
+
+def parse_timestamps(values, formats=DATETIME_FORMATS, key=None, dayfirst=True):
+    """
+    Wandelt eine Series in datetime64 um. Bereits geparste Spalten werden unverändert zurückgegeben.
+    Strings: Format per detect_format einmal bestimmen, dann nur die eindeutigen Werte mit festem
+    Format parsen; nicht passende Werte werden per Inferenz nachgeparst. Passt kein Format bzw. liegen
+    andere Objekte vor (z. B. datetime aus Excel), greift pd.to_datetime mit Inferenz – ebenfalls nur
+    auf den eindeutigen Werten.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+    key = values.name if key is None else key
+
+    def parse(uniques):
+        if len(uniques) and pd.api.types.infer_dtype(uniques, skipna=True) == 'string':
+            fmt = detect_format(uniques, formats, key)
+            if fmt is not None:
+                parsed = np.asarray(_parse_strings(uniques, fmt), dtype='datetime64[ns]')
+                missing = np.isnat(parsed)
+                if missing.any():
+                    # Abweichende Formate (z. B. gemischte Exporte) nicht verwerfen, sondern pro Wert erkennen
+                    parsed[missing] = pd.to_datetime(uniques[missing], format='mixed', errors='coerce', dayfirst=dayfirst)
+                return parsed
+        return pd.to_datetime(uniques, errors='coerce', dayfirst=dayfirst)
+
+    parsed = _map_uniques(values, parse)
+    return parsed.astype('datetime64[ns]')
+
+
+def parse_time_of_day(values):
+    """
+    Uhrzeiten ('HH:MM:SS' oder datetime.time) als timedelta64 ab Mitternacht – wie
+    pd.to_timedelta(values.astype(str)), aber nur für die eindeutigen Werte.
+    """
+    if pd.api.types.is_timedelta64_dtype(values.dtype):
+        return values
+    parsed = _map_uniques(values, lambda uniques: pd.to_timedelta(uniques.astype(str), errors='coerce'))
+    return parsed.astype('timedelta64[ns]')
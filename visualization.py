@@ -2,25 +2,58 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 
-def plot_boxplot_priorities(df_orders):
-    df_plot = df_orders[['Priorität', 'Order_Duration']].dropna()
-    if not df_plot.empty and df_plot['Priorität'].nunique() > 1:
-        plt.figure(figsize=(8, 6))
-        sns.boxplot(x='Priorität', y='Order_Duration', data=df_plot)
-        plt.ylim(0, 1000)
-        plt.xlabel('Priorität')
-        plt.ylabel('Auftragsdauer (Minuten)')
-        plt.title('Verteilung der Auftragsdauer nach Priorität')
-        plt.tight_layout()
+from categorization import damage_hit_matrix, category_overlap_counts, hit_rate as compute_hit_rate
+from duration_parsing import to_float
+from interval_matching import aggregate_interval_matches
+from timestamp_parsing import parse_timestamps
+
+def show_or_save(save_path=None):
+    """
+    Schließt einen Plot ab: ohne save_path interaktiv anzeigen, sonst als Datei
+    speichern und die Figure schließen (headless, z. B. im Agg-Backend).
+    """
+    if save_path is None:
         plt.show()
+    else:
+        plt.savefig(save_path)
+        plt.close()
+
+
+def boxplot_priority_data(df_orders):
+    """
+    Daten für den Prioritäten-Boxplot oder None, wenn es zu wenige gibt.
+    """
+    df_plot = df_orders[['Priorität', 'Order_Duration']].dropna()
+    if df_plot.empty or df_plot['Priorität'].nunique() <= 1:
+        return None
+    return df_plot
+
+
+def draw_boxplot_priorities(df_plot, save_path=None):
+    plt.figure(figsize=(8, 6))
+    sns.boxplot(x='Priorität', y='Order_Duration', data=df_plot)
+    plt.ylim(0, 1000)
+    plt.xlabel('Priorität')
+    plt.ylabel('Auftragsdauer (Minuten)')
+    plt.title('Verteilung der Auftragsdauer nach Priorität')
+    plt.tight_layout()
+    show_or_save(save_path)
+
+
+def plot_boxplot_priorities(df_orders, save_path=None):
+    df_plot = boxplot_priority_data(df_orders)
+    if df_plot is not None:
+        draw_boxplot_priorities(df_plot, save_path)
     else:
         print("⚠️ Nicht genügend Daten für den Boxplot.")
 
         
-def visualize_matched_downtime_orders(df_machine, df_orders, downtime_threshold=100):
+def visualize_matched_downtime_orders(df_machine, df_orders, downtime_threshold=100, match_mode='day', save_path=None):
     """
     Visualisiert Aufträge, denen ein Maschinenstillstand mit hoher Downtime zugeordnet werden kann.
     Zeigt Kurztext + Auftragsnummer sowie Downtime als Label.
+    match_mode='day' verknüpft nur über das Datum, 'interval' über überlappende
+    Zeitfenster pro Arbeitsplatz (siehe interval_matching).
     """
 
     if 'Downtime' not in df_machine.columns:
@@ -28,33 +61,34 @@ def visualize_matched_downtime_orders(df_machine, df_orders, downtime_threshold=
         return
 
     # Downtime bereinigen
-    df_machine['Downtime'] = df_machine['Downtime'].apply(
-        lambda x: float(str(x).replace(',', '.')) if pd.notnull(x) else 0
-    )
+    df_machine['Downtime'] = to_float(df_machine['Downtime'], fill_value=0)
 
     # Datum bereinigen
     if 'Calendar day' not in df_machine.columns or 'Start_ts' not in df_orders.columns:
         print("⚠️ Benötigte Zeitspalten fehlen.")
         return
 
-    df_machine['Calendar day'] = pd.to_datetime(df_machine['Calendar day'], errors='coerce')
-    df_orders['Start_ts'] = pd.to_datetime(df_orders['Start_ts'], errors='coerce')
-
-    df_machine['Calendar_day_only'] = df_machine['Calendar day'].dt.date
-    df_orders['Start_date_only'] = df_orders['Start_ts'].dt.date
+    df_machine['Calendar day'] = parse_timestamps(df_machine['Calendar day'])
+    df_orders['Start_ts'] = parse_timestamps(df_orders['Start_ts'])
 
+    if match_mode == 'interval':
+        merged = aggregate_interval_matches(df_orders, df_machine)
+        merged = merged[merged['Downtime'] > downtime_threshold]
+    else:
+        df_machine['Calendar_day_only'] = df_machine['Calendar day'].dt.date
+        df_orders['Start_date_only'] = df_orders['Start_ts'].dt.date
 
-    # Filter: nur Einträge mit hoher Downtime
-    machine_filtered = df_machine[df_machine['Downtime'] > downtime_threshold]
+        # Filter: nur Einträge mit hoher Downtime
+        machine_filtered = df_machine[df_machine['Downtime'] > downtime_threshold]
 
-    # Merge auf Datum
-    merged = pd.merge(
-        machine_filtered,
-        df_orders[['Start_date_only', 'Kurztext', 'Auftrag', 'Order_Duration']],
-        left_on='Calendar_day_only',
-        right_on='Start_date_only',
-        how='inner'
-    )
+        # Merge auf Datum
+        merged = pd.merge(
+            machine_filtered,
+            df_orders[['Start_date_only', 'Kurztext', 'Auftrag', 'Order_Duration']],
+            left_on='Calendar_day_only',
+            right_on='Start_date_only',
+            how='inner'
+        )
 
 
     if merged.empty:
@@ -68,7 +102,7 @@ def visualize_matched_downtime_orders(df_machine, df_orders, downtime_threshold=
     )
 
     # Top 10 für Plot
-    top_merged = merged[['Calendar day', 'Downtime', 'Kurztext_Anzeige', 'Order_Duration']].sort_values(by='Downtime', ascending=False).head(10)
+    top_merged = merged[['Downtime', 'Kurztext_Anzeige', 'Order_Duration']].sort_values(by='Downtime', ascending=False).head(10)
 
     # Plot
     plt.figure(figsize=(12, 6))
@@ -87,33 +121,46 @@ def visualize_matched_downtime_orders(df_machine, df_orders, downtime_threshold=
         ax.text(value + 5, i, f"{int(value)} min", va='center')
 
     plt.tight_layout()
-    plt.show()
+    show_or_save(save_path)
 
-def plot_damage_type_distribution(df_orders):
+def damage_type_distribution_data(df_orders):
     """
-    Plottet die Verteilung der Aufträge nach Schadenskategorie
-    mit Prozentanteilen und berechnet die Trefferquote.
+    Anzahl Aufträge pro Schadenskategorie (absteigend) und Gesamtzahl der Aufträge;
+    gibt dabei die Trefferquote aus. None, wenn keine Kategorien vorhanden sind.
     """
     # Nur relevante Spalte
     df_plot = df_orders[['Damage_Type']].copy()
 
     if df_plot.empty or df_plot['Damage_Type'].isnull().all():
         print("⚠️ Keine Schadenskategorien vorhanden.")
-        return
+        return None
 
-    # Trefferquote berechnen
+    # Trefferquote berechnen – aus der Treffermatrix, falls multi_label klassifiziert wurde
     total_orders = len(df_plot)
-    categorized_orders = df_plot[df_plot['Damage_Type'] != 'other'].shape[0]
-    hit_rate = (categorized_orders / total_orders) * 100
+    if 'Damage_Hits' in df_orders.columns:
+        hit_matrix = damage_hit_matrix(df_orders['Damage_Hits'])
+        hit_rate = compute_hit_rate(hit_matrix)
+        overlaps = category_overlap_counts(hit_matrix)
+        print(f"🔀 Aufträge mit mehreren Kategorien: {overlaps[overlaps.index > 1].sum()}")
+    else:
+        categorized_orders = df_plot[df_plot['Damage_Type'] != 'other'].shape[0]
+        hit_rate = (categorized_orders / total_orders) * 100
 
     print(f"✅ Trefferquote: {hit_rate:.2f}% der Aufträge konnten einer Kategorie zugeordnet werden.")
 
-    # Verteilung plotten
     damage_counts = df_plot['Damage_Type'].value_counts().sort_values(ascending=False)
+    # Kategoriale Spalte: ungenutzte Kategorien entfernen und als Text plotten, damit seaborn
+    # die absteigende Reihenfolge behält (sonst Kategorie-Reihenfolge und falsche Beschriftungen)
+    damage_counts = damage_counts[damage_counts > 0]
+    damage_counts.index = damage_counts.index.astype(str)
+    return damage_counts, total_orders
+
+
+def draw_damage_type_distribution(damage_counts, total_orders, save_path=None):
     damage_percent = (damage_counts / total_orders) * 100
 
     plt.figure(figsize=(10, 6))
-    ax = sns.barplot(x=damage_counts.values, y=damage_counts.index)
+    ax = sns.barplot(x=damage_counts.values, y=damage_counts.index, order=damage_counts.index)
 
     plt.xlabel('Anzahl Aufträge')
     plt.ylabel('Schadenskategorie')
@@ -124,4 +171,14 @@ def plot_damage_type_distribution(df_orders):
         ax.text(count + 1, i, f"{percent:.1f}%", va='center')
 
     plt.tight_layout()
-    plt.show()
+    show_or_save(save_path)
+
+
+def plot_damage_type_distribution(df_orders, save_path=None):
+    """
+    Plottet die Verteilung der Aufträge nach Schadenskategorie
+    mit Prozentanteilen und berechnet die Trefferquote.
+    """
+    data = damage_type_distribution_data(df_orders)
+    if data is not None:
+        draw_damage_type_distribution(*data, save_path=save_path)